@@ -1,13 +1,18 @@
+import asyncio
 from app.functions.RandChatters import RandomPool
 from app.functions.voice_manager import VoiceManager
-from app.functions.obs_websocket import OBSWebsocketsManager
+from app.functions.obs_websocket import get_obs_manager
 from app.functions.audio_player import AudioManager
+from app.websocket_manager import HUB
+from app.functions.frame_renderer import item_target, text_target
+from app.functions.state_journal import JOURNAL
 
 VOICE_MANAGER = VoiceManager()
-OBS_MANAGER = OBSWebsocketsManager()
+OBS_MANAGER = get_obs_manager()
 AUDIO_MANAGER = AudioManager()
 
 MUTE_TTS = False  # Set to True to mute TTS audio
+HUB.set_state("tts", {"muted": MUTE_TTS})
 
 CHARACTERS = {}  # {number: {username: platform}}
 CHARACTER_VOICE_STYLES = {}  # {number: voice_style}
@@ -33,13 +38,45 @@ def ensure_character(number):
         CHARACTER_POOLS[number] = RandomPool()
 
 
+def _journal_characters():
+    """Who plays each character and with which voice (chatter pools aren't kept: they refill from chat)."""
+    saved = {}
+    for number, voice_style in CHARACTER_VOICE_STYLES.items():
+        char = CHARACTERS.get(number) or {}
+        username, platform = next(iter(char.items()), (None, None))
+        saved[str(number)] = {"username": username, "platform": platform, "voice": voice_style}
+    return saved or None
+
+
+async def _restore_characters(saved: dict):
+    frame = {}
+    for key, char in saved.items():
+        number = int(key)
+        ensure_character(number)
+        CHARACTER_VOICE_STYLES[number] = char["voice"]
+        username = char["username"]
+        CHARACTERS[number] = {username: char["platform"]} if username else {}
+        if username:
+            frame[text_target(f"Character {number} Name")] = username
+            HUB.update(f"character:{number}", name=username, platform=char["platform"], visible=True)
+        frame[item_target("Chat Conference", f"Character {number} Scene")] = bool(username)
+        frame[item_target("Voting board", f"Vote {number}")] = bool(username)
+    return frame
+
+
+JOURNAL.register("characters", _journal_characters, _restore_characters)
+
+
 async def set_character(number: int, username: str, platform: str):
     ensure_character(number)
     CHARACTERS[number] = {username: platform}
     print(f"Character {number} set to: {CHARACTERS[number]}")
-    OBS_MANAGER.set_text(f"Character {number} Name", username)
-    OBS_MANAGER.set_source_visibility("Chat Conference",f"Character {number} Scene", True)
-    OBS_MANAGER.set_source_visibility("Voting board",f"Vote {number}", True)
+    OBS_MANAGER.set_text_coalesced(f"Character {number} Name", username)
+    HUB.update(f"character:{number}", name=username, platform=platform, visible=True)
+    await asyncio.gather(
+        OBS_MANAGER.set_source_visibility_async("Chat Conference",f"Character {number} Scene", True),
+        OBS_MANAGER.set_source_visibility_async("Voting board",f"Vote {number}", True),
+    )
 
 
 async def pick_character(number: int, platform: str):
@@ -76,7 +113,8 @@ def speak_character_message(number: int, username: str, platform: str, message:
     ensure_character(number)
     char = CHARACTERS.get(number, {})
     if char and username in char and char[username] == platform:
-        OBS_MANAGER.set_text(f"Character {number} Text", message)
+        OBS_MANAGER.set_text_coalesced(f"Character {number} Text", message)
+        HUB.update(f"character:{number}", text=message)
 
         if not MUTE_TTS:
             print(f"Speaking as Character {number} ({username}, {platform}): {message}")
@@ -97,10 +135,13 @@ def handle_chatter_message(username: str, platform: str, message: str):
 async def remove_character(number: int):
     ensure_character(number)
     CHARACTERS[number] = {}
-    OBS_MANAGER.set_text(f"Character {number} Name", f"Deceased")
-    OBS_MANAGER.set_text(f"Character {number} Text", "")
-    OBS_MANAGER.set_source_visibility("Chat Conference",f"Character {number} Scene", False)
-    OBS_MANAGER.set_source_visibility("Voting board",f"Vote {number}", False)
+    OBS_MANAGER.set_text_coalesced(f"Character {number} Name", f"Deceased")
+    OBS_MANAGER.set_text_coalesced(f"Character {number} Text", "")
+    HUB.update(f"character:{number}", name="Deceased", platform=None, text="", visible=False)
+    await asyncio.gather(
+        OBS_MANAGER.set_source_visibility_async("Chat Conference",f"Character {number} Scene", False),
+        OBS_MANAGER.set_source_visibility_async("Voting board",f"Vote {number}", False),
+    )
     AUDIO_MANAGER.play_audio("app/Sound effects/gun_shot.mp3", False, False, False)
 
 
@@ -128,6 +169,7 @@ async def mute_character_tts(mute: bool):
     """
     global MUTE_TTS
     MUTE_TTS = mute
+    HUB.set_state("tts", {"muted": MUTE_TTS})
     VOICE_MANAGER.reset()  # Clear any queued TTS jobs
     status = "muted" if mute else "unmuted"
     print(f"TTS audio is now {status}.")
@@ -138,12 +180,13 @@ def message_as_character(number: int, message: str, alias: str):
     Sends a message as the specified character.
     """
     try:
-        OBS_MANAGER.set_source_visibility("Chat Conference",f"Character {number} Scene", True)
+        OBS_MANAGER.set_source_visibility("Chat Conference",f"Character {number} Scene", True, wait=False)
         ensure_character(number)
-        OBS_MANAGER.set_text(f"Character {number} Name", alias)
+        OBS_MANAGER.set_text_coalesced(f"Character {number} Name", alias)
         voice_style = CHARACTER_VOICE_STYLES.get(number, DEFAULT_VOICE_STYLES[0])
         
-        OBS_MANAGER.set_text(f"Character {number} Text", message)
+        OBS_MANAGER.set_text_coalesced(f"Character {number} Text", message)
+        HUB.update(f"character:{number}", name=alias, text=message, visible=True)
         VOICE_MANAGER.text_to_audio(message, number, voice_style)
     except Exception as e:
         print(f"Error sending message as character {number}: {e}")
@@ -1,14 +1,23 @@
 import app.Chat_Manager as Chat_Manager
 import app.functions.poll_manager as Poll_Manager
 import app.functions.Duel_poll_manager as Duel_Poll_Manager
+import time
+from app.functions.metrics import counter, histogram
 
 """FILE Variables"""
 
 SESSION_ID = ""
 
+CHAT_MESSAGES = counter("chat_messages_total", "Chat messages received, by platform.", ("platform",))
+MSGSORT_SECONDS = histogram("msgsort_seconds", "Time msgSort spends handling one chat message.")
+_received = {platform: CHAT_MESSAGES.labels(platform) for platform in ("tiktok", "twitch")}
+_sort_time = MSGSORT_SECONDS.labels()
+
 """COMMAND CENTER"""
 #sorts incoming chat messages
 async def msgSort(username, message: str, chat):
+    started = time.perf_counter()
+    (_received.get(chat) or CHAT_MESSAGES.labels(chat)).inc()
     try:
         print(f"Received message from {username} on {chat}: {message}")
         if message.lower().startswith("..player") :
@@ -19,14 +28,14 @@ async def msgSort(username, message: str, chat):
                 print(f"Adding {username} to Character {num} pool.")
 
         # if Poll_Manager.is_valid_vote(message):
-        #     success, response = await Poll_Manager.handle_vote(message.strip())
+        #     success, response = await Poll_Manager.handle_vote(message.strip(), username, chat)
         #     if success:
         #         print(f"Vote counted: {response}")
         #     else:
         #         print(f"Vote error: {response}")
 
         if Duel_Poll_Manager.is_valid_duel_vote(message):
-            success, response = await Duel_Poll_Manager.record_duel_vote(message.strip())
+            success, response = await Duel_Poll_Manager.record_duel_vote(message.strip(), username, chat)
             if success:
                 print(f"Duel vote counted: {response}")
             else:
@@ -48,6 +57,8 @@ async def msgSort(username, message: str, chat):
         #     print("Poll hidden.")
     except Exception as e:
         print(f"[ERROR] Failed to sort message: {e}")
+    finally:
+        _sort_time.observe(time.perf_counter() - started)
     
     
 
@@ -0,0 +1,228 @@
+# control_channel.py
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Hashable, Optional, Set, Tuple
+
+from app.state_store import WORKER_ID
+from app.websocket_manager import HUB, HubClient
+
+# Every message on the control socket is one envelope:
+#   {"topic": str, "type": str, "id": str | int | null, "payload": {...}}
+# Client -> Server: commands, e.g. {"topic": "poll", "type": "start", "id": 7, "payload": {}}
+#   Topics with an argument put it after a colon: "character:3".
+#   {"topic": "control", "type": "subscribe" | "unsubscribe", "payload": {"topics": [...]}}
+#   Subscriptions may use wildcards ("character:*").
+# Server -> Client:
+#   replies   {"topic": <same>, "type": "ok" | "error", "id": <same>, "payload": {...}}
+#   events    {"topic": str, "type": str, "id": null, "seq": int, "payload": ...}   to subscribers,
+#             starting with a "snapshot" per topic (see websocket_manager.py)
+# Commands from one client run concurrently (a slow one, e.g. a crate drum roll,
+# doesn't hold up the rest); match replies to commands by id. Commands are only
+# kept in arrival order where the handler declares an ordering key (route(ordered_by=...)).
+CONTROL_TOPIC = "control"
+MAX_IN_FLIGHT = 8   # commands one connection may have running at once
+FORWARD_TIMEOUT_SEC = 30.0  # longest a command run by another worker may take
+
+
+class ControlError(Exception):
+    """Raised by a handler to answer with an error reply instead of "ok"."""
+
+
+class ControlConnection(HubClient):
+    """
+    One client of the control channel: a hub client (see websocket_manager.py)
+    that also sends commands. Subclasses (e.g. the legacy route adapters) can
+    reshape envelopes in format().
+    """
+
+    def __init__(self, websocket, name: str = "control client"):
+        super().__init__(websocket, name)
+        self._slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._running: Set[asyncio.Task] = set()
+
+    async def spawn(self, command: Coroutine):
+        """
+        Run a command next to the ones already running. Waits while MAX_IN_FLIGHT
+        are in progress, so a client flooding commands stops being read instead of
+        piling up tasks. Commands still finish if the client disconnects.
+        """
+        await self._slots.acquire()
+        task = asyncio.create_task(command)
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Control] Command failed: {task.exception()}")
+
+
+Handler = Callable[[Optional[ControlConnection], str, dict], Awaitable[Optional[dict]]]
+OrderKey = Callable[[str, dict], Hashable]
+
+
+def envelope(topic: str, type_: str, payload: Optional[dict] = None, id_: Any = None) -> dict:
+    return {"topic": topic, "type": type_, "id": id_, "payload": payload or {}}
+
+
+def topic_arg(topic: str) -> Optional[str]:
+    """'character:3' -> '3' ('poll' -> None)."""
+    _, sep, arg = topic.partition(":")
+    return arg if sep else None
+
+
+class ControlRouter:
+    """
+    Routing table for the multiplexed control socket. Handlers are registered
+    per (topic family, type), e.g. ("character", "pick") also serves
+    "character:3". They get (connection, topic, payload) and return the reply
+    payload, or raise ControlError. Subscriptions and events go through the
+    websocket hub.
+    ordered_by(topic, payload) -> key: commands with the same key run one at a
+    time in arrival order, across all connections (e.g. one key per character).
+    Handlers without it run concurrently with everything else.
+    With several workers, only the one running the show executes commands; the
+    others forward them through the shared store (lead()/follow()).
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], Tuple[Handler, Optional[OrderKey]]] = {}
+        self._order_locks: Dict[Hashable, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._store = None
+        self._following = False
+        self._listening = False
+        self._waiting: Dict[str, asyncio.Future] = {}
+        self._remote: Set[asyncio.Task] = set()
+
+    def route(self, family: str, type_: str, ordered_by: Optional[OrderKey] = None):
+        def register(handler: Handler) -> Handler:
+            self._routes[(family, type_)] = (handler, ordered_by)
+            return handler
+        return register
+
+    # ------------- Commands -------------
+
+    async def call(self, topic: str, type_: str, payload: Optional[dict] = None,
+                   conn: Optional[ControlConnection] = None) -> dict:
+        """Run the handler for one command; returns its reply payload or raises ControlError."""
+        if topic == CONTROL_TOPIC and conn is not None:
+            return self._control(conn, type_, payload or {})
+        if self._following:
+            return await self._forward(topic, type_, payload or {})
+        route = self._routes.get((topic.partition(":")[0], type_))
+        if route is None:
+            raise ControlError(f"Unknown command: {topic} {type_}")
+        handler, ordered_by = route
+        payload = payload or {}
+        if ordered_by is None:
+            return await handler(conn, topic, payload) or {}
+        # asyncio.Lock is FIFO and nothing awaits before this point, so commands
+        # with the same key run in the order they were received
+        async with self._order_locks[ordered_by(topic, payload)]:
+            return await handler(conn, topic, payload) or {}
+
+    def ordering(self, key: Hashable) -> asyncio.Lock:
+        """The lock commands with this ordering key run under (for handlers that touch several keys)."""
+        return self._order_locks[key]
+
+    async def dispatch(self, conn: ControlConnection, message: Any) -> dict:
+        """Handle one envelope from a client and build the reply envelope."""
+        if not isinstance(message, dict):
+            return envelope("", "error", {"message": "Expected a JSON object"})
+        topic = str(message.get("topic") or "")
+        type_ = str(message.get("type") or "")
+        id_ = message.get("id")
+        payload = message.get("payload")
+        if not isinstance(payload, dict):
+            payload = {}
+        try:
+            return envelope(topic, "ok", await self.call(topic, type_, payload, conn), id_)
+        except ControlError as e:
+            return envelope(topic, "error", {"message": str(e)}, id_)
+        except Exception as e:
+            print(f"[Control] {topic} {type_} failed: {e}")
+            return envelope(topic, "error", {"message": f"{type_} failed: {e}"}, id_)
+
+    async def handle(self, conn: ControlConnection, message: Any):
+        """Run one envelope and send the reply (run it through conn.spawn())."""
+        conn.send(await self.dispatch(conn, message))
+
+    # ------------- Subscriptions -------------
+
+    def _control(self, conn: ControlConnection, type_: str, payload: dict) -> dict:
+        topics = [str(t) for t in payload.get("topics") or []]
+        if type_ == "subscribe":
+            for topic in topics:
+                HUB.subscribe(conn, topic)
+        elif type_ == "unsubscribe":
+            for topic in topics:
+                HUB.unsubscribe(conn, topic)
+        else:
+            raise ControlError(f"Unknown command: {CONTROL_TOPIC} {type_}")
+        return {"topics": sorted(conn.patterns)}
+
+    # ------------- Workers -------------
+
+    def lead(self, store):
+        """This worker runs the show: execute commands forwarded by the others."""
+        self._store = store
+        self._following = False
+        self._listen(store)
+
+    def follow(self, store):
+        """Another worker runs the show: forward every command to it."""
+        self._store = store
+        self._following = True
+        self._listen(store)
+
+    def _listen(self, store):
+        if not self._listening:
+            store.listen("command", self._on_command)
+            store.listen("reply", self._on_reply)
+            self._listening = True
+
+    async def _forward(self, topic: str, type_: str, payload: dict) -> dict:
+        id_ = uuid.uuid4().hex
+        reply = asyncio.get_running_loop().create_future()
+        self._waiting[id_] = reply
+        self._store.publish("command", {"id": id_, "from": WORKER_ID, "topic": topic, "type": type_, "payload": payload})
+        try:
+            return await asyncio.wait_for(reply, FORWARD_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            raise ControlError(f"{type_} got no answer from the worker running the show")
+        finally:
+            self._waiting.pop(id_, None)
+
+    def _on_reply(self, message: dict):
+        if message.get("to") != WORKER_ID:
+            return
+        reply = self._waiting.get(message["id"])
+        if reply is None or reply.done():
+            return
+        if message["ok"]:
+            reply.set_result(message["payload"])
+        else:
+            reply.set_exception(ControlError(message["message"]))
+
+    def _on_command(self, message: dict):
+        if self._following:
+            return
+        task = asyncio.ensure_future(self._run_forwarded(message))
+        self._remote.add(task)
+        task.add_done_callback(self._remote.discard)
+
+    async def _run_forwarded(self, message: dict):
+        type_ = message["type"]
+        try:
+            reply = {"ok": True, "payload": await self.call(message["topic"], type_, message["payload"])}
+        except ControlError as e:
+            reply = {"ok": False, "message": str(e)}
+        except Exception as e:
+            print(f"[Control] {message['topic']} {type_} failed: {e}")
+            reply = {"ok": False, "message": f"{type_} failed: {e}"}
+        self._store.publish("reply", {"to": message["from"], "id": message["id"], **reply})
+
+
+CONTROL = ControlRouter()
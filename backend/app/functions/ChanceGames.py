@@ -5,13 +5,17 @@ import random
 from typing import Optional, Set
 
 from app.functions.audio_player import AudioManager
-from app.functions.obs_websocket import OBSWebsocketsManager
+from app.functions.obs_websocket import get_obs_manager
+from app.websocket_manager import HUB
+from app.functions.frame_renderer import Frame, filter_target, item_target
+from app.functions.sequencer import Call, Sequencer, Sound
+from app.functions.state_journal import JOURNAL
 
 # ----------------------------
 # Singletons / constants
 # ----------------------------
 AUDIO_MANAGER = AudioManager()
-OBS_MANAGER = OBSWebsocketsManager()
+OBS_MANAGER = get_obs_manager()
 
 # Scene and source name templates (edit if your OBS names differ)
 CRATES_SCENE_NAME = "Crate Game"          # <-- change to your actual scene name if needed
@@ -25,57 +29,11 @@ SFX_DRUMROLL = "app/Sound effects/Drum_Roll.mp3"
 SFX_SAFE = "app/Sound effects/Safe_Crate.mp3"
 SFX_EXPLOSION = "app/Sound effects/Explosion.mp3"
 
-# ----------------------------
-# Async helpers (non-blocking)
-# ----------------------------
-async def _play_audio_async(*args, **kwargs):
-    """Run potentially blocking audio playback in a thread."""
-    loop = asyncio.get_running_loop()
-    func = functools.partial(AUDIO_MANAGER.play_audio, *args, **kwargs)
-    await loop.run_in_executor(None, func)
-
-# Detect which visibility API the OBS manager exposes.
-_HAS_SOURCE_VIS = hasattr(OBS_MANAGER, "set_source_visibility")
-_HAS_SCENE_ITEM_VIS = hasattr(OBS_MANAGER, "set_scene_item_visibility")
-
-async def _set_item_visibility_async(source_name: str, visible: bool, scene_name: Optional[str] = None):
-    """
-    Toggle visibility for a source. Tries multiple common OBSWebsocketsManager APIs:
-      - set_scene_item_visibility(scene_name, source_name, visible)
-      - set_source_visibility(source_name, visible)
-    """
-    loop = asyncio.get_running_loop()
-
-    if _HAS_SCENE_ITEM_VIS and scene_name:
-        func = functools.partial(OBS_MANAGER.set_scene_item_visibility, scene_name, source_name, visible)
-        await loop.run_in_executor(None, func)
-        return
-
-    if _HAS_SOURCE_VIS:
-        func = functools.partial(OBS_MANAGER.set_source_visibility,scene_name, source_name, visible)
-        await loop.run_in_executor(None, func)
-        return
+GUN_SCENE_NAME = "Conference and backdrop"
 
-    # If your OBS manager uses a different method name, update here:
-    raise RuntimeError(
-        "OBSWebsocketsManager has no supported visibility method. "
-        "Expected set_scene_item_visibility(scene, source, visible) or set_source_visibility(source, visible)."
-    )
-
-async def _set_filter_visibility_async(filter_name: str, visible: bool, scene_name: Optional[str] = None):
-    """
-    Toggle visibility for a source. Tries multiple common OBSWebsocketsManager APIs:
-      - set_scene_item_visibility(scene_name, source_name, visible)
-      - set_source_visibility(source_name, visible)
-    """
-    loop = asyncio.get_running_loop()
-
-    try:    
-        func = functools.partial(OBS_MANAGER.set_filter_visibility, scene_name, filter_name, visible)
-        await loop.run_in_executor(None, func)
-        return
-    except Exception as e:
-        print(f"Error setting filter visibility: {e}")
+# Animations (sound cues + OBS changes) run in the background; each game has its
+# own group so reset can cancel what is still playing. See sequencer.py.
+SEQUENCER = Sequencer(OBS_MANAGER, AUDIO_MANAGER)
 
 def _crate_name(i: int) -> str:
     return CRATE_NAME_TEMPLATE.format(i=i)
@@ -93,29 +51,20 @@ async def shoot_gun():
     """
     50/50: either gun fires or empty click.
     """
-    global current_player
-    rand = random.randint(1, 2)
-    status = ""
-    if rand != 1:
-        await _play_audio_async(SFX_EMPTY, False, False, False)
-        status = "Gun empty"
-    else:
-        await _play_audio_async(SFX_GUN, False, False, False)
-        status = "Gun fired"
-    
-
-    
-
-    return status
+    if random.randint(1, 2) != 1:
+        SEQUENCER.play("gun", [Sound(SFX_EMPTY)], name="gun empty")
+        return "Gun empty"
+    SEQUENCER.play("gun", [Sound(SFX_GUN)], name="gun fired")
+    return "Gun fired"
 
 async def flip_gun():
     global current_player
 
     if current_player == 1:
-        await _set_filter_visibility_async("Flip gun right", True, "Conference and backdrop")
+        SEQUENCER.play("gun", [{filter_target(GUN_SCENE_NAME, "Flip gun right"): True}], name="flip gun")
         current_player = 2
     else:
-        await _set_filter_visibility_async("Flip gun left", True, "Conference and backdrop")
+        SEQUENCER.play("gun", [{filter_target(GUN_SCENE_NAME, "Flip gun left"): True}], name="flip gun")
         current_player = 1
 
     return f"Gun flipped to player {current_player}."
@@ -127,12 +76,8 @@ async def hide_gun():
     """
     Hides the gun from the OBS scene.
     """
-    if hidden:
-        await _set_item_visibility_async("gun", True, "Conference and backdrop")
-        hidden = False
-    else:
-        await _set_item_visibility_async("gun", False, "Conference and backdrop")
-        hidden = True
+    hidden = not hidden
+    SEQUENCER.play("gun", [{item_target(GUN_SCENE_NAME, "gun"): not hidden}], name="hide gun")
     return "Gun hidden from view."
 
 # =========================================================
@@ -143,6 +88,46 @@ _crates_lock = asyncio.Lock()
 _crates_active: bool = False
 _hidden_bomb_index: Optional[int] = None
 _opened_crates: Set[int] = set()
+_revealed_crates: Set[int] = set()  # opened crates whose drum roll has finished
+_crates_scene: str = CRATES_SCENE_NAME  # scene the current board was drawn in
+
+def crates_state() -> dict:
+    """Whether a game is running and which crates are open (never where the bomb is)."""
+    return {"active": _crates_active, "opened": sorted(_opened_crates)}
+
+def _crates_overlay_state() -> dict:
+    """
+    Crates board for browser-source overlays. A crate only shows as open once its
+    animation reveals it, and the bomb only once it went off.
+    """
+    exploded = _hidden_bomb_index is not None and _hidden_bomb_index in _revealed_crates
+    return {"active": _crates_active, "opened": sorted(_revealed_crates), "bomb": _hidden_bomb_index if exploded else None}
+
+def _reveal_crate(crate_number: int):
+    _revealed_crates.add(crate_number)
+
+HUB.add_provider("crates", _crates_overlay_state)
+
+def _crates_journal_state() -> Optional[dict]:
+    if _hidden_bomb_index is None:
+        return None
+    return {"active": _crates_active, "bomb": _hidden_bomb_index, "opened": sorted(_opened_crates), "scene": _crates_scene}
+
+async def _restore_crates(saved: dict) -> Frame:
+    """After a restart: same bomb, same opened crates, in the same scene."""
+    global _crates_active, _hidden_bomb_index, _opened_crates, _revealed_crates, _crates_scene
+    _crates_scene = saved.get("scene", CRATES_SCENE_NAME)  # older journals didn't record it
+    _crates_active = saved["active"]
+    _hidden_bomb_index = saved["bomb"]
+    _opened_crates = set(saved["opened"])
+    _revealed_crates = set(_opened_crates)
+    frame: Frame = {}
+    for i in range(1, 13):
+        frame[item_target(_crates_scene, _crate_name(i))] = i not in _opened_crates
+        frame[item_target(_crates_scene, _bomb_name(i))] = i == _hidden_bomb_index
+    return frame
+
+JOURNAL.register("crates", _crates_journal_state, _restore_crates)
 
 async def start_crates_game(scene_name: str = CRATES_SCENE_NAME) -> str:
     """
@@ -150,32 +135,34 @@ async def start_crates_game(scene_name: str = CRATES_SCENE_NAME) -> str:
       - Shows all 12 crates (crate 1..12).
       - Hides all bombs (bomb 1..12) EXCEPT one randomly chosen bomb which is made visible.
     """
-    global _crates_active, _hidden_bomb_index, _opened_crates
+    global _crates_active, _hidden_bomb_index, _opened_crates, _revealed_crates, _crates_scene
 
+    SEQUENCER.cancel("crates")  # a reveal from the last game mustn't play over the new board
     async with _crates_lock:
         _crates_active = True
         _opened_crates = set()
+        _revealed_crates = set()
         _hidden_bomb_index = random.randint(1, 12)
+        _crates_scene = scene_name
 
-        # Show all crates, hide all bombs
-        tasks = []
+        # Show all crates, hide all bombs except the one that's actually under a crate.
+        # Sent as one RequestBatch so OBS applies the whole board at once.
+        batch = OBS_MANAGER.batch()
         for i in range(1, 13):
-            tasks.append(_set_item_visibility_async(_crate_name(i), True, scene_name))
-            tasks.append(_set_item_visibility_async(_bomb_name(i), False, scene_name))
-        await asyncio.gather(*tasks)
-        # Enable the one bomb that's actually under a crate
-        await _set_item_visibility_async(_bomb_name(_hidden_bomb_index), True, scene_name)
+            batch.set_source_visibility(scene_name, _crate_name(i), True)
+            batch.set_source_visibility(scene_name, _bomb_name(i), i == _hidden_bomb_index)
+        await batch.send_async()
 
 
     return "Crates game started. A bomb has been hidden."
 
 async def select_crate(crate_number: int, scene_name: str = CRATES_SCENE_NAME) -> str:
     """
-    Handles a player's crate selection:
+    Handles a player's crate selection and returns the outcome right away; the
+    reveal plays in the background (after any reveal still playing):
       - Plays a drumroll.
       - 'Opens' the crate by hiding the crate source.
-      - If the selected crate has the bomb: play explosion and end game.
-        Otherwise: play 'safe' sound and continue.
+      - Plays the explosion if the crate had the bomb (game over), else the 'safe' sound.
     """
     global _crates_active, _hidden_bomb_index, _opened_crates
 
@@ -192,39 +179,41 @@ async def select_crate(crate_number: int, scene_name: str = CRATES_SCENE_NAME) -
         # Mark as opened right away to avoid race conditions
         _opened_crates.add(crate_number)
 
-    # Play the suspense
-    await _play_audio_async(SFX_DRUMROLL, True, False, False)
-
-    # 'Open' the crate by hiding it (reveals whatever is underneath)
-    await _set_item_visibility_async(_crate_name(crate_number), False, scene_name)
+        # Check if this crate had the bomb (that bomb source was set visible at start)
+        is_bomb = (crate_number == _hidden_bomb_index)
+        if is_bomb:
+            _crates_active = False
 
-    # Check if this crate had the bomb (that bomb source was set visible at start)
-    is_bomb = (crate_number == _hidden_bomb_index)
+    SEQUENCER.play("crates", [
+        Sound(SFX_DRUMROLL, wait=True),
+        # 'Open' the crate by hiding it (reveals whatever is underneath)
+        {item_target(scene_name, _crate_name(crate_number)): False},
+        Call(functools.partial(_reveal_crate, crate_number)),
+        Sound(SFX_EXPLOSION if is_bomb else SFX_SAFE),
+    ], name=f"crate {crate_number}")
 
     if is_bomb:
-        await _play_audio_async(SFX_EXPLOSION, False, False, False)
-        async with _crates_lock:
-            _crates_active = False
         return f"💥 Boom! Crate {crate_number} had the bomb. Game over."
-    else:
-        await _play_audio_async(SFX_SAFE, False, False, False)
-        return f"✅ Safe! Crate {crate_number} was empty."
+    return f"✅ Safe! Crate {crate_number} was empty."
 
 async def reset_crates(scene_name: str = CRATES_SCENE_NAME) -> str:
     """
-    Resets the Crates game visuals (hides everything) and clears state.
+    Resets the Crates game visuals (hides everything) and clears state,
+    cutting off any reveal that is still playing.
     """
-    global _crates_active, _hidden_bomb_index, _opened_crates
+    global _crates_active, _hidden_bomb_index, _opened_crates, _revealed_crates
 
+    SEQUENCER.cancel("crates")
     async with _crates_lock:
         _crates_active = False
         _hidden_bomb_index = None
         _opened_crates = set()
+        _revealed_crates = set()
 
-    tasks = []
+    batch = OBS_MANAGER.batch()
     for i in range(1, 13):
-        tasks.append(_set_item_visibility_async(_crate_name(i), False, scene_name))
-        tasks.append(_set_item_visibility_async(_bomb_name(i), False, scene_name))
-    await asyncio.gather(*tasks)
+        batch.set_source_visibility(scene_name, _crate_name(i), False)
+        batch.set_source_visibility(scene_name, _bomb_name(i), False)
+    await batch.send_async()
 
     return "Crates game has been reset."
@@ -2,7 +2,30 @@ import pygame
 import time
 import soundfile as sf
 import os
+from functools import lru_cache
 from mutagen.mp3 import MP3
+from app.functions.metrics import counter
+
+AUDIO_PLAYS = counter("audio_plays_total", "Sounds played, by category (tts or the sound effect's name).", ("category",))
+_tts_plays = AUDIO_PLAYS.labels("tts")
+
+@lru_cache(maxsize=64)
+def _plays_for(file_path):
+    """Counter child for a sound effect, e.g. 'Sound effects/Drum_Roll.mp3' -> drum_roll."""
+    return AUDIO_PLAYS.labels(os.path.splitext(os.path.basename(file_path))[0].lower())
+
+@lru_cache(maxsize=128)
+def audio_length(file_path):
+    """Length of a .wav or .mp3 file in seconds (None for other file types)."""
+    _, ext = os.path.splitext(file_path) # Get the extension of this file
+    if ext.lower() == '.wav':
+        wav_file = sf.SoundFile(file_path)
+        file_length = wav_file.frames / wav_file.samplerate
+        wav_file.close()
+        return file_length
+    if ext.lower() == '.mp3':
+        return MP3(file_path).info.length
+    return None
 
 class AudioManager:
 
@@ -18,6 +41,8 @@ class AudioManager:
         play_using_music (bool): means it will use Pygame Music, if false then uses pygame Sound instead
         """
         print(f"Playing file with pygame: {file_path}")
+        # TTS output files are one per message (_Msg<hash>_<voice>.wav); count them together
+        (_tts_plays if os.path.basename(file_path).startswith("_Msg") else _plays_for(file_path)).inc()
         pygame.mixer.init()
         if play_using_music:
             # Pygame Mixer only plays one file at a time, but audio doesn't glitch
@@ -29,16 +54,8 @@ class AudioManager:
             pygame_sound.play()
 
         if sleep_during_playback:
-            # Calculate length of the file, based on the file format
-            _, ext = os.path.splitext(file_path) # Get the extension of this file
-            if ext.lower() == '.wav':
-                wav_file = sf.SoundFile(file_path)
-                file_length = wav_file.frames / wav_file.samplerate
-                wav_file.close()
-            elif ext.lower() == '.mp3':
-                mp3_file = MP3(file_path)
-                file_length = mp3_file.info.length
-            else:
+            file_length = audio_length(file_path)
+            if file_length is None:
                 print("Cannot play audio, unknown file type")
                 return
 
@@ -56,4 +73,7 @@ class AudioManager:
                     os.remove(file_path)
                     print(f"Deleted the audio file.")
                 except PermissionError:
-                    print(f"Couldn't remove {file_path} because it is being used by another process.")
\ No newline at end of file
+                    print(f"Couldn't remove {file_path} because it is being used by another process.")
+
+        # The playing Sound (None with Pygame Music), so callers can stop it early
+        return None if play_using_music else pygame_sound
\ No newline at end of file
@@ -0,0 +1,125 @@
+# client_queue.py
+import asyncio
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from app.functions.fast_json import dumps
+from app.functions.metrics import counter, gauge
+
+OUTBOX_MAX = 256            # messages waiting for one client before it counts as too slow
+SEND_TIMEOUT_SEC = 2.0      # longest a single send may take before the client is dropped
+EVICT_CLOSE_CODE = 1013     # "try again later": the client can reconnect and resync
+
+# Connected clients, for the metrics below (read only when /metrics is scraped)
+_LIVE: "weakref.WeakSet[QueuedSender]" = weakref.WeakSet()
+EVICTIONS = counter("ws_evictions_total", "Websocket clients dropped for falling behind, by route.", ("route",))
+
+
+def _clients_by_route() -> Dict[str, int]:
+    return dict(Counter(sender.name for sender in list(_LIVE)))
+
+
+def _queued_by_route() -> Dict[str, int]:
+    queued: Dict[str, int] = {}
+    for sender in list(_LIVE):
+        queued[sender.name] = queued.get(sender.name, 0) + len(sender)
+    return queued
+
+
+def _longest_by_route() -> Dict[str, int]:
+    longest: Dict[str, int] = {}
+    for sender in list(_LIVE):
+        longest[sender.name] = max(longest.get(sender.name, 0), len(sender))
+    return longest
+
+
+gauge("ws_clients", "Connected websocket clients, by route.", _clients_by_route, ("route",))
+gauge("ws_send_queue_messages", "Messages waiting in client send queues, summed by route.", _queued_by_route, ("route",))
+gauge("ws_send_queue_longest", "Longest single client send queue, by route.", _longest_by_route, ("route",))
+
+
+class QueuedSender:
+    """
+    Outbound side of one websocket client: a bounded queue drained by its own
+    writer task, so broadcasting to many clients only enqueues and one slow or
+    half-dead client never holds up the others (or the game code calling publish).
+    - put() never waits. A client whose queue is full, or whose send takes longer
+      than send_timeout, is evicted: its socket is closed and on_evict() runs.
+    - Messages are str (text frames, e.g. JSON encoded once for every client),
+      bytes, or dicts (encoded here with fast_json).
+    """
+
+    def __init__(self, websocket, name: str = "client", max_queue: int = OUTBOX_MAX,
+                 send_timeout: float = SEND_TIMEOUT_SEC, on_evict: Optional[Callable[["QueuedSender"], None]] = None):
+        self.websocket = websocket
+        self.name = name
+        self.send_timeout = send_timeout
+        self.on_evict = on_evict
+        self.closed = False
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max_queue)
+        self._writer: Optional[asyncio.Task] = None
+        _LIVE.add(self)
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, message: Any) -> bool:
+        """Queue a message; False if the client is gone (or just got evicted for falling behind)."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.evict(f"{self._queue.maxsize} messages behind")
+            return False
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop(), name=f"QueuedSender:{self.name}")
+        return True
+
+    def close(self):
+        """Stop sending (the client disconnected); anything still queued is dropped."""
+        self.closed = True
+        _LIVE.discard(self)
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def evict(self, reason: str):
+        if self.closed:
+            return
+        print(f"[Clients] Dropping slow {self.name}: {reason}.")
+        EVICTIONS.labels(self.name).inc()
+        self.close()
+        asyncio.ensure_future(self._close_socket())
+        if self.on_evict is not None:
+            self.on_evict(self)
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _send(self, message: Any):
+        if isinstance(message, dict):
+            await self.websocket.send_text(dumps(message))
+        elif isinstance(message, bytes):
+            await self.websocket.send_bytes(message)
+        else:
+            await self.websocket.send_text(message)
+
+    async def _write_loop(self):
+        while not self.closed:
+            message = await self._queue.get()
+            try:
+                await asyncio.wait_for(self._send(message), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.evict(f"send took over {self.send_timeout:.1f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Socket already gone; the route's receive loop cleans up
+                print(f"[Clients] Send to {self.name} failed: {e}")
+                self.close()
+                if self.on_evict is not None:
+                    self.on_evict(self)
@@ -0,0 +1,152 @@
+# countdown.py
+import asyncio
+import heapq
+import itertools
+import math
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+# on_expire() / on_second(seconds_left) may be plain functions or coroutine functions.
+Callback = Callable[..., Any]
+
+
+class Countdown:
+    """
+    One timer on a CountdownScheduler. The deadline is fixed on the loop's monotonic
+    clock when it starts, so time spent elsewhere (OBS calls, slow ticks) never
+    pushes it back; the time left is always worked out from the deadline.
+    """
+
+    def __init__(self, scheduler: "CountdownScheduler", name: str, deadline: float,
+                 on_expire: Optional[Callback], on_second: Optional[Callback]):
+        self.name = name
+        self.deadline = deadline
+        self.on_expire = on_expire
+        self.on_second = on_second        # called whenever seconds_left() changes
+        self.cancelled = False
+        self.expired = False
+        self._scheduler = scheduler
+        self._shown: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.cancelled or self.expired
+
+    def remaining(self) -> float:
+        """Seconds until the deadline (0 once done)."""
+        if self.done:
+            return 0.0
+        return max(0.0, self.deadline - self._scheduler.loop.time())
+
+    def seconds_left(self) -> int:
+        """Whole seconds to display: rounds up, so a 60 s timer shows 60 until a full second has gone."""
+        return math.ceil(self.remaining())
+
+    def cancel(self):
+        """Stop without calling on_expire. Safe to call more than once or after expiry."""
+        self.cancelled = True
+
+    def _next_wake(self) -> float:
+        """When the scheduler next has to look at this timer: the next second boundary or the deadline."""
+        if self.on_second is None:
+            return self.deadline
+        left = self.deadline - self._scheduler.loop.time()
+        return self.deadline - (math.ceil(left) - 1) if left > 1 else self.deadline
+
+
+class CountdownScheduler:
+    """
+    Runs any number of countdowns (duel, polls, future games) from one task.
+    - Timers sit in a heap ordered by when they next need attention; the task
+      sleeps until the earliest one, so an idle scheduler costs nothing.
+    - on_expire runs when the deadline passes, not a "sleep(1) x N" later.
+    - on_second (optional) runs only when the displayed whole second changes,
+      for games that draw their own timer without a FrameRenderer.
+    - Coroutine callbacks run as their own tasks so a slow one never delays the
+      next timer.
+    Use it from the event loop that owns the game (the first start() binds it).
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heap: List[Tuple[float, int, Countdown]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()
+
+    def start(self, seconds: float, on_expire: Optional[Callback] = None,
+              on_second: Optional[Callback] = None, name: str = "countdown") -> Countdown:
+        """Start a timer that expires 'seconds' from now."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # First use, or the old loop is gone (e.g. a restarted app): start over on this one
+            self.loop = loop
+            self._heap.clear()
+            self._wakeup = asyncio.Event()
+            self._task = None
+
+        timer = Countdown(self, name, loop.time() + max(0.0, float(seconds)), on_expire, on_second)
+        self._show(timer, timer.seconds_left())  # show the starting value right away
+        self._push(timer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="CountdownScheduler")
+        else:
+            self._wakeup.set()
+        return timer
+
+    def _push(self, timer: Countdown):
+        heapq.heappush(self._heap, (timer._next_wake(), next(self._seq), timer))
+
+    async def _run(self):
+        loop = self.loop
+        while self._heap:
+            wake_at, _, timer = self._heap[0]
+            if timer.done:
+                heapq.heappop(self._heap)
+                continue
+            delay = wake_at - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # A new timer may be due sooner; it sets _wakeup so we look again
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if loop.time() >= timer.deadline:
+                timer.expired = True
+                self._show(timer, 0)
+                self._fire(timer, timer.on_expire)
+            else:
+                self._show(timer, timer.seconds_left())
+                self._push(timer)
+
+    def _show(self, timer: Countdown, seconds_left: int):
+        if timer.on_second is not None and seconds_left != timer._shown:
+            timer._shown = seconds_left
+            self._fire(timer, timer.on_second, seconds_left)
+
+    def _fire(self, timer: Countdown, callback: Optional[Callback], *args):
+        if callback is None:
+            return
+        try:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(self._guard(timer, result))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+        except Exception as e:
+            print(f"[Countdown] {timer.name} callback error: {e}")
+
+    async def _guard(self, timer: Countdown, coro):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[Countdown] {timer.name} callback error: {e}")
+
+
+COUNTDOWNS = CountdownScheduler()
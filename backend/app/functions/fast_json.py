@@ -0,0 +1,28 @@
+# fast_json.py
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used without it
+    orjson = None
+
+# Compact JSON text for websocket frames. orjson is several times faster than the
+# stdlib; both produce UTF-8 text without spaces. Broadcasts call dumps() once and
+# send the same string to every client.
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=_OPTIONS).decode("utf-8")
+
+    def loads(text) -> Any:
+        return orjson.loads(text)
+else:
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(text) -> Any:
+        return json.loads(text)
+
+ENCODER = "orjson" if orjson is not None else "json"
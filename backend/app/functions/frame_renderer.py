@@ -0,0 +1,142 @@
+# frame_renderer.py
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.functions.obs_websocket import get_obs_manager
+
+DEFAULT_TICK_HZ = 15
+
+# Frame targets. A frame maps these keys to the value OBS should show:
+#   ("text", input_name)                 -> str
+#   ("item", scene_name, source_name)    -> bool (scene item visible)
+#   ("filter", source_name, filter_name) -> bool (filter enabled)
+FrameKey = Tuple[Hashable, ...]
+Frame = Dict[FrameKey, Any]
+
+
+def text_target(input_name: str) -> FrameKey:
+    return ("text", input_name)
+
+
+def item_target(scene_name: str, source_name: str) -> FrameKey:
+    return ("item", scene_name, source_name)
+
+
+def filter_target(source_name: str, filter_name: str) -> FrameKey:
+    return ("filter", source_name, filter_name)
+
+
+def add_to_batch(batch, key: FrameKey, value: Any) -> bool:
+    """Queue the write for one frame target on an OBSBatch; False if the target kind is unknown."""
+    kind = key[0]
+    if kind == "text":
+        batch.set_text(key[1], value)
+    elif kind == "item":
+        batch.set_source_visibility(key[1], key[2], bool(value))
+    elif kind == "filter":
+        batch.set_filter_visibility(key[1], key[2], bool(value))
+    else:
+        return False
+    return True
+
+
+class FrameRenderer:
+    """
+    Draws game visuals at a fixed rate instead of once per chat message.
+    - Every tick, compute_frame() reads the current state (e.g. a vote snapshot) and
+      returns the targets it wants on screen. Targets it leaves out are untouched.
+    - Only targets whose value differs from what was last sent go to OBS, as one batch.
+    - Vote intake never touches OBS, so OBS load stays at most tick_hz batches per
+      second however fast chat is. A slow OBS just lowers the frame rate.
+    - Frame functions that only return what changed since their last frame pass
+      on_reset, which is called whenever the next frame has to be complete again.
+    - When OBS reconnects, or a frame couldn't be delivered, the next frame is
+      complete again (see OBSWebsocketsManager.add_reset_listener).
+    """
+
+    def __init__(self, name: str, compute_frame: Callable[[], Frame], tick_hz: float = DEFAULT_TICK_HZ, obs=None,
+                 on_reset: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.compute_frame = compute_frame
+        self.on_reset = on_reset
+        self.tick_hz = tick_hz
+        self._obs = obs or get_obs_manager()
+        self._sent: Frame = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._obs.add_reset_listener(self._on_obs_reset)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Draw a full first frame (forgetting what was sent before), then keep ticking."""
+        await self.stop(final_render=False)
+        self.invalidate()
+        await self.render_now()
+        self._task = asyncio.create_task(self._run(), name=f"FrameRenderer:{self.name}")
+
+    async def stop(self, final_render: bool = True):
+        """Stop ticking; by default draw one last frame so the final state is on screen."""
+        task, self._task = self._task, None
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if final_render:
+            await self.render_now()
+
+    def invalidate(self):
+        """Resend every target on the next frame (e.g. after OBS was changed by hand)."""
+        self._sent.clear()
+        if self.on_reset is not None:
+            self.on_reset()
+
+    def _on_obs_reset(self):
+        # Runs on the OBS client loop; _sent belongs to the loop we render from
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.invalidate)
+
+    async def render_now(self):
+        """Compute one frame and send whatever changed."""
+        self._loop = asyncio.get_running_loop()
+        try:
+            frame = self.compute_frame()
+        except Exception as e:
+            print(f"[FrameRenderer] {self.name} frame error: {e}")
+            return
+        changes = {key: value for key, value in frame.items() if key not in self._sent or self._sent[key] != value}
+        if not changes:
+            return
+
+        # Frames queued while OBS is away replace each other; the one after a
+        # failed frame is complete, so the newest queued frame is all OBS needs
+        batch = self._obs.batch(degraded_key=("frame", self.name))
+        for key, value in changes.items():
+            if not add_to_batch(batch, key, value):
+                print(f"[FrameRenderer] {self.name}: unknown frame target {key}")
+                continue
+            self._sent[key] = value
+        try:
+            await batch.send_async()
+        except Exception as e:
+            # We no longer know what OBS shows; draw everything again next frame
+            self.invalidate()
+            print(f"[FrameRenderer] {self.name} render failed: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_hz
+        next_tick = loop.time() + period
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            await self.render_now()
+            # Fixed rate; if a frame overran (slow OBS), skip the ticks we missed
+            next_tick += period
+            now = loop.time()
+            if next_tick < now:
+                next_tick = now + period
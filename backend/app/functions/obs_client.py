@@ -0,0 +1,225 @@
+# obs_client.py
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from websockets.asyncio.client import connect
+
+# -------------------------------------------------
+# obs-websocket v5 protocol constants
+# -------------------------------------------------
+OBS_SUBPROTOCOL = "obswebsocket.json"
+RPC_VERSION = 1
+
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_REIDENTIFY = 3
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+# Every non high-volume event category (General .. Ui)
+EVENT_SUBSCRIPTION_ALL = 0x7FF
+
+# RequestBatch executionType
+EXECUTION_SERIAL_REALTIME = 0
+EXECUTION_SERIAL_FRAME = 1
+EXECUTION_PARALLEL = 2
+
+EventHandler = Callable[[str, Dict[str, Any]], None]
+
+
+class OBSRequestError(Exception):
+    """Raised when OBS answers a request with a failed requestStatus."""
+
+    def __init__(self, request_type: str, code: int, comment: Optional[str] = None):
+        self.request_type = request_type
+        self.code = code
+        self.comment = comment
+        super().__init__(f"{request_type} failed ({code}): {comment or 'no comment'}")
+
+
+def _auth_string(password: str, salt: str, challenge: str) -> str:
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest()).decode()
+    return base64.b64encode(hashlib.sha256((secret + challenge).encode()).digest()).decode()
+
+
+class AsyncOBSClient:
+    """
+    asyncio-native obs-websocket v5 client.
+    - Requests are written as soon as they are made and matched to their
+      responses by requestId, so any number of them can be in flight at once.
+    - A single reader task resolves pending futures and dispatches events.
+    - All methods must be used from the loop that called connect().
+    """
+
+    def __init__(self, host: str, port: int, password: str = "",
+                 event_subscriptions: int = EVENT_SUBSCRIPTION_ALL):
+        self.host = host
+        self.port = port
+        self.password = password or ""
+        self.event_subscriptions = event_subscriptions
+
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._event_handlers: List[EventHandler] = []
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    def add_event_handler(self, handler: EventHandler):
+        """Register handler(event_type, event_data), called on the client loop for every event."""
+        self._event_handlers.append(handler)
+
+    # ------------- Connection -------------
+
+    async def connect(self):
+        ws = await connect(
+            f"ws://{self.host}:{self.port}",
+            subprotocols=[OBS_SUBPROTOCOL],
+            compression=None,
+            max_size=None,
+        )
+        try:
+            hello = json.loads(await ws.recv())
+            if hello.get("op") != OP_HELLO:
+                raise ConnectionError(f"Expected Hello from OBS, got op {hello.get('op')}")
+
+            identify = {"rpcVersion": RPC_VERSION, "eventSubscriptions": self.event_subscriptions}
+            auth = hello["d"].get("authentication")
+            if auth:
+                identify["authentication"] = _auth_string(self.password, auth["salt"], auth["challenge"])
+            await ws.send(json.dumps({"op": OP_IDENTIFY, "d": identify}))
+
+            identified = json.loads(await ws.recv())
+            if identified.get("op") != OP_IDENTIFIED:
+                raise ConnectionError(f"Expected Identified from OBS, got op {identified.get('op')}")
+        except BaseException:
+            await ws.close()
+            raise
+
+        self._ws = ws
+        self._reader = asyncio.create_task(self._read_loop(ws), name="OBSClientReader")
+
+    async def disconnect(self):
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            await ws.close()
+        if self._reader is not None:
+            try:
+                await self._reader
+            except Exception:
+                pass
+            self._reader = None
+
+    async def wait_closed(self):
+        """Return once the current connection has dropped (or was never made)."""
+        if self._reader is not None:
+            await asyncio.shield(self._reader)
+
+    # ------------- Requests -------------
+
+    async def call(self, request_type: str, request_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Send one request and wait for its response.
+        Returns the responseData dict (empty if OBS sent none).
+        """
+        if not self.connected:
+            raise ConnectionError("Not connected to OBS")
+
+        request_id = str(next(self._ids))
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = fut
+
+        payload: Dict[str, Any] = {"requestType": request_type, "requestId": request_id}
+        if request_data is not None:
+            payload["requestData"] = request_data
+        try:
+            await self._ws.send(json.dumps({"op": OP_REQUEST, "d": payload}))
+            return await fut
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call_batch(self, requests: List[Dict[str, Any]],
+                         execution_type: int = EXECUTION_SERIAL_REALTIME,
+                         halt_on_failure: bool = False) -> List[Dict[str, Any]]:
+        """
+        Send many requests as one RequestBatch and wait for OBS to run them all.
+        :param requests: [{"requestType": str, "requestData"?: dict}, ...]
+        :return: OBS's per-request results, in order
+                 ({"requestType", "requestStatus", "responseData"?}).
+        """
+        if not requests:
+            return []
+        if not self.connected:
+            raise ConnectionError("Not connected to OBS")
+
+        request_id = str(next(self._ids))
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = fut
+
+        payload = {
+            "requestId": request_id,
+            "haltOnFailure": halt_on_failure,
+            "executionType": execution_type,
+            "requests": requests,
+        }
+        try:
+            await self._ws.send(json.dumps({"op": OP_REQUEST_BATCH, "d": payload}))
+            return await fut
+        finally:
+            self._pending.pop(request_id, None)
+
+    # ------------- Internal reader -------------
+
+    async def _read_loop(self, ws):
+        error: BaseException = ConnectionError("OBS connection closed")
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                op = msg.get("op")
+                d = msg.get("d") or {}
+                if op == OP_REQUEST_RESPONSE:
+                    self._resolve_response(d)
+                elif op == OP_REQUEST_BATCH_RESPONSE:
+                    fut = self._pending.get(d.get("requestId"))
+                    if fut is not None and not fut.done():
+                        fut.set_result(d.get("results") or [])
+                elif op == OP_EVENT:
+                    self._dispatch_event(d.get("eventType", ""), d.get("eventData") or {})
+        except Exception as e:
+            error = ConnectionError(f"OBS connection lost: {e}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            # Nothing will ever answer the requests still waiting
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(error)
+            self._pending.clear()
+
+    def _resolve_response(self, d: Dict[str, Any]):
+        fut = self._pending.get(d.get("requestId"))
+        if fut is None or fut.done():
+            return
+        status = d.get("requestStatus") or {}
+        if status.get("result"):
+            fut.set_result(d.get("responseData") or {})
+        else:
+            fut.set_exception(OBSRequestError(d.get("requestType", "?"), status.get("code", 0), status.get("comment")))
+
+    def _dispatch_event(self, event_type: str, event_data: Dict[str, Any]):
+        for handler in self._event_handlers:
+            try:
+                handler(event_type, event_data)
+            except Exception as e:
+                print(f"[OBSClient] event handler error for {event_type}: {e}")
@@ -1,69 +1,786 @@
+import asyncio
+import concurrent.futures
+import itertools
+import threading
 import time
-import sys
-from obswebsocket import obsws, requests  # noqa: E402
-import app.confidentials.dontleak as dontleak
+from collections import OrderedDict
+from app.functions.metrics import counter, gauge, histogram
+from app.functions.obs_client import AsyncOBSClient, OBSRequestError, EXECUTION_PARALLEL, EXECUTION_SERIAL_REALTIME
 
 ##########################################################
 ##########################################################
 
+class OBSUnavailableError(ConnectionError):
+    """OBS can't take requests right now (not connected, or the circuit breaker is open)."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending to an OBS that keeps timing out or dropping the connection.
+    - closed: everything goes through; failure_threshold failures in a row -> open
+    - open: nothing goes through for reset_timeout seconds -> half_open
+    - half_open: one trial request goes through; success -> closed, failure -> open
+    Only used from the OBS client loop, so it needs no lock.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self, now):
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def release_trial(self):
+        """The trial ended without an answer either way (e.g. it was cancelled): allow another."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        """Returns True if this closed a breaker that was open / half-open."""
+        reopened = self.state != self.CLOSED
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+        return reopened
+
+    def record_failure(self, now):
+        """Returns True if this opened a breaker that was closed."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at = now
+            self._trial_in_flight = False
+            return False
+        if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now
+            return True
+        return False
+
+
+def _shadow_slot(request_type, request_data):
+    """
+    Map a write request to (shadow key, value) if its effect can be tracked.
+    Keys: ("text", input) / ("item", scene, sceneItemId) / ("filter", source, filter)
+    """
+    if request_type == "SetInputSettings":
+        settings = request_data.get("inputSettings") or {}
+        if settings.keys() == {"text"}:
+            return ("text", request_data["inputName"]), settings["text"]
+    elif request_type == "SetSceneItemEnabled":
+        return ("item", request_data["sceneName"], request_data["sceneItemId"]), request_data["sceneItemEnabled"]
+    elif request_type == "SetSourceFilterEnabled":
+        return ("filter", request_data["sourceName"], request_data["filterName"]), request_data["filterEnabled"]
+    return None
+
+
+class OBSBatch:
+    """
+    Collects requests and sends them to OBS as one RequestBatch.
+    Build it with OBSWebsocketsManager.batch(), add requests, then send() or await send_async().
+    - parallel=False runs the requests in order within one pass (SerialRealtime).
+    - parallel=True lets OBS run them concurrently on its thread pool (Parallel).
+    - While OBS is unavailable a batch is queued for replay like any other write.
+      Batches sharing a degraded_key replace each other in that queue, so only pass
+      one when every batch with that key is complete on its own.
+    """
+
+    def __init__(self, manager, parallel=False, halt_on_failure=False, degraded_key=None):
+        self._manager = manager
+        self.execution_type = EXECUTION_PARALLEL if parallel else EXECUTION_SERIAL_REALTIME
+        self.halt_on_failure = halt_on_failure
+        self.degraded_key = degraded_key
+        # (request_type, request_data, (scene_name, source_name) or None)
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, request_type, request_data=None):
+        self._items.append((request_type, request_data, None))
+        return self
+
+    def set_scene(self, new_scene):
+        return self.add("SetCurrentProgramScene", {"sceneName": new_scene})
+
+    def set_filter_visibility(self, source_name, filter_name, filter_enabled=True):
+        return self.add("SetSourceFilterEnabled", {"sourceName": source_name, "filterName": filter_name, "filterEnabled": filter_enabled})
+
+    def set_text(self, source_name, new_text):
+        return self.add("SetInputSettings", {"inputName": source_name, "inputSettings": {'text': new_text}})
+
+    # Scene item ids are resolved right before sending
+    def set_source_visibility(self, scene_name, source_name, source_visible=True):
+        self._items.append(("SetSceneItemEnabled", {"sceneName": scene_name, "sceneItemEnabled": source_visible}, (scene_name, source_name)))
+        return self
+
+    def send(self):
+        return self._manager._submit(self._send()).result()
+
+    async def send_async(self):
+        return await self._manager._bridge(self._send())
+
+    async def _send(self):
+        items, self._items = self._items, []
+        if not items:
+            return []
+        try:
+            return await self._send_items(items)
+        except (ConnectionError, TimeoutError):
+            # OBS is unavailable: the whole batch is dropped or queued for replay
+            retry = OBSBatch(self._manager, self.execution_type == EXECUTION_PARALLEL, self.halt_on_failure, self.degraded_key)
+            retry._items = items
+            key = self.degraded_key if self.degraded_key is not None else next(self._manager._degraded_ids)
+            self._manager._degrade(("batch", key), retry._send, "RequestBatch")
+            return []
+
+    async def _send_items(self, items):
+        # Resolve every scene item id concurrently before building the batch
+        keys = list({item_key for _, _, item_key in items if item_key is not None})
+        ids = await asyncio.gather(*[self._manager._get_scene_item_id(scene, source) for scene, source in keys])
+        id_by_key = dict(zip(keys, ids))
+
+        # The shadow only describes a live connection (see OBSWebsocketsManager._write)
+        shadow = self._manager._shadow if self._manager.connected else {}
+        requests = []
+        slots = []
+        for request_type, request_data, item_key in items:
+            if item_key is not None:
+                request_data = {**request_data, "sceneItemId": id_by_key[item_key]}
+            slot = _shadow_slot(request_type, request_data) if request_data is not None else None
+            if slot is not None:
+                key, value = slot
+                # Skip writes that wouldn't change what OBS already shows
+                if key in shadow and shadow[key] == value:
+                    continue
+                shadow[key] = value
+            request = {"requestType": request_type}
+            if request_data is not None:
+                request["requestData"] = request_data
+            requests.append(request)
+            slots.append(slot)
+        if not requests:
+            return []
+
+        results = await self._manager._call_batch_tracked(requests, slots, self.execution_type, self.halt_on_failure)
+        for result in results:
+            status = result.get("requestStatus") or {}
+            if not status.get("result"):
+                print(f"[OBSBatch] {result.get('requestType')} failed ({status.get('code')}): {status.get('comment')}")
+        return results
+
+
+# Reconnect backoff (seconds)
+RECONNECT_MIN_DELAY_SEC = 0.5
+RECONNECT_MAX_DELAY_SEC = 15.0
+# How long the very first request waits for the initial connection attempt
+FIRST_CONNECT_TIMEOUT_SEC = 3.0
+# Default minimum gap between two writes to the same text source (set_text_coalesced)
+TEXT_MIN_INTERVAL_SEC = 0.1
+# Longest we wait for OBS to answer one request (or one RequestBatch)
+REQUEST_TIMEOUT_SEC = 2.0
+# Consecutive timeouts / dropped connections before we stop talking to OBS for a while
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_SEC = 5.0
+# What happens to writes while OBS is unavailable:
+#   "queue" keeps the latest write per target and replays them when OBS is back
+#   "drop"  discards them
+DEGRADED_POLICY = "queue"
+DEGRADED_QUEUE_MAX = 256
+
+# Metrics, labelled by request type ("RequestBatch" for a batch round trip;
+# obs_requests_total counts the requests inside it by their own type)
+OBS_REQUESTS = counter("obs_requests_total", "Requests sent to OBS, by request type.", ("type",))
+OBS_REQUEST_SECONDS = histogram("obs_request_seconds", "OBS round-trip time, by request type.", ("type",))
+OBS_ERRORS = counter("obs_errors_total", "OBS requests that failed, by request type and reason.", ("type", "reason"))
+OBS_DROPPED = counter("obs_dropped_writes_total", "OBS writes dropped while OBS was unavailable, by request type.", ("type",))
+_obs_metrics = {}  # label -> (requests, round trips) children; only touched on the client loop
+
+
+def _metrics_for(label):
+    children = _obs_metrics.get(label)
+    if children is None:
+        children = _obs_metrics[label] = (OBS_REQUESTS.labels(label), OBS_REQUEST_SECONDS.labels(label))
+    return children
+
+
 class OBSWebsocketsManager:
+    """
+    Wraps the asyncio OBS client for the rest of the app.
+    - The client lives on its own event loop thread, so requests from any thread
+      (TTS worker, executor, FastAPI loop) are pipelined over one socket.
+    - Plain methods block until OBS answers, like the old obsws wrapper did.
+      Setters take wait=False to fire the request and return a Future instead.
+    - *_async methods can be awaited from any other event loop without blocking it.
+    - Nothing connects until the first request (or start()); after that a supervisor
+      task keeps reconnecting with backoff.
+    - Every request has a timeout, and a circuit breaker stops sending to an OBS that
+      keeps stalling. While OBS is unavailable, reads fail fast with OBSUnavailableError
+      and writes are queued or dropped (degraded_policy) instead of blocking or raising.
+    Use get_obs_manager() to share one connection across the process.
+    """
     ws = None
-    
-    def __init__(self):
-        # Connect to websockets
-        self.ws = obsws(dontleak.obs_server_ip, dontleak.obs_server_port, dontleak.obs_server_password)
-        try:
-            self.ws.connect()
-        except:
-            print("\nPANIC!!\nCOULD NOT CONNECT TO OBS!\nDouble check that you have OBS open and that your websockets server is enabled in OBS.")
-            time.sleep(10)
-            sys.exit()
-        print("Connected to OBS Websockets!\n")
+
+    def __init__(self, host=None, port=None, password=None,
+                 request_timeout=REQUEST_TIMEOUT_SEC, degraded_policy=DEGRADED_POLICY):
+        self._host, self._port, self._password = host, port, password
+        self.request_timeout = request_timeout
+        self.degraded_policy = degraded_policy
+        self._breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SEC)
+        self._degraded = OrderedDict()   # key -> (label, coroutine function replaying the write)
+        self._degraded_ids = itertools.count(1)
+        self.dropped_writes = 0
+        self._supervisor = None
+        self._first_attempt = None  # asyncio.Event set once the first connect attempt finishes
+        self._stopping = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="OBSClientLoop", daemon=True)
+        self._thread.start()
+
+        # (scene_name, source_name) -> sceneItemId, shared by every module.
+        # Only touched on the client loop, so it needs no lock.
+        self._scene_item_ids = {}
+        self._warmed_scenes = set()
+        self._scene_warmups = {}  # scene_name -> Task running GetSceneItemList
+
+        # Shadow copy of the last text / enabled flags sent to (or reported by) OBS,
+        # used to drop writes that wouldn't change anything. See _shadow_slot().
+        self._shadow = {}
+
+        # Write-behind text layer (see set_text_coalesced): latest value wins per source
+        self._text_pending = {}     # source_name -> newest text not yet sent
+        self._text_last_sent = {}   # source_name -> loop.time() of the last send
+        self._text_timers = {}      # source_name -> TimerHandle for the next send
+
+        # Websocket client; host/port are filled in when we first connect
+        self.ws = AsyncOBSClient(host, port, password or "")
+        self.ws.add_event_handler(self._on_obs_event)
+
+        # Called whenever OBS may no longer show what was sent (see add_reset_listener)
+        self._reset_listeners = []
+
+        gauge("obs_degraded_writes", "OBS writes queued while OBS is unavailable.", lambda: len(self._degraded))
+        gauge("obs_circuit_open", "1 while the OBS circuit breaker is not closed.",
+              lambda: int(self._breaker.state != CircuitBreaker.CLOSED))
+
+    # Begin connecting in the background (requests also do this on first use)
+    def start(self):
+        self._loop.call_soon_threadsafe(self._ensure_supervisor, True)
 
     def disconnect(self):
-        self.ws.disconnect()
+        self._submit(self._shutdown()).result()
+
+    # Disconnect without blocking the calling event loop
+    async def disconnect_async(self):
+        await self._bridge(self._shutdown())
+
+    @property
+    def connected(self):
+        return self.ws.connected
+
+    def add_reset_listener(self, listener):
+        """
+        listener() is called on the OBS client loop whenever OBS may no longer show
+        what was sent: after every (re)connect, and whenever a write is queued or
+        dropped because OBS is unavailable. It must be cheap and thread-safe.
+        """
+        self._reset_listeners.append(listener)
+
+    def remove_reset_listener(self, listener):
+        try:
+            self._reset_listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _notify_reset(self):
+        for listener in list(self._reset_listeners):
+            try:
+                listener()
+            except Exception as e:
+                print(f"[OBS] Reset listener failed: {e}")
+
+    # ------------- Connection supervisor (runs on the client loop) -------------
+
+    def _ensure_supervisor(self, restart=False):
+        if self._first_attempt is None:
+            self._first_attempt = asyncio.Event()
+        if self._stopping and not restart:
+            return  # disconnect() was called; only start() brings the connection back
+        if self._supervisor is None or self._supervisor.done():
+            self._stopping = False
+            self._supervisor = asyncio.ensure_future(self._supervise())
+
+    def _load_settings(self):
+        if self._host is None:
+            # Imported lazily so an explicitly configured manager doesn't need it
+            import app.confidentials.dontleak as dontleak
+            self._host = dontleak.obs_server_ip
+            self._port = dontleak.obs_server_port
+            self._password = dontleak.obs_server_password
+        self.ws.host, self.ws.port, self.ws.password = self._host, self._port, self._password or ""
+
+    async def _supervise(self):
+        delay = RECONNECT_MIN_DELAY_SEC
+        warned = False
+        while not self._stopping:
+            try:
+                self._load_settings()
+                await self.ws.connect()
+            except Exception as e:
+                self._first_attempt.set()
+                if not warned:
+                    print(f"[OBS] Could not connect to OBS ({e}). Is OBS open with its websocket server enabled? Retrying in the background.")
+                    warned = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY_SEC)
+                continue
+
+            delay = RECONNECT_MIN_DELAY_SEC
+            warned = False
+            await self._resync()
+            self._first_attempt.set()
+            print("Connected to OBS Websockets!\n")
+
+            await self.ws.wait_closed()
+            # Whatever OBS showed may change before we're back (resync clears it again)
+            self._shadow.clear()
+            if not self._stopping:
+                print("[OBS] Connection lost, reconnecting...")
+
+    async def _shutdown(self):
+        self._stopping = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        await self.ws.disconnect()
+
+    async def _ready(self):
+        """Make sure a connection exists or is being made; fail fast while OBS is away."""
+        if self.ws.connected:
+            return
+        self._ensure_supervisor()
+        if self._stopping:
+            raise OBSUnavailableError("OBS connection was closed by disconnect()")
+        if not self._first_attempt.is_set():
+            try:
+                await asyncio.wait_for(self._first_attempt.wait(), FIRST_CONNECT_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                pass
+        if not self.ws.connected:
+            raise OBSUnavailableError("OBS is not connected")
+
+    async def _guarded(self, label, make_request):
+        """Run one request/batch with the circuit breaker and request timeout applied."""
+        await self._ready()
+        if not self._breaker.allow(self._loop.time()):
+            OBS_ERRORS.labels(label, "circuit_open").inc()
+            raise OBSUnavailableError(f"OBS circuit breaker is open; skipped {label}")
+        round_trips = _metrics_for(label)[1]
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(make_request(), self.request_timeout)
+        except asyncio.TimeoutError:
+            OBS_ERRORS.labels(label, "timeout").inc()
+            self._record_failure(label, "timed out")
+            raise TimeoutError(f"OBS did not answer {label} within {self.request_timeout}s") from None
+        except OBSRequestError:
+            round_trips.observe(time.perf_counter() - started)
+            OBS_ERRORS.labels(label, "rejected").inc()
+            self._record_success()  # OBS answered, so it's alive
+            raise
+        except ConnectionError as e:
+            OBS_ERRORS.labels(label, "connection").inc()
+            self._record_failure(label, e)
+            raise
+        except Exception as e:
+            # Anything else (a broken reply, a client bug) still means OBS didn't do it.
+            # Cancellation isn't an Exception, so it lands in the finally below only.
+            OBS_ERRORS.labels(label, "error").inc()
+            self._record_failure(label, e)
+            raise
+        finally:
+            # A half-open trial that never got recorded must not block every later request
+            self._breaker.release_trial()
+        round_trips.observe(time.perf_counter() - started)
+        self._record_success()
+        return response
+
+    async def _call(self, request_type, request_data=None):
+        _metrics_for(request_type)[0].inc()
+        return await self._guarded(request_type, lambda: self.ws.call(request_type, request_data))
+
+    # ------------- Degraded mode (runs on the client loop) -------------
+
+    def _record_failure(self, label, error):
+        if self._breaker.record_failure(self._loop.time()):
+            print(f"[OBS] {label} failed ({error}); circuit open, OBS writes are {'queued' if self.degraded_policy == 'queue' else 'dropped'} for {BREAKER_RESET_SEC}s.")
+
+    def _record_success(self):
+        if self._breaker.record_success():
+            print("[OBS] OBS is answering again; circuit closed.")
+            self._replay_degraded()
+
+    def _degrade(self, key, replay, label):
+        """Handle a write OBS couldn't take: remember the latest one per key, or drop it."""
+        if self.degraded_policy == "queue":
+            self._degraded.pop(key, None)  # newest write for a target goes to the back
+            self._degraded[key] = (label, replay)
+            while len(self._degraded) > DEGRADED_QUEUE_MAX:
+                _, (oldest_label, _) = self._degraded.popitem(last=False)
+                self._drop_write(oldest_label)
+        else:
+            self._drop_write(label)
+        self._notify_reset()
+
+    def _drop_write(self, label):
+        self.dropped_writes += 1
+        OBS_DROPPED.labels(label).inc()
+
+    def _replay_degraded(self):
+        if not self._degraded:
+            return
+        pending = [replay for _, replay in self._degraded.values()]
+        self._degraded.clear()
+        print(f"[OBS] Replaying {len(pending)} queued OBS write(s).")
+        for replay in pending:
+            asyncio.ensure_future(self._run_replay(replay))
+
+    async def _run_replay(self, replay):
+        try:
+            await replay()
+        except Exception as e:
+            print(f"[OBS] Replayed write failed: {e}")
+
+    # ------------- Loop bridging -------------
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the OBS client loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _bridge(self, coro):
+        """Await a coroutine on the OBS client loop from another event loop."""
+        return await asyncio.wrap_future(self._submit(coro))
+
+    def _finish(self, coro, wait: bool):
+        fut = self._submit(coro)
+        return fut.result() if wait else fut
+
+    # Send any request and block for its responseData
+    def call(self, request_type, request_data=None):
+        return self._submit(self._call(request_type, request_data)).result()
+
+    # Send any request without blocking the calling event loop
+    async def call_async(self, request_type, request_data=None):
+        return await self._bridge(self._call(request_type, request_data))
+
+    # ------------- Requests (run on the client loop) -------------
+
+    async def _write(self, request_type, request_data):
+        """
+        Send a write request unless the shadow state says OBS already has that value.
+        If OBS is unavailable the write is queued or dropped (see _degrade) instead of raising.
+        """
+        slot = _shadow_slot(request_type, request_data)
+        key = slot[0] if slot is not None else None
+        # While disconnected the shadow describes an OBS we can't see any more; a
+        # skipped write would be lost instead of queued, so only trust it when connected
+        if slot is not None and self.ws.connected and key in self._shadow and self._shadow[key] == slot[1]:
+            return {}
+        try:
+            await self._ready()  # connecting resyncs (clears) the shadow, so do it first
+            if slot is not None:
+                self._shadow[key] = slot[1]
+            return await self._call(request_type, request_data)
+        except (ConnectionError, TimeoutError, OBSRequestError) as e:
+            if key is not None:
+                # We no longer know what OBS shows
+                self._shadow.pop(key, None)
+            if isinstance(e, OBSRequestError):
+                raise
+            self._degrade(key or ("request", next(self._degraded_ids)),
+                          lambda: self._write(request_type, request_data), request_type)
+            return {}
+
+    async def _call_batch_tracked(self, requests, slots, execution_type, halt_on_failure):
+        for request in requests:
+            _metrics_for(request["requestType"])[0].inc()
+        try:
+            results = await self._guarded("RequestBatch", lambda: self.ws.call_batch(requests, execution_type, halt_on_failure))
+        except Exception:
+            for slot in slots:
+                if slot is not None:
+                    self._shadow.pop(slot[0], None)
+            raise
+        # Results can be shorter than requests when haltOnFailure stops the batch
+        for i, slot in enumerate(slots):
+            if slot is None:
+                continue
+            ok = i < len(results) and (results[i].get("requestStatus") or {}).get("result")
+            if not ok:
+                self._shadow.pop(slot[0], None)
+        return results
+
+    async def _resync(self):
+        """
+        Forget everything learned from the previous connection and re-learn
+        the scenes we were using, so caches and shadow state match this OBS.
+        """
+        scenes = list(self._warmed_scenes)
+        self._scene_item_ids.clear()
+        self._warmed_scenes.clear()
+        self._shadow.clear()
+        self._notify_reset()
+        if scenes:
+            try:
+                await self._warm_scenes(scenes)
+            except Exception as e:
+                print(f"[OBS] Could not re-warm scenes after connect: {e}")
+        # Writes queued while OBS was away go out on top of the fresh state
+        self._replay_degraded()
+
+    async def _get_scene_item_id(self, scene_name, source_name):
+        key = (scene_name, source_name)
+        if key in self._scene_item_ids:
+            return self._scene_item_ids[key]
+
+        # First miss in a scene: learn every item in it with one GetSceneItemList
+        if scene_name not in self._warmed_scenes:
+            await self._warm_scene(scene_name)
+            if key in self._scene_item_ids:
+                return self._scene_item_ids[key]
+
+        # Not a direct child of the scene (e.g. inside a group); ask OBS directly
+        response = await self._call("GetSceneItemId", {"sceneName": scene_name, "sourceName": source_name})
+        self._scene_item_ids[key] = response["sceneItemId"]
+        return response["sceneItemId"]
+
+    async def _warm_scene(self, scene_name):
+        # Concurrent misses in the same scene share one GetSceneItemList
+        task = self._scene_warmups.get(scene_name)
+        if task is None:
+            task = asyncio.ensure_future(self._load_scene_items(scene_name))
+            self._scene_warmups[scene_name] = task
+            task.add_done_callback(lambda _: self._scene_warmups.pop(scene_name, None))
+        await asyncio.shield(task)
+
+    async def _load_scene_items(self, scene_name):
+        response = await self._call("GetSceneItemList", {"sceneName": scene_name})
+        for item in response.get("sceneItems", []):
+            self._scene_item_ids[(scene_name, item["sourceName"])] = item["sceneItemId"]
+            if "sceneItemEnabled" in item:
+                self._shadow[("item", scene_name, item["sceneItemId"])] = item["sceneItemEnabled"]
+        self._warmed_scenes.add(scene_name)
+
+    async def _warm_scenes(self, scene_names):
+        await asyncio.gather(*[self._warm_scene(scene) for scene in scene_names])
+
+    # ------------- Write-behind text (runs on the client loop) -------------
+
+    def _queue_text(self, source_name, new_text, min_interval):
+        self._text_pending[source_name] = new_text
+        if source_name in self._text_timers:
+            return  # a send is already scheduled and will pick up this value
+        due = self._text_last_sent.get(source_name, float("-inf")) + min_interval
+        delay = max(0.0, due - self._loop.time())
+        self._text_timers[source_name] = self._loop.call_later(delay, self._send_pending_text, source_name)
+
+    def _send_pending_text(self, source_name):
+        self._text_timers.pop(source_name, None)
+        if source_name in self._text_pending:
+            asyncio.ensure_future(self._write_pending_text(source_name))
+
+    async def _write_pending_text(self, source_name):
+        new_text = self._text_pending.pop(source_name)
+        self._text_last_sent[source_name] = self._loop.time()
+        try:
+            await self._write("SetInputSettings", {"inputName": source_name, "inputSettings": {'text': new_text}})
+        except Exception as e:
+            print(f"[OBS] Failed to update text '{source_name}': {e}")
+
+    async def _flush_text(self, source_names):
+        names = list(self._text_pending) if source_names is None else [n for n in source_names if n in self._text_pending]
+        for name in names:
+            timer = self._text_timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+        await asyncio.gather(*[self._write_pending_text(name) for name in names])
+
+    # ------------- OBS events (run on the client loop) -------------
+
+    def _on_obs_event(self, event_type, data):
+        # Changes made in OBS itself (or by other clients) keep the shadow state honest
+        if event_type == "SceneItemEnableStateChanged":
+            self._shadow[("item", data["sceneName"], data["sceneItemId"])] = data["sceneItemEnabled"]
+        elif event_type == "SourceFilterEnableStateChanged":
+            self._shadow[("filter", data["sourceName"], data["filterName"])] = data["filterEnabled"]
+        elif event_type == "InputSettingsChanged":
+            settings = data.get("inputSettings") or {}
+            if "text" in settings:
+                self._shadow[("text", data["inputName"])] = settings["text"]
+        elif event_type == "SourceFilterNameChanged":
+            self._shadow.pop(("filter", data["sourceName"], data["oldFilterName"]), None)
+        elif event_type == "SourceFilterRemoved":
+            self._shadow.pop(("filter", data["sourceName"], data["filterName"]), None)
+        elif event_type == "SceneItemCreated":
+            self._scene_item_ids[(data["sceneName"], data["sourceName"])] = data["sceneItemId"]
+        elif event_type == "SceneItemRemoved":
+            key = (data["sceneName"], data["sourceName"])
+            if self._scene_item_ids.get(key) == data["sceneItemId"]:
+                del self._scene_item_ids[key]
+            self._shadow.pop(("item", data["sceneName"], data["sceneItemId"]), None)
+        elif event_type == "SceneNameChanged":
+            # A scene can be both a parent of items and an item in another scene
+            self._rename_cached(data["oldSceneName"], data["sceneName"], scene=True, source=True)
+        elif event_type == "InputNameChanged":
+            self._rename_cached(data["oldInputName"], data["inputName"], scene=False, source=True)
+        elif event_type == "SceneRemoved":
+            self._forget_cached(data["sceneName"])
+        elif event_type == "InputRemoved":
+            self._forget_cached(data["inputName"])
+
+    def _rename_cached(self, old_name, new_name, scene, source):
+        renamed = {}
+        for (scene_name, source_name), item_id in list(self._scene_item_ids.items()):
+            new_scene = new_name if scene and scene_name == old_name else scene_name
+            new_source = new_name if source and source_name == old_name else source_name
+            if (new_scene, new_source) != (scene_name, source_name):
+                del self._scene_item_ids[(scene_name, source_name)]
+                renamed[(new_scene, new_source)] = item_id
+        self._scene_item_ids.update(renamed)
+        if scene and old_name in self._warmed_scenes:
+            self._warmed_scenes.discard(old_name)
+            self._warmed_scenes.add(new_name)
+        # Shadow keys are (kind, name, ...): rename text inputs, filter owners and item scenes
+        for key in [k for k in self._shadow if k[1] == old_name]:
+            if key[0] != "item" or scene:
+                self._shadow[(key[0], new_name) + key[2:]] = self._shadow.pop(key)
+
+    def _forget_cached(self, name):
+        for key in [k for k in self._scene_item_ids if name in k]:
+            del self._scene_item_ids[key]
+        self._warmed_scenes.discard(name)
+        for key in [k for k in self._shadow if k[1] == name]:
+            del self._shadow[key]
+
+    async def _set_source_visibility(self, scene_name, source_name, source_visible):
+        try:
+            myItemID = await self._get_scene_item_id(scene_name, source_name)
+        except (ConnectionError, TimeoutError):
+            self._degrade(("visibility", scene_name, source_name),
+                          lambda: self._set_source_visibility(scene_name, source_name, source_visible), "SetSceneItemEnabled")
+            return
+        await self._write("SetSceneItemEnabled", {"sceneName": scene_name, "sceneItemId": myItemID, "sceneItemEnabled": source_visible})
+
+    async def _get_text(self, source_name):
+        response = await self._call("GetInputSettings", {"inputName": source_name})
+        text = response["inputSettings"]["text"]
+        self._shadow[("text", source_name)] = text
+        return text
+
+    async def _get_source_transform(self, scene_name, source_name):
+        myItemID = await self._get_scene_item_id(scene_name, source_name)
+        response = await self._call("GetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": myItemID})
+        return response["sceneItemTransform"]
+
+    async def _set_source_transform(self, scene_name, source_name, new_transform):
+        try:
+            myItemID = await self._get_scene_item_id(scene_name, source_name)
+        except (ConnectionError, TimeoutError):
+            self._degrade(("transform", scene_name, source_name),
+                          lambda: self._set_source_transform(scene_name, source_name, new_transform), "SetSceneItemTransform")
+            return
+        await self._write("SetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": myItemID, "sceneItemTransform": new_transform})
+
+    # ------------- Public API -------------
+
+    # Learn every sceneItemId in these scenes up front (one GetSceneItemList per scene)
+    def warm_scene_item_cache(self, *scene_names):
+        self._submit(self._warm_scenes(scene_names)).result()
+
+    async def warm_scene_item_cache_async(self, *scene_names):
+        await self._bridge(self._warm_scenes(scene_names))
+
+    # Start a RequestBatch; see OBSBatch
+    def batch(self, parallel=False, halt_on_failure=False, degraded_key=None):
+        return OBSBatch(self, parallel, halt_on_failure, degraded_key)
 
     # Set the current scene
-    def set_scene(self, new_scene):
-        self.ws.call(requests.SetCurrentProgramScene(sceneName=new_scene))
+    def set_scene(self, new_scene, wait=True):
+        return self._finish(self._write("SetCurrentProgramScene", {"sceneName": new_scene}), wait)
+
+    async def set_scene_async(self, new_scene):
+        await self._bridge(self._write("SetCurrentProgramScene", {"sceneName": new_scene}))
 
     # Set the visibility of any source's filters
-    def set_filter_visibility(self, source_name, filter_name, filter_enabled=True):
-        self.ws.call(requests.SetSourceFilterEnabled(sourceName=source_name, filterName=filter_name, filterEnabled=filter_enabled))
+    def set_filter_visibility(self, source_name, filter_name, filter_enabled=True, wait=True):
+        return self._finish(self._write("SetSourceFilterEnabled", {"sourceName": source_name, "filterName": filter_name, "filterEnabled": filter_enabled}), wait)
+
+    async def set_filter_visibility_async(self, source_name, filter_name, filter_enabled=True):
+        await self._bridge(self._write("SetSourceFilterEnabled", {"sourceName": source_name, "filterName": filter_name, "filterEnabled": filter_enabled}))
 
     # Set the visibility of any source
-    def set_source_visibility(self, scene_name, source_name, source_visible=True):
-        response = self.ws.call(requests.GetSceneItemId(sceneName=scene_name, sourceName=source_name))
-        myItemID = response.datain['sceneItemId']
-        self.ws.call(requests.SetSceneItemEnabled(sceneName=scene_name, sceneItemId=myItemID, sceneItemEnabled=source_visible))
+    def set_source_visibility(self, scene_name, source_name, source_visible=True, wait=True):
+        return self._finish(self._set_source_visibility(scene_name, source_name, source_visible), wait)
+
+    async def set_source_visibility_async(self, scene_name, source_name, source_visible=True):
+        await self._bridge(self._set_source_visibility(scene_name, source_name, source_visible))
 
     # Returns the current text of a text source
     def get_text(self, source_name):
-        response = self.ws.call(requests.GetInputSettings(inputName=source_name))
-        return response.datain["inputSettings"]["text"]
+        return self._submit(self._get_text(source_name)).result()
 
     # Returns the text of a text source
-    def set_text(self, source_name, new_text):
-        self.ws.call(requests.SetInputSettings(inputName=source_name, inputSettings = {'text': new_text}))
+    def set_text(self, source_name, new_text, wait=True):
+        return self._finish(self._write("SetInputSettings", {"inputName": source_name, "inputSettings": {'text': new_text}}), wait)
+
+    async def set_text_async(self, source_name, new_text):
+        await self._bridge(self._write("SetInputSettings", {"inputName": source_name, "inputSettings": {'text': new_text}}))
+
+    # Write-behind text update: never blocks, merges bursts (latest value wins) and
+    # sends at most once per min_interval for each source. Use this for every write
+    # to a given source, otherwise a queued older value can land after a direct write.
+    def set_text_coalesced(self, source_name, new_text, min_interval=TEXT_MIN_INTERVAL_SEC):
+        self._loop.call_soon_threadsafe(self._queue_text, source_name, new_text, min_interval)
+
+    # Send queued write-behind text right away (all sources, or just the ones named)
+    def flush_text(self, *source_names):
+        self._submit(self._flush_text(source_names or None)).result()
+
+    async def flush_text_async(self, *source_names):
+        await self._bridge(self._flush_text(source_names or None))
 
     def get_source_transform(self, scene_name, source_name):
-        response = self.ws.call(requests.GetSceneItemId(sceneName=scene_name, sourceName=source_name))
-        myItemID = response.datain['sceneItemId']
-        response = self.ws.call(requests.GetSceneItemTransform(sceneName=scene_name, sceneItemId=myItemID))
+        sceneItemTransform = self._submit(self._get_source_transform(scene_name, source_name)).result()
         transform = {}
-        transform["positionX"] = response.datain["sceneItemTransform"]["positionX"]
-        transform["positionY"] = response.datain["sceneItemTransform"]["positionY"]
-        transform["scaleX"] = response.datain["sceneItemTransform"]["scaleX"]
-        transform["scaleY"] = response.datain["sceneItemTransform"]["scaleY"]
-        transform["rotation"] = response.datain["sceneItemTransform"]["rotation"]
-        transform["sourceWidth"] = response.datain["sceneItemTransform"]["sourceWidth"] # original width of the source
-        transform["sourceHeight"] = response.datain["sceneItemTransform"]["sourceHeight"] # original width of the source
-        transform["width"] = response.datain["sceneItemTransform"]["width"] # current width of the source after scaling, not including cropping. If the source has been flipped horizontally, this number will be negative.
-        transform["height"] = response.datain["sceneItemTransform"]["height"] # current height of the source after scaling, not including cropping. If the source has been flipped vertically, this number will be negative.
-        transform["cropLeft"] = response.datain["sceneItemTransform"]["cropLeft"] # the amount cropped off the *original source width*. This is NOT scaled, must multiply by scaleX to get current # of cropped pixels
-        transform["cropRight"] = response.datain["sceneItemTransform"]["cropRight"] # the amount cropped off the *original source width*. This is NOT scaled, must multiply by scaleX to get current # of cropped pixels
-        transform["cropTop"] = response.datain["sceneItemTransform"]["cropTop"] # the amount cropped off the *original source height*. This is NOT scaled, must multiply by scaleY to get current # of cropped pixels
-        transform["cropBottom"] = response.datain["sceneItemTransform"]["cropBottom"] # the amount cropped off the *original source height*. This is NOT scaled, must multiply by scaleY to get current # of cropped pixels
+        transform["positionX"] = sceneItemTransform["positionX"]
+        transform["positionY"] = sceneItemTransform["positionY"]
+        transform["scaleX"] = sceneItemTransform["scaleX"]
+        transform["scaleY"] = sceneItemTransform["scaleY"]
+        transform["rotation"] = sceneItemTransform["rotation"]
+        transform["sourceWidth"] = sceneItemTransform["sourceWidth"] # original width of the source
+        transform["sourceHeight"] = sceneItemTransform["sourceHeight"] # original width of the source
+        transform["width"] = sceneItemTransform["width"] # current width of the source after scaling, not including cropping. If the source has been flipped horizontally, this number will be negative.
+        transform["height"] = sceneItemTransform["height"] # current height of the source after scaling, not including cropping. If the source has been flipped vertically, this number will be negative.
+        transform["cropLeft"] = sceneItemTransform["cropLeft"] # the amount cropped off the *original source width*. This is NOT scaled, must multiply by scaleX to get current # of cropped pixels
+        transform["cropRight"] = sceneItemTransform["cropRight"] # the amount cropped off the *original source width*. This is NOT scaled, must multiply by scaleX to get current # of cropped pixels
+        transform["cropTop"] = sceneItemTransform["cropTop"] # the amount cropped off the *original source height*. This is NOT scaled, must multiply by scaleY to get current # of cropped pixels
+        transform["cropBottom"] = sceneItemTransform["cropBottom"] # the amount cropped off the *original source height*. This is NOT scaled, must multiply by scaleY to get current # of cropped pixels
         return transform
 
     # The transform should be a dictionary containing any of the following keys with corresponding values
@@ -72,22 +789,47 @@ class OBSWebsocketsManager:
     # Note: there are other transform settings, like alignment, etc, but these feel like the main useful ones.
     # Use get_source_transform to see the full list
     def set_source_transform(self, scene_name, source_name, new_transform):
-        response = self.ws.call(requests.GetSceneItemId(sceneName=scene_name, sourceName=source_name))
-        myItemID = response.datain['sceneItemId']
-        self.ws.call(requests.SetSceneItemTransform(sceneName=scene_name, sceneItemId=myItemID, sceneItemTransform=new_transform))
+        self._submit(self._set_source_transform(scene_name, source_name, new_transform)).result()
 
     # Note: an input, like a text box, is a type of source. This will get *input-specific settings*, not the broader source settings like transform and scale
     # For a text source, this will return settings like its font, color, etc
     def get_input_settings(self, input_name):
-        return self.ws.call(requests.GetInputSettings(inputName=input_name))
+        return self.call("GetInputSettings", {"inputName": input_name})
 
     # Get list of all the input types
     def get_input_kind_list(self):
-        return self.ws.call(requests.GetInputKindList())
+        return self.call("GetInputKindList")
 
     # Get list of all items in a certain scene
     def get_scene_items(self, scene_name):
-        return self.ws.call(requests.GetSceneItemList(sceneName=scene_name))
+        return self.call("GetSceneItemList", {"sceneName": scene_name})
+
+
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_obs_manager():
+    """Process-wide OBS connection shared by every module (created on first call)."""
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_manager_lock:
+            if _shared_manager is None:
+                _shared_manager = OBSWebsocketsManager()
+    return _shared_manager
+
+
+def configure_obs_manager(host, port, password=""):
+    """
+    Create the shared OBS connection with explicit settings instead of dontleak's.
+    Must run before anything calls get_obs_manager() (i.e. before importing the game modules).
+    """
+    global _shared_manager
+    with _shared_manager_lock:
+        if _shared_manager is not None:
+            raise RuntimeError("The shared OBS manager already exists; configure it before first use.")
+        _shared_manager = OBSWebsocketsManager(host, port, password)
+    return _shared_manager
 
 
 if __name__ == '__main__':
@@ -0,0 +1,400 @@
+# poll_engine.py
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from app.functions.countdown import COUNTDOWNS, Countdown
+from app.functions.frame_renderer import Frame, FrameRenderer, item_target, text_target
+from app.functions.metrics import counter
+from app.functions.vote_counter import VOTER_IDS, VOTE_CHANGED, VOTE_DUPLICATE, VOTE_NEW, VOTE_STALE, BallotBox, VoteCounter, VoteSnapshot, parse_vote
+from app.functions.vote_series import DEFAULT_CAPACITY_SEC, VoteSeries
+
+RENDER_HZ = 15                       # every running poll is redrawn together at this rate
+
+# Poll.vote() results besides vote_counter's VOTE_NEW / VOTE_CHANGED / VOTE_DUPLICATE / VOTE_STALE
+VOTE_INACTIVE = "inactive"
+VOTE_INVALID = "invalid"
+VOTE_ENDED_POLL = "ended_poll"       # counted, and it pushed an option over end_threshold
+VOTE_RESULTS = (VOTE_NEW, VOTE_CHANGED, VOTE_DUPLICATE, VOTE_STALE, VOTE_INACTIVE, VOTE_INVALID, VOTE_ENDED_POLL)
+
+VOTES = counter("votes_total", "Poll votes by poll and Poll.vote() result.", ("poll", "result"))
+
+
+def fmt_mmss(seconds: int) -> str:
+    m = max(0, seconds) // 60
+    s = max(0, seconds) % 60
+    return f"{m:02d}:{s:02d}"
+
+
+# -------------------------------------------------
+# Renderers: each draws one part of a poll. frame() returns only the
+# targets that changed since its previous frame; reset() forgets what
+# was drawn so the next frame is complete.
+# -------------------------------------------------
+class PollRenderer:
+    def reset(self):
+        pass
+
+    def frame(self, poll: "Poll", snap: VoteSnapshot) -> Frame:
+        return {}
+
+
+class LabelRenderer(PollRenderer):
+    """One text source per option showing its vote count ("Vote 1", "Vote 2", ...)."""
+
+    def __init__(self, template: str = "Vote {i}"):
+        self.template = template
+        self._shown: Optional[Sequence[int]] = None
+
+    def reset(self):
+        self._shown = None
+
+    def frame(self, poll, snap):
+        shown = self._shown
+        frame = {text_target(self.template.format(i=i + 1)): str(c)
+                 for i, c in enumerate(snap.counts) if shown is None or shown[i] != c}
+        self._shown = snap.counts
+        return frame
+
+
+class TimerRenderer(PollRenderer):
+    """Text source showing the poll's time left as MM:SS."""
+
+    def __init__(self, source_name: str):
+        self.source_name = source_name
+        self._shown: Optional[str] = None
+
+    def reset(self):
+        self._shown = None
+
+    def frame(self, poll, snap):
+        text = fmt_mmss(poll.time_left_s or 0)
+        if text == self._shown:
+            return {}
+        self._shown = text
+        return {text_target(self.source_name): text}
+
+
+class TugOfWarRenderer(PollRenderer):
+    """
+    Two-option light bar: the first 'left_on' left circles light from the LEFT and
+    the first 'right_on' right circles from the RIGHT. Reaching the poll's
+    end_threshold fills the bar; at the baseline it shows an even split.
+    Only the circles between the old and new edges are sent, so the cost per
+    frame follows the change, not total_circles.
+    """
+
+    def __init__(self, scene_name: str, left_template: str, right_template: str, total_circles: int,
+                 on_step: Optional[Callable[[int, int], None]] = None):
+        self.scene_name = scene_name
+        self.left_template = left_template
+        self.right_template = right_template
+        self.total_circles = total_circles
+        self.on_step = on_step            # called with (left_on, right_on) whenever the lights move
+        self._left_on = -1
+        self._right_on = -1
+
+    def reset(self):
+        self._left_on = self._right_on = -1
+
+    def light_counts(self, poll: "Poll", snap: VoteSnapshot):
+        """How many left / right circles the tally lights up (whole circles, 0..N)."""
+        N = self.total_circles
+        if poll.filled_by is not None:
+            # Threshold reached: fill the whole line with the winner color
+            return (N, 0) if poll.filled_by == 0 else (0, N)
+
+        if poll.baseline is not None and snap.counts == poll.baseline:
+            # 50/50 baseline; if odd, give the extra to the right end
+            half = N // 2
+            return half, N - half
+
+        # ratios; if no total, stick to 50/50
+        threshold = poll.end_threshold or 1.0
+        if snap.total == 0:
+            t1 = t2 = 0.5
+        else:
+            t1 = snap.ratio(0) / threshold
+            t2 = snap.ratio(1) / threshold
+
+        # Desired counts based on ratios, rounded to what the lights can show
+        return min(N, int(round(t1 * N))), min(N, int(round(t2 * N)))
+
+    def frame(self, poll, snap):
+        N = self.total_circles
+        left_on, right_on = self.light_counts(poll, snap)
+        if left_on == self._left_on and right_on == self._right_on:
+            return {}
+        if self.on_step is not None:
+            self.on_step(left_on, right_on)
+
+        if self._left_on < 0:
+            # Nothing drawn yet: every circle
+            left_range = right_range = range(1, N + 1)
+        else:
+            # Left lights 1..left_on, so only circles between the old and new edge flip
+            left_range = range(min(left_on, self._left_on) + 1, max(left_on, self._left_on) + 1)
+            # Right lights N-right_on+1..N
+            right_range = range(N - max(right_on, self._right_on) + 1, N - min(right_on, self._right_on) + 1)
+
+        frame: Frame = {}
+        for i in left_range:
+            frame[item_target(self.scene_name, self.left_template.format(i=i))] = i <= left_on
+        for i in right_range:
+            frame[item_target(self.scene_name, self.right_template.format(i=i))] = i > (N - right_on)
+
+        self._left_on, self._right_on = left_on, right_on
+        return frame
+
+
+# -------------------------------------------------
+# Polls
+# -------------------------------------------------
+class Poll:
+    """
+    One N-option poll: lock-free counts, one vote per chatter, per-second series,
+    optional timed end (start(duration_s)) and threshold end (end_threshold = share
+    of all votes that wins outright). Drawn by the engine's shared renderer.
+    """
+
+    def __init__(self, name: str, options: int, renderers: Sequence[PollRenderer] = (),
+                 baseline: Optional[Sequence[int]] = None, end_threshold: Optional[float] = None,
+                 on_end: Optional[Callable[["Poll", str, VoteSnapshot], Awaitable[None]]] = None,
+                 series_capacity: int = DEFAULT_CAPACITY_SEC):
+        self.name = name
+        self.options = options
+        self.renderers = list(renderers)
+        self.baseline = tuple(baseline) if baseline is not None else None
+        self.end_threshold = end_threshold
+        self.on_end = on_end              # awaited after every end (manual, timer or threshold)
+
+        self.counter = VoteCounter(options, self.baseline)
+        self.ballots = BallotBox(self.counter)
+        self.series = VoteSeries(options, series_capacity)
+
+        self.active = False
+        self.timer: Optional[Countdown] = None
+        self.ends_at: Optional[float] = None      # wall-clock end of the timer, for the journal
+        self._time_left_s: Optional[int] = None   # time_left_s while no timer is running
+        self.filled_by: Optional[int] = None   # option that hit end_threshold
+        self.final: Optional[VoteSnapshot] = None
+        self.engine: Optional["PollEngine"] = None
+        self._drawing = False             # started, and its final frame isn't drawn yet
+        self._home_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._votes = {result: VOTES.labels(name, result) for result in VOTE_RESULTS}
+
+    @property
+    def time_left_s(self) -> Optional[int]:
+        """Whole seconds left on the timer (None for polls without one, 0 once ended)."""
+        timer = self.timer
+        return timer.seconds_left() if timer is not None else self._time_left_s
+
+    # ------------- Votes (never wait on rendering) -------------
+
+    def parse(self, message: str) -> Optional[int]:
+        return parse_vote(message, self.options)
+
+    def snapshot(self) -> VoteSnapshot:
+        return self.counter.snapshot()
+
+    async def vote(self, option: int, username: Optional[str] = None, platform: Optional[str] = None) -> str:
+        """
+        Count a vote for a 0-based option. With username/platform each chatter gets one
+        vote they can move; repeats return VOTE_DUPLICATE before any other work.
+        """
+        result = await self._vote(option, username, platform)
+        self._votes[result].inc()
+        return result
+
+    async def _vote(self, option: int, username: Optional[str], platform: Optional[str]) -> str:
+        if not self.active:
+            return VOTE_INACTIVE
+        if not 0 <= option < self.options:
+            return VOTE_INVALID
+
+        if username is None:
+            self.counter.add(option)
+            result = VOTE_NEW
+        else:
+            result = self.ballots.vote(VOTER_IDS.intern(platform or "", username), option)
+            if result in (VOTE_DUPLICATE, VOTE_STALE):
+                return result
+
+        if self.end_threshold is not None:
+            snap = self.counter.snapshot()
+            if snap.total:
+                leader = max(range(self.options), key=snap.counts.__getitem__)
+                if snap.ratio(leader) >= self.end_threshold:
+                    if self.filled_by is None:
+                        self.filled_by = leader
+                    await self._on_home_loop(self.end(reason="threshold"))
+                    return VOTE_ENDED_POLL
+        return result
+
+    # ------------- Lifecycle -------------
+
+    async def start(self, duration_s: Optional[int] = None):
+        """Start (or restart) with fresh votes; duration_s counts down and ends the poll."""
+        self.ballots.reset(self.baseline)
+        self.series.reset()
+        self.filled_by = None
+        self.final = None
+        self._home_loop = asyncio.get_running_loop()
+        self.active = True
+        self._drawing = True
+
+        old_timer, self.timer = self.timer, None
+        if old_timer is not None:
+            old_timer.cancel()
+        self._start_timer(int(duration_s) if duration_s is not None else None)
+
+        for renderer in self.renderers:
+            renderer.reset()
+        await self.engine.draw_started()
+
+    def _start_timer(self, duration_s: Optional[float]):
+        self._time_left_s = None
+        self.ends_at = None
+        if duration_s is not None:
+            self.timer = COUNTDOWNS.start(duration_s, self._on_timer_expired, name=f"poll:{self.name}")
+            self.ends_at = time.time() + duration_s
+
+    async def end(self, reason: str = "manual") -> Optional[VoteSnapshot]:
+        """Stop the poll, draw its final frame and return the final tally (None if it wasn't running)."""
+        if not self.active:
+            return None
+        self.active = False
+        snap = self.final = self.counter.snapshot()
+
+        old_timer, self.timer = self.timer, None
+        if old_timer is not None:
+            old_timer.cancel()
+            self._time_left_s = 0
+
+        await self.engine.draw_ended()
+        self._drawing = False
+        if self.on_end is not None:
+            await self.on_end(self, reason, snap)
+        return snap
+
+    # ------------- Crash recovery (see state_journal.py) -------------
+
+    def journal_state(self) -> Optional[dict]:
+        """What a restarted backend needs to carry on with this poll (None when not running)."""
+        if not self.active:
+            return None
+        return {"counts": list(self.counter.snapshot().counts), "ends_at": self.ends_at, "filled_by": self.filled_by}
+
+    async def restore(self, saved: dict) -> Frame:
+        """
+        Carry on with a poll saved by journal_state(): the saved counts become the
+        starting tally and the timer keeps its original end time. Returns the full
+        frame to send; call resume() once it is on screen. Who voted isn't kept,
+        so chatters from before the restart can vote once more.
+        """
+        self.ballots.reset(saved["counts"])
+        self.series.reset()
+        self.filled_by = saved.get("filled_by")
+        self.final = None
+        self._home_loop = asyncio.get_running_loop()
+        self.active = True
+        self._drawing = True
+
+        old_timer, self.timer = self.timer, None
+        if old_timer is not None:
+            old_timer.cancel()
+        ends_at = saved.get("ends_at")
+        self._start_timer(max(0.0, ends_at - time.time()) if ends_at is not None else None)
+        if ends_at is not None:
+            self.ends_at = ends_at
+
+        self.reset_rendered()
+        return self.frame()
+
+    async def resume(self):
+        """Keep drawing after restore(); the frame it returned is already on screen, so this sends nothing new."""
+        await self.engine.draw_started()
+
+    def state(self) -> dict:
+        snap = self.counter.snapshot()
+        return {
+            "active": self.active,
+            "votes": {str(i + 1): c for i, c in enumerate(snap.counts)},
+            "ratios": {str(i + 1): snap.ratio(i) for i in range(self.options)},  # no votes -> even split
+            "time_left_s": self.time_left_s,
+        }
+
+    def frame(self) -> Frame:
+        snap = self.counter.snapshot()
+        self.series.sample(snap.counts)
+        frame: Frame = {}
+        for renderer in self.renderers:
+            frame.update(renderer.frame(self, snap))
+        return frame
+
+    def reset_rendered(self):
+        for renderer in self.renderers:
+            renderer.reset()
+
+    async def _on_timer_expired(self):
+        # A restart swaps in a new timer; only the current one may end the poll
+        if self.active and self.timer is not None and self.timer.expired:
+            await self.end(reason="timer")
+
+    async def _on_home_loop(self, coro):
+        """
+        Run coro on the loop that started the poll. Twitch votes arrive on
+        twitchAPI's own loop, which can't touch the timer/renderer tasks.
+        """
+        loop = asyncio.get_running_loop()
+        if self._home_loop is None or self._home_loop is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._home_loop))
+
+
+class PollEngine:
+    """
+    Runs every poll through one FrameRenderer: each tick merges the frames of the
+    polls on screen into a single OBS batch, so a duel next to a crowd poll is
+    still one batch per tick and a vote never costs more than its own counter.
+    """
+
+    def __init__(self, tick_hz: float = RENDER_HZ, obs=None):
+        self.polls: List[Poll] = []
+        self.renderer = FrameRenderer("polls", self._frame, tick_hz, obs, on_reset=self._reset_rendered)
+
+    def add(self, poll: Poll) -> Poll:
+        poll.engine = self
+        self.polls.append(poll)
+        return poll
+
+    def get(self, name: str) -> Optional[Poll]:
+        return next((poll for poll in self.polls if poll.name == name), None)
+
+    def _frame(self) -> Frame:
+        frame: Frame = {}
+        for poll in self.polls:
+            if poll._drawing:
+                frame.update(poll.frame())
+        return frame
+
+    def _reset_rendered(self):
+        for poll in self.polls:
+            poll.reset_rendered()
+
+    async def draw_started(self):
+        """A poll started: draw its first frame now and make sure the loop is ticking."""
+        if self.renderer.running:
+            await self.renderer.render_now()
+        else:
+            await self.renderer.start()
+
+    async def draw_ended(self):
+        """A poll ended: draw its final frame; stop ticking if nothing else is running."""
+        if any(poll.active for poll in self.polls):
+            await self.renderer.render_now()
+        else:
+            await self.renderer.stop()
+
+
+POLL_ENGINE = PollEngine()
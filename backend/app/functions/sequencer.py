@@ -0,0 +1,153 @@
+# sequencer.py
+import asyncio
+import functools
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+from app.functions.audio_player import audio_length
+from app.functions.frame_renderer import Frame, add_to_batch
+
+
+class Sound(NamedTuple):
+    """Start a sound effect; with wait=True the timeline continues when it has finished."""
+    path: str
+    wait: bool = False
+
+
+class Wait(NamedTuple):
+    seconds: float
+
+
+class Call(NamedTuple):
+    """Run a plain function at this point (e.g. reveal a result on the overlay)."""
+    func: Callable[[], None]
+
+
+# A Frame step ({item_target(...): visible, filter_target(...): enabled, ...})
+# becomes one OBS RequestBatch.
+Step = Union[Frame, Sound, Wait, Call]
+
+
+def _stop_when_loaded(loading: asyncio.Future):
+    """Stop a sound whose playback started after its animation was cancelled."""
+    if not loading.cancelled() and loading.exception() is None and loading.result() is not None:
+        loading.result().stop()
+
+
+class Animation:
+    """Handle for a timeline running in the background: await it, or cancel() it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def cancel(self):
+        """Stop at the current step; sounds it started are stopped too."""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait(self) -> bool:
+        """Wait for the end without cancelling it if we are cancelled; False if it was cancelled."""
+        await asyncio.wait({self._task})
+        return not self._task.cancelled()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+
+class Sequencer:
+    """
+    Runs game animations (sound cues + OBS changes) without making the game API
+    wait for them.
+    - play(group, timeline) builds every OBS batch and learns the scene item ids
+      up front, then runs the steps in a background task and returns the handle.
+    - Animations in the same group (e.g. "crates") run one after another, so a
+      second pick waits for the first drum roll; cancel(group) stops them all.
+    - Waiting steps are plain asyncio sleeps, so cancelling takes effect at once
+      (no thread is stuck in a blocking playback).
+    """
+
+    def __init__(self, obs, audio):
+        self.obs = obs
+        self.audio = audio
+        self._groups: Dict[str, List[Animation]] = {}
+
+    def play(self, group: str, timeline: List[Step], name: Optional[str] = None) -> Animation:
+        animation = Animation(name or group)
+        queue = self._groups.setdefault(group, [])
+        previous = queue[-1] if queue else None
+        queue.append(animation)
+        animation._task = asyncio.create_task(self._run(animation, previous, timeline), name=f"Animation:{animation.name}")
+        animation._task.add_done_callback(lambda _: queue.remove(animation))
+        return animation
+
+    def cancel(self, group: str):
+        for animation in list(self._groups.get(group, ())):
+            animation.cancel()
+
+    def busy(self, group: str) -> bool:
+        return bool(self._groups.get(group))
+
+    # ------------- Running -------------
+
+    def _prepare(self, timeline: List[Step]) -> list:
+        steps = []
+        for step in timeline:
+            if isinstance(step, dict):
+                batch = self.obs.batch()
+                for key, value in step.items():
+                    if not add_to_batch(batch, key, value):
+                        print(f"[Sequencer] Unknown OBS target: {key}")
+                step = batch
+            steps.append(step)
+        return steps
+
+    async def _warm(self, timeline: List[Step]):
+        scenes = {key[1] for step in timeline if isinstance(step, dict) for key in step if key[0] == "item"}
+        if not scenes:
+            return
+        try:
+            await self.obs.warm_scene_item_cache_async(*scenes)
+        except Exception as e:
+            # The batches resolve ids themselves (or get queued) if OBS is away
+            print(f"[Sequencer] Could not pre-resolve scene items: {e}")
+
+    async def _run(self, animation: Animation, previous: Optional[Animation], timeline: List[Step]):
+        steps = self._prepare(timeline)
+        warm = asyncio.create_task(self._warm(timeline))
+        sounds = []
+        loading: Optional[asyncio.Future] = None
+        try:
+            if previous is not None:
+                await previous.wait()
+            await warm
+            loop = asyncio.get_running_loop()
+            for step in steps:
+                if isinstance(step, Wait):
+                    await asyncio.sleep(step.seconds)
+                elif isinstance(step, Sound):
+                    # Starting playback loads the file; keep that off the event loop
+                    play = functools.partial(self.audio.play_audio, step.path, False, False, False)
+                    loading = loop.run_in_executor(None, play)
+                    # shield: a cancel mid-load must not lose the Sound the thread still starts
+                    sounds.append(await asyncio.shield(loading))
+                    loading = None
+                    if step.wait:
+                        await asyncio.sleep(audio_length(step.path) or 0)
+                elif isinstance(step, Call):
+                    step.func()
+                else:
+                    await step.send_async()
+        except asyncio.CancelledError:
+            warm.cancel()
+            if loading is not None:
+                loading.add_done_callback(_stop_when_loaded)
+            for sound in sounds:
+                if sound is not None:
+                    sound.stop()
+            print(f"[Sequencer] {animation.name} cancelled.")
+            raise
+        except Exception as e:
+            print(f"[Sequencer] {animation.name} failed: {e}")
@@ -0,0 +1,241 @@
+# state_journal.py
+import asyncio
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from app.functions.frame_renderer import Frame, add_to_batch
+from app.functions.obs_websocket import get_obs_manager
+
+JOURNAL_DIR = "app/state"
+JOURNAL_HZ = 4                  # how often registered state is checked for changes
+SNAPSHOT_EVERY = 1000           # compact the journal after this many records
+
+# On-disk format (journal.bin and snapshot.bin), a sequence of records:
+#   <u32 payload length> <u32 crc32 of payload> <payload: UTF-8 JSON>
+# Journal payloads are [key, value] (value null = key deleted); the snapshot
+# holds one record with the whole {key: value} state. A torn last record
+# (crash mid-write) fails its length/CRC check and is ignored.
+_HEADER = struct.Struct("<II")
+_STOP = object()
+
+
+def _encode(payload: Any) -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(data), zlib.crc32(data)) + data
+
+
+def _read_records(path: str) -> Iterator[Any]:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, pos)
+        payload = data[pos + _HEADER.size:pos + _HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            print(f"[Journal] {path}: ignoring damaged tail at byte {pos}")
+            return
+        yield json.loads(payload)
+        pos += _HEADER.size + length
+
+
+class StateJournal:
+    """
+    Keeps live show state (characters, polls, duel, crates) on disk so a restarted
+    backend can put the show back where it was.
+    - Modules register(key, save, restore): save() returns the key's JSON-able state
+      (None = nothing to keep); restore(value) puts it back and returns the Frame
+      OBS should show for it.
+    - A loop task compares save() results a few times a second; changed keys go to
+      a writer thread that appends them to the journal, so the loop never touches
+      the disk. Every SNAPSHOT_EVERY records the writer compacts everything into a
+      snapshot and starts an empty journal.
+    - restore() (at startup) reads snapshot + journal, restores every key and sends
+      all their frames to OBS as a single batch.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, tick_hz: float = JOURNAL_HZ,
+                 snapshot_every: int = SNAPSHOT_EVERY, obs=None):
+        self.directory = directory
+        self.tick_hz = tick_hz
+        self.snapshot_every = snapshot_every
+        self._obs = obs
+        self._savers: Dict[str, Callable[[], Any]] = {}
+        self._restorers: Dict[str, Callable[[Any], Awaitable[Optional[Frame]]]] = {}
+        self._resumers: Dict[str, Callable[[], Awaitable[None]]] = {}
+        self._saved: Dict[str, Any] = {}
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, "journal.bin")
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot.bin")
+
+    def register(self, key: str, save: Callable[[], Any], restore: Callable[[Any], Awaitable[Optional[Frame]]],
+                 resume: Optional[Callable[[], Awaitable[None]]] = None):
+        """resume() (optional) runs after the restore batch was sent, e.g. to restart a renderer."""
+        self._savers[key] = save
+        self._restorers[key] = restore
+        if resume is not None:
+            self._resumers[key] = resume
+
+    # ------------- Startup -------------
+
+    def load(self) -> Dict[str, Any]:
+        """The state on disk: snapshot with the journal replayed on top."""
+        state: Dict[str, Any] = {}
+        for snapshot in _read_records(self.snapshot_path):
+            state = snapshot
+        for key, value in _read_records(self.journal_path):
+            if value is None:
+                state.pop(key, None)
+            else:
+                state[key] = value
+        return state
+
+    async def restore(self) -> List[str]:
+        """Put saved state back and resync OBS in one batch. Returns the restored keys."""
+        started = time.perf_counter()
+        state = self.load()
+        self._saved = dict(state)
+
+        restored: List[str] = []
+        frame: Frame = {}
+        for key, value in state.items():
+            restore = self._restorers.get(key)
+            if restore is None:
+                continue
+            try:
+                frame.update(await restore(value) or {})
+                restored.append(key)
+            except Exception as e:
+                print(f"[Journal] restoring '{key}' failed: {e}")
+
+        if frame:
+            batch = (self._obs or get_obs_manager()).batch()
+            for target, value in frame.items():
+                add_to_batch(batch, target, value)
+            try:
+                await batch.send_async()
+            except Exception as e:
+                print(f"[Journal] OBS resync failed: {e}")
+        for key in restored:
+            resume = self._resumers.get(key)
+            if resume is None:
+                continue
+            try:
+                await resume()
+            except Exception as e:
+                print(f"[Journal] resuming '{key}' failed: {e}")
+
+        if restored:
+            print(f"[Journal] Restored {', '.join(restored)} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return restored
+
+    def start(self):
+        """Start the writer thread and the change-tracking task (after restore())."""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, args=(dict(self._saved),),
+                                            name="StateJournalWriter", daemon=True)
+            self._writer.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="StateJournal")
+
+    def stop(self):
+        """Record the latest state, stop writing and leave a fresh snapshot behind."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.sample()
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join(timeout=5)
+            self._writer = None
+
+    # ------------- Change tracking (loop) -------------
+
+    def sample(self):
+        """Queue every registered key whose state changed since it was last written."""
+        for key, save in list(self._savers.items()):
+            try:
+                value = save()
+            except Exception as e:
+                print(f"[Journal] saving '{key}' failed: {e}")
+                continue
+            if value is None:
+                if key in self._saved:
+                    del self._saved[key]
+                    self._queue.put((key, None))
+            elif key not in self._saved or self._saved[key] != value:
+                self._saved[key] = value
+                self._queue.put((key, value))
+
+    async def _run(self):
+        period = 1.0 / self.tick_hz
+        while True:
+            await asyncio.sleep(period)
+            self.sample()
+
+    # ------------- Writer thread -------------
+
+    def _write_loop(self, state: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        journal = open(self.journal_path, "ab")
+        written = 0
+        try:
+            while True:
+                items = [self._queue.get()]
+                while True:  # write everything that piled up in one go
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = _STOP in items
+                records = [item for item in items if item is not _STOP]
+                for key, value in records:
+                    if value is None:
+                        state.pop(key, None)
+                    else:
+                        state[key] = value
+                journal.write(b"".join(_encode(record) for record in records))
+                journal.flush()
+                written += len(records)
+
+                if stop or written >= self.snapshot_every:
+                    journal.close()
+                    self._write_snapshot(state)
+                    journal = open(self.journal_path, "wb")
+                    written = 0
+                if stop:
+                    return
+        except Exception as e:
+            print(f"[Journal] writer stopped: {e}")
+        finally:
+            journal.close()
+
+    def _write_snapshot(self, state: Dict[str, Any]):
+        # Write-then-rename so a crash leaves either the old or the new snapshot.
+        # Until the journal is truncated, replaying it on top is harmless: records
+        # only ever replace whole values.
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_encode(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+
+
+JOURNAL = StateJournal()
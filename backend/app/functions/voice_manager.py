@@ -2,9 +2,16 @@ import threading
 import queue
 import time
 from app.functions.audio_player import AudioManager
-from app.functions.obs_websocket import OBSWebsocketsManager
+from app.functions.metrics import SLOW_BUCKETS, gauge, histogram
+from app.functions.obs_websocket import get_obs_manager
 from app.functions.text_to_speech import TTSManager
 
+TTS_STAGE_SECONDS = histogram("tts_stage_seconds", "Time per TTS job stage (queue_wait, synth, play).",
+                              ("stage",), buckets=SLOW_BUCKETS)
+_queue_wait = TTS_STAGE_SECONDS.labels("queue_wait")
+_synth_time = TTS_STAGE_SECONDS.labels("synth")
+_play_time = TTS_STAGE_SECONDS.labels("play")
+
 
 class VoiceManager:
     """
@@ -15,22 +22,38 @@ class VoiceManager:
     """
 
     def __init__(self, start_message: str = "The Chat Conference App is now running!"):
-        self.tts_manager = TTSManager()
-        self.audio_manager = AudioManager()
-        self.obswebsockets_manager = OBSWebsocketsManager()
+        self.start_message = start_message
+        self.tts_manager = None
+        self.audio_manager = None
+        self.obswebsockets_manager = get_obs_manager()
 
         # Thread-safe FIFO queue of playback jobs
         self._queue: "queue.Queue[dict]" = queue.Queue()
 
         # Event to allow graceful shutdown if needed
         self._stop_event = threading.Event()
+        self._worker = None
+
+        gauge("tts_queue_depth", "TTS jobs waiting to be spoken.", self._queue.qsize)
+
+    def start(self):
+        """
+        Load the TTS model and start the playback thread. Only the worker that
+        runs the show calls this (see worker_role.py); the others never speak.
+        """
+        if self._worker is not None and self._worker.is_alive():
+            return
+        if self.tts_manager is None:
+            self.tts_manager = TTSManager()
+            self.audio_manager = AudioManager()
+        self._stop_event.clear()
 
         # Start the worker thread
         self._worker = threading.Thread(target=self._worker_loop, name="VoiceManagerWorker", daemon=True)
         self._worker.start()
 
         # Enqueue the startup message instead of playing immediately
-        self.text_to_audio(start_message, user_number=0, voice_name=None)
+        self.text_to_audio(self.start_message, user_number=0, voice_name=None)
 
     def text_to_audio(self, text, user_number: int, voice_name: str | None):
         """
@@ -42,7 +65,8 @@ class VoiceManager:
         job = {
             "text": text,
             "user_number": user_number,
-            "voice_name": voice_name
+            "voice_name": voice_name,
+            "queued_at": time.monotonic(),
         }
         self._queue.put(job)
 
@@ -79,6 +103,8 @@ class VoiceManager:
                 text = job["text"]
                 user_number = job["user_number"]
                 voice_name = job["voice_name"]
+                started = time.monotonic()
+                _queue_wait.observe(started - job["queued_at"])
 
                 # 1) TTS synthesis
                 try:
@@ -89,6 +115,7 @@ class VoiceManager:
                 except Exception as e:
                     print(f"[VoiceManager] TTS error: {e}")
                     continue  # will hit 'finally' and task_done()
+                _synth_time.observe(time.monotonic() - started)
 
                 # 2) OBS filter ON
                 filter_name = f"Audio Move - Character {user_number}"
@@ -99,7 +126,9 @@ class VoiceManager:
 
                 # 3) Play audio (blocking)
                 try:
+                    started = time.monotonic()
                     self.audio_manager.play_audio(tts_file, True, True, False)
+                    _play_time.observe(time.monotonic() - started)
                 except Exception as e:
                     print(f"[VoiceManager] Error playing audio: {e}")
                 finally:
@@ -129,4 +158,5 @@ class VoiceManager:
             except Exception:
                 pass
         self._stop_event.set()
-        self._worker.join(timeout=timeout)
\ No newline at end of file
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
\ No newline at end of file
@@ -0,0 +1,185 @@
+# vote_counter.py
+import sys
+import threading
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class VoteSnapshot(NamedTuple):
+    """Vote totals at one point in time. counts[i] is option i (0-based)."""
+    counts: Tuple[int, ...]
+    total: int
+    generation: int
+
+    def ratio(self, option: int) -> float:
+        """Share of the votes for one option (an even split if nobody voted yet)."""
+        if self.total == 0:
+            return 1.0 / len(self.counts)
+        return self.counts[option] / self.total
+
+
+class VoteCounter:
+    """
+    Vote tallies for one poll, indexed by option number (0-based).
+    - Counts live in array('q') shards, one per thread that votes. Only the owning
+      thread writes its shard, so add() takes no lock and never awaits. (Twitch chat
+      callbacks run on twitchAPI's own thread, TikTok's on the main loop.)
+    - snapshot() sums the shards into an immutable VoteSnapshot; readers never
+      block voters.
+    - reset() starts a new generation. Shards from the previous generation are
+      dropped, so a vote racing a reset can't leak into the new poll.
+    """
+
+    def __init__(self, options: int, baseline: Optional[Sequence[int]] = None):
+        self.options = int(options)
+        self._local = threading.local()
+        self._register_lock = threading.Lock()  # only taken the first time a thread votes in a generation
+        # (generation, baseline, shards), swapped as one tuple so readers never mix two polls
+        self._state: Tuple[int, Tuple[int, ...], List[array]] = (0, (0,) * self.options, [])
+        self.reset(baseline)
+
+    @property
+    def generation(self) -> int:
+        return self._state[0]
+
+    def reset(self, baseline: Optional[Sequence[int]] = None):
+        """Zero every option (or start from baseline counts) for a new poll."""
+        if baseline is not None and len(baseline) != self.options:
+            raise ValueError(f"baseline needs {self.options} counts, got {len(baseline)}")
+        counts = tuple(int(c) for c in baseline) if baseline is not None else (0,) * self.options
+        with self._register_lock:
+            self._state = (self._state[0] + 1, counts, [])
+
+    def _shard(self) -> array:
+        local = self._local
+        generation, _, shards = self._state
+        if getattr(local, "generation", None) != generation:
+            shard = array("q", bytes(8 * self.options))
+            with self._register_lock:
+                shards.append(shard)
+            local.shard, local.generation = shard, generation
+        return local.shard
+
+    def add(self, option: int, amount: int = 1, generation: Optional[int] = None) -> bool:
+        """
+        Count amount votes for option. Raises IndexError for an unknown option.
+        With generation, the vote is dropped (False) if a reset started another one.
+        """
+        if not 0 <= option < self.options:
+            raise IndexError(f"vote option {option} out of range 0..{self.options - 1}")
+        shard = self._shard()
+        if generation is not None and self._local.generation != generation:
+            return False
+        # A reset from here on leaves this shard in the old generation, so the vote is dropped with it
+        shard[option] += amount
+        return True
+
+    def count(self, option: int) -> int:
+        """Current total for one option."""
+        _, baseline, shards = self._state
+        return baseline[option] + sum(shard[option] for shard in list(shards))
+
+    def snapshot(self) -> VoteSnapshot:
+        """Consistent copy of every total (plus the generation it belongs to)."""
+        generation, baseline, shards = self._state
+        counts = list(baseline)
+        for shard in list(shards):
+            for i, c in enumerate(shard):
+                counts[i] += c
+        return VoteSnapshot(tuple(counts), sum(counts), generation)
+
+
+# -------------------------------------------------
+# One vote per user
+# -------------------------------------------------
+class VoterIds:
+    """
+    Interns (platform, username) pairs into small ints, shared by every poll.
+    Looking up a known voter takes no lock; only the first sighting of a name does.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, platform: str, username: str) -> int:
+        key = (platform, username)
+        voter_id = self._ids.get(key)
+        if voter_id is None:
+            with self._lock:
+                voter_id = self._ids.setdefault((sys.intern(platform), sys.intern(username)), len(self._ids))
+        return voter_id
+
+
+VOTER_IDS = VoterIds()
+
+VOTE_NEW = "new"
+VOTE_CHANGED = "changed"
+VOTE_DUPLICATE = "duplicate"
+VOTE_STALE = "stale"            # the poll was reset while the vote was being cast; nothing counted
+
+
+class BallotBox:
+    """
+    Remembers each voter's current choice for one poll and keeps a VoteCounter in step.
+    - One byte per interned voter id (0 = hasn't voted, else option + 1), so 50k
+      voters cost ~50 KB and a lookup is one index.
+    - Voting again for another option moves the vote; repeating the same option is a
+      duplicate and touches nothing.
+    - A voter id always comes from one platform, and each platform's chat runs on one
+      thread, so a voter's byte is only ever written by one thread.
+    - The ballots and the counter generation they belong to are swapped as one tuple
+      on reset(); a vote that started before a reset is dropped (VOTE_STALE), so its
+      ballot can't be lost while its count lands in the new poll.
+    """
+
+    def __init__(self, counter: VoteCounter):
+        if counter.options > 255:
+            raise ValueError("BallotBox supports at most 255 options")
+        self.counter = counter
+        self._state: Tuple[bytearray, int] = (bytearray(), counter.generation)  # (choices, counter generation)
+
+    def reset(self, baseline: Optional[Sequence[int]] = None):
+        """New poll: forget every ballot and reset the counter."""
+        self.counter.reset(baseline)
+        self._state = (bytearray(), self.counter.generation)
+
+    @property
+    def voters(self) -> int:
+        choices = self._state[0]
+        return len(choices) - choices.count(0)
+
+    def choice(self, voter_id: int) -> Optional[int]:
+        """Option this voter currently backs, or None."""
+        choices = self._state[0]
+        return choices[voter_id] - 1 if voter_id < len(choices) and choices[voter_id] else None
+
+    def vote(self, voter_id: int, option: int) -> str:
+        """Cast or change a ballot. Returns VOTE_NEW, VOTE_CHANGED, VOTE_DUPLICATE or VOTE_STALE."""
+        if not 0 <= option < self.counter.options:
+            raise IndexError(f"vote option {option} out of range 0..{self.counter.options - 1}")
+        choices, generation = self._state
+        if voter_id >= len(choices):
+            choices.extend(bytes(max(voter_id + 1 - len(choices), len(choices))))  # grow by doubling
+        previous = choices[voter_id] - 1
+        if previous == option:
+            return VOTE_DUPLICATE
+        choices[voter_id] = option + 1
+        if not self.counter.add(option, generation=generation):
+            return VOTE_STALE  # the ballot went into the discarded box with it
+        if previous < 0:
+            return VOTE_NEW
+        self.counter.add(previous, -1, generation)
+        return VOTE_CHANGED
+
+
+def parse_vote(message: str, options: int) -> Optional[int]:
+    """Chat message "1".."options" -> 0-based option index, anything else -> None."""
+    text = message.strip()
+    if not text.isdigit():
+        return None
+    option = int(text) - 1
+    return option if 0 <= option < options else None
@@ -0,0 +1,86 @@
+# vote_series.py
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+DEFAULT_CAPACITY_SEC = 900      # 15 minutes of history per poll
+DEFAULT_WINDOW_SEC = 5          # velocity / momentum look-back
+
+
+class VoteSeries:
+    """
+    Per-option vote totals, one row per second, in a fixed-size NumPy ring buffer.
+    - Memory is capacity x options int64 no matter how many votes arrive; only the
+      running totals are sampled, never individual votes.
+    - sample() can be called as often as you like (e.g. every render frame); it
+      only writes when a new second starts and forward-fills seconds nobody sampled.
+    - velocity()/momentum() are vectorized over every option at once.
+    """
+
+    def __init__(self, options: int, capacity: int = DEFAULT_CAPACITY_SEC, resolution: float = 1.0):
+        self.options = int(options)
+        self.capacity = int(capacity)
+        self.resolution = float(resolution)
+        self._buf = np.zeros((self.capacity, self.options), dtype=np.int64)
+        self.reset()
+
+    def reset(self, start_time: Optional[float] = None):
+        """Start a new series (call when the poll starts)."""
+        self._buf.fill(0)
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self._last = -1          # index (seconds since start) of the newest row
+
+    def __len__(self) -> int:
+        """Rows currently held (at most capacity)."""
+        return min(self._last + 1, self.capacity)
+
+    def sample(self, counts: Sequence[int], now: Optional[float] = None):
+        """Record the current totals for the second that 'now' falls in."""
+        now = time.monotonic() if now is None else now
+        second = int((now - self.start_time) // self.resolution)
+        if second < self._last:
+            return  # clock went backwards relative to start; ignore
+        if second > self._last + 1:
+            # Nobody sampled for a while: totals didn't change in those seconds
+            gap = np.arange(max(self._last + 1, second - self.capacity + 1), second) % self.capacity
+            self._buf[gap] = self._buf[self._last % self.capacity] if self._last >= 0 else counts
+        self._buf[second % self.capacity] = counts
+        self._last = second
+
+    def window(self, seconds: Optional[int] = None) -> np.ndarray:
+        """The newest rows (all held rows by default), oldest first, shape (rows, options)."""
+        held = len(self)
+        rows = held if seconds is None else max(0, min(int(seconds), held))
+        idx = np.arange(self._last - rows + 1, self._last + 1) % self.capacity
+        return self._buf[idx]
+
+    def velocity(self, window: int = DEFAULT_WINDOW_SEC) -> np.ndarray:
+        """Votes per second for each option over the last 'window' seconds."""
+        rows = self.window(window + 1)
+        if len(rows) < 2:
+            return np.zeros(self.options)
+        return (rows[-1] - rows[0]) / ((len(rows) - 1) * self.resolution)
+
+    def momentum(self, window: int = DEFAULT_WINDOW_SEC) -> np.ndarray:
+        """
+        Change in votes per second: velocity over the last 'window' seconds minus
+        velocity over the 'window' seconds before that. Positive = surging.
+        """
+        rows = self.window(2 * window + 1)
+        if len(rows) < 3:
+            return np.zeros(self.options)
+        rates = np.diff(rows, axis=0) / self.resolution
+        half = len(rates) // 2
+        return rates[half:].mean(axis=0) - rates[:half].mean(axis=0)
+
+    def to_dict(self, seconds: Optional[int] = None, window: int = DEFAULT_WINDOW_SEC) -> dict:
+        """JSON-friendly view for state endpoints and post-poll stats."""
+        rows = self.window(seconds)
+        return {
+            "resolution_s": self.resolution,
+            "first_second": self._last - len(rows) + 1,
+            "counts": rows.tolist(),
+            "velocity": self.velocity(window).tolist(),
+            "momentum": self.momentum(window).tolist(),
+        }
@@ -3,22 +3,45 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.routes import app_router
 import asyncio
 from app.chatbot import run_twitch_bot, run_tiktok_bot
+from app.functions.obs_websocket import get_obs_manager
+from app.functions.state_journal import JOURNAL
+from app.Chat_Manager import VOICE_MANAGER
+from app.worker_role import ROLE
 from contextlib import asynccontextmanager
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Start background tasks
-    tiktok_task = asyncio.create_task(run_tiktok_bot())
-    twitch_task = asyncio.create_task(run_twitch_bot())
+# Several workers (uvicorn --workers N) need a shared store: STATE_STORE=sqlite
+# (see state_store.py). One of them runs the show, the rest serve websockets.
+_show_tasks = []
+
+async def start_show():
+    """Everything only one worker may do: OBS, the journal, TTS and the chat bots."""
+    get_obs_manager().start()  # connects (and reconnects) in the background
+    await JOURNAL.restore()    # pick the show back up after a crash / restart
+    JOURNAL.start()
+    await asyncio.to_thread(VOICE_MANAGER.start)  # loads the TTS model
+    _show_tasks.append(asyncio.create_task(run_tiktok_bot()))
+    _show_tasks.append(asyncio.create_task(run_twitch_bot()))
 
     print("✅ Bots started via lifespan")
 
+async def stop_show():
+    for task in _show_tasks:
+        task.cancel()
+    _show_tasks.clear()
+    JOURNAL.stop()
+    await asyncio.to_thread(VOICE_MANAGER.stop)  # waits for the message being spoken
+    await get_obs_manager().disconnect_async()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background tasks (only in the worker that runs the show)
+    await ROLE.start(start_show, stop_show)
+
     yield  # App is running here
 
     # Optional: Cleanup logic
     print("🛑 Shutting down...")
-    tiktok_task.cancel()
-    twitch_task.cancel()
+    await ROLE.stop()
 
 app = FastAPI(lifespan=lifespan)
 
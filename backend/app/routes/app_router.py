@@ -1,69 +1,106 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import asyncio
-from collections import defaultdict
-from typing import Optional, Dict, Set
-
-from app.Chat_Manager import (
-    pick_character, set_character, remove_character,
-    reset_all_pools, reset_character_pool, update_character_voice_style,
-    mute_character_tts, message_as_character,
-)
-from app.functions.ChanceGames import shoot_gun, flip_gun, hide_gun, start_crates_game, select_crate, reset_crates
-from app.functions.poll_manager import start_poll, end_poll, hide_poll
-from app.functions.Duel_poll_manager import start_duel_poll, end_duel_poll, hide_duel_poll
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from app.control_channel import CONTROL, ControlConnection, ControlError, envelope
+from app.functions.client_queue import QueuedSender
+from app.functions.fast_json import dumps, loads
+from app.functions.metrics import METRICS
+from app.routes import control_routes  # noqa: F401  (registers the command handlers)
+from app.websocket_manager import HUB, HubClient
 
 router = APIRouter()
 
 # ------------------------------------------------------------------------------
-# Shared registry for character control (supports multiple concurrent UIs)
+# Metrics for Prometheus (or curl): chat, TTS, OBS, audio, votes and websockets.
+# With several workers each one reports its own process.
 # ------------------------------------------------------------------------------
-# Track which websockets are controlling / watching which character
-_conn_by_char: Dict[int, Set[WebSocket]] = defaultdict(set)
 
-# Serialize operations per character to avoid race conditions
-_locks_by_char: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
+# ------------------------------------------------------------------------------
+# Multiplexed control channel: one socket per control UI for every command
+# ------------------------------------------------------------------------------
 
-async def _broadcast_to_char(char: int, payload: dict):
+@router.websocket("/ws/control")
+async def ws_control(websocket: WebSocket):
     """
-    Send a message to all clients currently connected for a given character.
-    Removes dead sockets on send failure.
+    Single control socket; see control_channel.py for the envelope.
+
+    Client -> Server:
+      { "topic": "poll" | "duel" | "gun" | "tts" | "crates" | "characters" | "character:<n>",
+        "type": "<command>", "id": any, "payload": {...} }
+      { "topic": "control", "type": "subscribe" | "unsubscribe", "id": any, "payload": { "topics": [str] } }
+
+    Server -> Client:
+      { "topic": str, "type": "ok" | "error", "id": <request id>, "payload": {...} }   reply to each command (as each one finishes)
+      { "topic": str, "type": str, "id": null, "seq": int, "payload": ... }             snapshot + state/events on subscribed topics
+    Commands run concurrently, so replies can arrive out of order; match them by id.
+    Commands are listed in routes/control_routes.py; topics in websocket_manager.py.
     """
-    dead: list[WebSocket] = []
-    for ws in list(_conn_by_char.get(char, ())):
-        try:
-            await ws.send_json(payload)
-            print(f"[Broadcast] Sent to character {char}: {payload}")
-        except Exception:
-            print(f"[Broadcast] Failed to send to character {char}, removing dead socket.")
-            dead.append(ws)
-    for ws in dead:
-        print(f"[Broadcast] Removing dead socket for character {char}.")
-        _conn_by_char[char].discard(ws)
+    await websocket.accept()
+    conn = ControlConnection(websocket)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = loads(text)
+            except ValueError:
+                conn.send(envelope("", "error", {"message": "Invalid JSON"}))
+                continue
+            await conn.spawn(CONTROL.handle(conn, message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        conn.close()
 
 
 # ------------------------------------------------------------------------------
-# Existing endpoints (kept for compatibility) with safer exception logging
+# Older single-purpose routes (kept for compatibility): each one translates its
+# message format to a control command and the reply back. Replies go through a
+# QueuedSender named after the route, so these clients show up in ws_clients.
 # ------------------------------------------------------------------------------
 
+def _reply(client: QueuedSender, message: dict):
+    client.put(message)
+
+
+async def _status_reply(client: QueuedSender, topic: str, command: Optional[str], invalid: str):
+    try:
+        reply = await CONTROL.call(topic, command or "")
+        _reply(client, {"status": reply["status"]})
+    except ControlError:
+        _reply(client, {"status": invalid})
+
+
 @router.websocket("/ws/pick_character")
 async def ws_pick_character(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "pick_character client")
     last_char: Optional[int] = None
     try:
         while True:
             data = await websocket.receive_json()
             last_char = data.get("character_number")
             platform = data.get("platform")
-            username = await pick_character(last_char, platform)
-            await websocket.send_json({"character": last_char, "username": username, "platform": platform})
+            try:
+                reply = await CONTROL.call(f"character:{last_char}", "pick", {"platform": platform})
+            except ControlError as e:
+                _reply(client, {"status": str(e)})
+                continue
+            _reply(client, {"character": last_char, "username": reply["username"], "platform": platform})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while picking character {last_char}. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/set_character")
 async def ws_set_character(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "set_character client")
     last_char: Optional[int] = None
     try:
         while True:
@@ -71,75 +108,93 @@ async def ws_set_character(websocket: WebSocket):
             last_char = data.get("character_number")
             username = data.get("username")
             platform = data.get("platform")
-            await set_character(last_char, username, platform)
-            await websocket.send_json({"character": last_char, "username": username, "platform": platform})
+            try:
+                await CONTROL.call(f"character:{last_char}", "set", {"username": username, "platform": platform})
+            except ControlError as e:
+                _reply(client, {"status": str(e)})
+                continue
+            _reply(client, {"character": last_char, "username": username, "platform": platform})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while setting character {last_char}. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/mute_tts")
 async def ws_mute_tts(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "mute_tts client")
     try:
         while True:
             data = await websocket.receive_json()
             mute = data.get("mute")
             print(f"Received mute command: {mute}")
-            status = await mute_character_tts(mute)
-            await websocket.send_json({"status": status})
+            try:
+                reply = await CONTROL.call("tts", "mute", {"mute": mute})
+            except ControlError as e:
+                _reply(client, {"status": str(e)})
+                continue
+            _reply(client, {"status": reply["status"]})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while muting TTS. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/shoot_gun")
 async def ws_shoot_gun(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "shoot_gun client")
     try:
         while True:
             data = await websocket.receive_json()
             gun_action = data.get("command")
             print(f"Received gun action: {gun_action}")
-            if gun_action == "shoot":
-                result = await shoot_gun()
-                await websocket.send_json({"status": result})
-            elif gun_action == "flip":
-                result = await flip_gun()
-                await websocket.send_json({"status": result})
-            elif gun_action == "hide":
-                result = await hide_gun()
-                await websocket.send_json({"status": result})
-            else:
-                await websocket.send_json({"status": "Invalid action"})
+            await _status_reply(client, "gun", gun_action, "Invalid action")
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while shooting gun. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/reset_characters")
 async def ws_reset_characters(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "reset_characters client")
     try:
         while True:
             await websocket.receive_text()  # any message triggers reset
-            for number in range(1, 11):  # MAX_CHARACTERS is 10
-                await remove_character(number)
-            await websocket.send_json({"status": "characters_reset"})
+            try:
+                reply = await CONTROL.call("characters", "reset")
+            except ControlError as e:
+                _reply(client, {"status": str(e)})
+                continue
+            _reply(client, {"status": reply["status"]})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while resetting characters. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/reset_character")
 async def ws_reset_character(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "reset_character client")
     last_char: Optional[int] = None
     try:
         while True:
             data = await websocket.receive_json()
             last_char = data.get("character_number")
-            await remove_character(last_char)
-            await reset_character_pool(last_char)
-            await websocket.send_json({"status": f"character_{last_char}_reset"})
+            try:
+                reply = await CONTROL.call(f"character:{last_char}", "reset")
+            except ControlError as e:
+                _reply(client, {"status": str(e)})
+                continue
+            _reply(client, {"status": reply["status"]})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while resetting character {last_char}. Error:  {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/set_voice_style")
@@ -149,6 +204,7 @@ async def ws_set_voice_style(websocket: WebSocket):
     Expects: { "character_number": int, "voice_style": "af_bella" }
     """
     await websocket.accept()
+    client = QueuedSender(websocket, "set_voice_style client")
     last_char: Optional[int] = None
     try:
         while True:
@@ -156,12 +212,18 @@ async def ws_set_voice_style(websocket: WebSocket):
             last_char = data.get("character_number")
             voice_style = data.get("voice_style")
             if last_char and voice_style:
-                await update_character_voice_style(last_char, voice_style)
-                await websocket.send_json({"status": "ok", "character_number": last_char, "voice_style": voice_style})
+                try:
+                    await CONTROL.call(f"character:{last_char}", "voice", {"voice_style": voice_style})
+                except ControlError as e:
+                    _reply(client, {"status": str(e)})
+                    continue
+                _reply(client, {"status": "ok", "character_number": last_char, "voice_style": voice_style})
             else:
-                await websocket.send_json({"status": "error", "detail": "Invalid character_number or voice_style"})
+                _reply(client, {"status": "error", "detail": "Invalid character_number or voice_style"})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while setting voice style for character {last_char}. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/message_as_character")
@@ -171,6 +233,7 @@ async def ws_message_as_character(websocket: WebSocket):
     Expects: { "character_number": int, "alias": str, "message": str }
     """
     await websocket.accept()
+    client = QueuedSender(websocket, "message_as_character client")
     last_char: Optional[int] = None
     try:
         while True:
@@ -179,61 +242,97 @@ async def ws_message_as_character(websocket: WebSocket):
             alias = data.get("alias")
             message = data.get("message")
             if last_char and alias and message:
-                # If message_as_character is async in your codebase, add 'await' here.
-                message_as_character(last_char, message, alias)
-                await websocket.send_json({"status": "ok", "character_number": last_char, "alias": alias, "message": message})
+                try:
+                    await CONTROL.call(f"character:{last_char}", "message", {"alias": alias, "message": message})
+                except ControlError as e:
+                    _reply(client, {"status": str(e)})
+                    continue
+                _reply(client, {"status": "ok", "character_number": last_char, "alias": alias, "message": message})
             else:
                 print(f"Invalid details received: {data}")
-                await websocket.send_json({"status": "error", "detail": "Invalid details"})
+                _reply(client, {"status": "error", "detail": "Invalid details"})
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while sending message as character {last_char}. Error: {e}")
+    finally:
+        client.close()
 
 
 @router.websocket("/ws/control_poll")
 async def ws_control_poll(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "control_poll client")
     try:
         while True:
             data = await websocket.receive_json()
             poll = data.get("poll")
             print(f"Received poll state: {poll}")
-            if poll == "start":
-                status = await start_poll()
-            elif poll == "end":
-                status = await end_poll()
-            elif poll == "hide":
-                status = await hide_poll()
-            else:
-                status = "Invalid poll command"
-            await websocket.send_json({"status": status})
+            await _status_reply(client, "poll", poll, "Invalid poll command")
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while controlling poll. Error: {e}")
+    finally:
+        client.close()
 
 @router.websocket("/ws/control_duel_poll")
 async def ws_control_duel_poll(websocket: WebSocket):
     await websocket.accept()
+    client = QueuedSender(websocket, "control_duel_poll client")
     try:
         while True:
             data = await websocket.receive_json()
             poll = data.get("poll")
             print(f"Received duel poll state: {poll}")
-            if poll == "start":
-                status = await start_duel_poll()
-            elif poll == "end":
-                status = await end_duel_poll()
-            elif poll == "hide":
-                status = await hide_duel_poll()
-            else:
-                status = "Invalid poll command"
-            await websocket.send_json({"status": status})
+            await _status_reply(client, "duel", poll, "Invalid poll command")
     except WebSocketDisconnect as e:
         print(f"WebSocket disconnected while controlling duel poll. Error: {e}")
+    finally:
+        client.close()
+
+
+# ------------------------------------------------------------------------------
+# Overlay state stream (browser sources draw polls / duel / characters / crates)
+# ------------------------------------------------------------------------------
+
+OVERLAY_TOPICS = ("duel", "poll", "crates", "character:*")
+
+
+@router.websocket("/ws/overlay/{stream_id}")
+async def ws_overlay_stream(websocket: WebSocket, stream_id: str):
+    """
+    Push-only state stream for browser-source overlays: a hub client subscribed
+    to every topic an overlay draws.
+
+    Server -> Client (see websocket_manager.py):
+      { "topic": str, "type": "snapshot", "id": null, "seq": int, "payload": ... }   per topic, on connect
+      { "topic": str, "type": "state" | "deleted", "id": null, "seq": int, "payload": ... }   when it changes
+    Topics: "duel", "poll", "crates", "character:<n>". stream_id is reserved for
+    multiple shows; every overlay currently gets the same state.
+    """
+    await websocket.accept()
+    client = HubClient(websocket, "overlay")
+    try:
+        for topic in OVERLAY_TOPICS:
+            HUB.subscribe(client, topic)
+        while True:
+            await websocket.receive_text()  # overlays don't send anything we need; this notices disconnects
+    except WebSocketDisconnect:
+        pass
+    finally:
+        client.close()
 
 
 # ------------------------------------------------------------------------------
 # Crates game WebSocket (already structured for persistent use)
 # ------------------------------------------------------------------------------
 
+# Legacy message type -> (control command, reply type)
+_CRATES_COMMANDS = {
+    "crates:start": ("start", "crates:status"),
+    "crates:select": ("select", "crates:result"),
+    "crates:reset": ("reset", "crates:status"),
+    "crates:status:get": ("status", "crates:status"),
+}
+
+
 @router.websocket("/ws/crates")
 async def ws_crates(websocket: WebSocket):
     """
@@ -250,78 +349,50 @@ async def ws_crates(websocket: WebSocket):
       { "type": "error", "message": string }
       { "type": "crates:status", "active": bool, "message"?: string, "opened"?: number[] }
       { "type": "crates:result", "message": string, "active"?: bool, "opened"?: number[] }
+    Messages run concurrently (a status request is answered during a selection's
+    drum roll); if a message has an "id", its reply carries the same "id".
     """
     await websocket.accept()
-    last_active: Optional[bool] = None
+    conn = ControlConnection(websocket, "crates client")
+
+    async def run(data: dict):
+        msg_type = data.get("type")
+        ids = {"id": data["id"]} if "id" in data else {}
+        if msg_type not in _CRATES_COMMANDS:
+            conn.outbox.put({"type": "error", "message": f"Unknown command: {msg_type}", **ids})
+            return
+        command, reply_type = _CRATES_COMMANDS[msg_type]
+        try:
+            reply = await CONTROL.call("crates", command, data)
+            conn.outbox.put({"type": reply_type, **reply, **ids})
+        except ControlError as e:
+            conn.outbox.put({"type": "error", "message": str(e), **ids})
 
     try:
         while True:
-            data = await websocket.receive_json()
-            msg_type = data.get("type")
-            scene_name: Optional[str] = data.get("sceneName")
-
-            if msg_type == "crates:start":
-                try:
-                    msg = await start_crates_game(scene_name=scene_name) if scene_name else await start_crates_game()
-                    last_active = True
-                    await websocket.send_json({
-                        "type": "crates:status",
-                        "active": True,
-                        "message": msg,
-                    })
-                except Exception as e:
-                    await websocket.send_json({"type": "error", "message": f"Failed to start: {e}"})
-
-            elif msg_type == "crates:select":
-                crate = data.get("crate")
-                if not isinstance(crate, int) or not (1 <= crate <= 12):
-                    await websocket.send_json({"type": "error", "message": "Invalid crate number. Use 1–12."})
-                    continue
-                try:
-                    result_msg = await select_crate(crate_number=crate, scene_name=scene_name) if scene_name else await select_crate(crate_number=crate)
-                    is_over = "game over" in result_msg.lower()
-                    if is_over:
-                        last_active = False
-                    elif last_active is None:
-                        last_active = True
-                    await websocket.send_json({
-                        "type": "crates:result",
-                        "message": result_msg,
-                        "active": False if is_over else True,
-                    })
-                except Exception as e:
-                    await websocket.send_json({"type": "error", "message": f"Selection failed: {e}"})
-
-            elif msg_type == "crates:reset":
-                try:
-                    msg = await reset_crates(scene_name=scene_name) if scene_name else await reset_crates()
-                    last_active = False
-                    await websocket.send_json({
-                        "type": "crates:status",
-                        "active": False,
-                        "message": msg,
-                    })
-                except Exception as e:
-                    await websocket.send_json({"type": "error", "message": f"Failed to reset: {e}"})
-
-            elif msg_type == "crates:status:get":
-                await websocket.send_json({
-                    "type": "crates:status",
-                    "active": bool(last_active) if last_active is not None else False,
-                    "message": "Status report",
-                })
-
-            else:
-                await websocket.send_json({"type": "error", "message": f"Unknown command: {msg_type}"})
+            await conn.spawn(run(await websocket.receive_json()))
     except WebSocketDisconnect as e:
         print(f"Crates WS disconnected: {e}")
+    finally:
+        conn.close()
 
 
 # ------------------------------------------------------------------------------
-# NEW: Single persistent WebSocket for all character controls with
-#      per-character locking and broadcast to all viewers of that character.
+# Persistent WebSocket for one character's controls; results are broadcast to
+# every viewer of that character (it subscribes to the "character:<n>" topic).
 # ------------------------------------------------------------------------------
 
+class _CharacterControlConnection(ControlConnection):
+    """Speaks the /ws/character_control format instead of control envelopes."""
+
+    def format(self, message: dict) -> Optional[dict]:
+        if message["type"] in ("snapshot", "state", "deleted"):
+            return None  # overlay state; this UI only follows the command results
+        if message["type"] == "picked":
+            return {"type": "character:picked", **message["payload"]}
+        return {"type": "ok", **message["payload"]}
+
+
 @router.websocket("/ws/character_control")
 async def ws_character_control(websocket: WebSocket):
     """
@@ -357,103 +428,36 @@ async def ws_character_control(websocket: WebSocket):
             default_character = None
 
     if default_character is None:
-        await websocket.send_json({"type": "error", "message": "Supply ?character=<number> in the URL"})
+        await websocket.send_text(dumps({"type": "error", "message": "Supply ?character=<number> in the URL"}))
         await websocket.close()
         return
 
     # Register this connection
-    _conn_by_char[default_character].add(websocket)
+    conn = _CharacterControlConnection(websocket, "character client")
+    topic = f"character:{default_character}"
+    HUB.subscribe(conn, topic)
+
+    async def run(command: str, data: dict):
+        try:
+            # enforce one-character-per-connection; the result reaches us as a broadcast
+            await CONTROL.call(topic, command, {**data, "character_number": default_character}, conn)
+        except ControlError as e:
+            # errors only to the requester (same queue as broadcasts, so they stay in order)
+            conn.outbox.put({"type": "error", "message": str(e)})
 
     try:
         while True:
             data = await websocket.receive_json()
-            msg_type = data.get("type")
-            char = default_character  # enforce one-character-per-connection
-
-            async def ok(payload: dict = {}):
-                # broadcast OKs so all UIs sync (status, voice, message ack, reset)
-                await _broadcast_to_char(char, {"type": "ok", **payload})
-
-            async def err(message: str):
-                # errors only to the requester
-                await websocket.send_json({"type": "error", "message": message})
-
-            lock = _locks_by_char[char]
-
-            if msg_type == "character:pick":
-                platform = data.get("platform", "either")
-                async with lock:
-                    try:
-                        username = await pick_character(char, platform)
-                        await _broadcast_to_char(char, {
-                            "type": "character:picked",
-                            "character": char,
-                            "username": username,
-                            "platform": platform,
-                        })
-                    except Exception as e:
-                        await err(f"Pick failed: {e}")
-
-            elif msg_type == "character:set":
-                username = data.get("username")
-                platform = data.get("platform", "either")
-                if not username:
-                    await err("username is required")
-                    continue
-                async with lock:
-                    try:
-                        await set_character(char, username, platform)
-                        await _broadcast_to_char(char, {
-                            "type": "character:picked",
-                            "character": char,
-                            "username": username,
-                            "platform": platform,
-                        })
-                    except Exception as e:
-                        await err(f"Set failed: {e}")
-
-            elif msg_type == "character:reset":
-                async with lock:
-                    try:
-                        await remove_character(char)
-                        await reset_character_pool(char)
-                        await ok({"status": f"character_{char}_reset", "character": char})
-                    except Exception as e:
-                        await err(f"Reset failed: {e}")
-
-            elif msg_type == "character:voice":
-                voice_style = data.get("voice_style")
-                if not voice_style:
-                    await err("voice_style is required")
-                    continue
-                async with lock:
-                    try:
-                        await update_character_voice_style(char, voice_style)
-                        await ok({"context": "voice", "character": char, "voice_style": voice_style})
-                    except Exception as e:
-                        await err(f"Voice update failed: {e}")
-
-            elif msg_type == "character:message":
-                alias = data.get("alias")
-                text = data.get("message")
-                if not alias or not text:
-                    await err("alias and message are required")
-                    continue
-                # Usually okay without the lock; keep for ordering if desired
-                async with lock:
-                    try:
-                        message_as_character(char, text, alias)
-                        await ok({"context": "message", "character": char})
-                    except Exception as e:
-                        await err(f"Message send failed: {e}")
-
-            elif msg_type == "character:status:get":
-                await ok({"context": "status", "character": char})
-
-            else:
-                await err(f"Unknown command: {msg_type}")
+            msg_type = data.get("type") or ""
+            # "character:pick" -> "pick", "character:status:get" -> "status"
+            command = msg_type.partition(":")[2].replace(":get", "")
+            if not msg_type.startswith("character:") or not command:
+                conn.outbox.put({"type": "error", "message": f"Unknown command: {msg_type}"})
+                continue
+            # commands for this character still run in order (see control_routes.py)
+            await conn.spawn(run(command, data))
 
     except WebSocketDisconnect:
         pass
     finally:
-        _conn_by_char[default_character].discard(websocket)
+        conn.close()
@@ -0,0 +1,248 @@
+# control_routes.py
+from app.control_channel import CONTROL, ControlError, topic_arg
+from app.websocket_manager import HUB
+from app.Chat_Manager import (
+    MAX_CHARACTERS,
+    pick_character, set_character, remove_character,
+    reset_character_pool, update_character_voice_style,
+    mute_character_tts, message_as_character,
+)
+from app.functions.ChanceGames import (
+    shoot_gun, flip_gun, hide_gun,
+    start_crates_game, select_crate, reset_crates, crates_state,
+)
+from app.functions.poll_manager import start_poll, end_poll, hide_poll, get_vote_series
+from app.functions.Duel_poll_manager import start_duel_poll, end_duel_poll, hide_duel_poll, duel_vote_series
+
+# ------------------------------------------------------------------------------
+# Command handlers for the control channel, keyed (topic, type). Each gets
+# (connection, topic, payload) and returns the reply payload. The /ws/control
+# socket and the older single-purpose routes all end up here.
+# Commands run concurrently; those that change a game's OBS state are ordered
+# per game (or per character) so they can't interleave.
+# ------------------------------------------------------------------------------
+
+def _by_game(topic: str, payload: dict) -> str:
+    return topic.partition(":")[0]
+
+
+# ---------------- TTS ----------------
+
+@CONTROL.route("tts", "mute")
+async def _tts_mute(conn, topic, payload):
+    return {"status": await mute_character_tts(payload.get("mute"))}
+
+
+# ---------------- Gun ----------------
+
+@CONTROL.route("gun", "shoot", ordered_by=_by_game)
+async def _gun_shoot(conn, topic, payload):
+    return {"status": await shoot_gun()}
+
+
+@CONTROL.route("gun", "flip", ordered_by=_by_game)
+async def _gun_flip(conn, topic, payload):
+    return {"status": await flip_gun()}
+
+
+@CONTROL.route("gun", "hide", ordered_by=_by_game)
+async def _gun_hide(conn, topic, payload):
+    return {"status": await hide_gun()}
+
+
+# ---------------- Polls ----------------
+
+@CONTROL.route("poll", "start", ordered_by=_by_game)
+async def _poll_start(conn, topic, payload):
+    return {"status": await start_poll()}
+
+
+@CONTROL.route("poll", "end", ordered_by=_by_game)
+async def _poll_end(conn, topic, payload):
+    return {"status": await end_poll()}
+
+
+@CONTROL.route("poll", "hide", ordered_by=_by_game)
+async def _poll_hide(conn, topic, payload):
+    return {"status": await hide_poll()}
+
+
+def _seconds(payload: dict):
+    seconds = payload.get("seconds")
+    if seconds is not None and (not isinstance(seconds, int) or seconds < 0):
+        raise ControlError("seconds must be a whole number of seconds")
+    return seconds
+
+
+# Per-second totals plus velocity / momentum ({"seconds": n} = only the last n)
+@CONTROL.route("poll", "series")
+async def _poll_series(conn, topic, payload):
+    return get_vote_series(_seconds(payload))
+
+
+@CONTROL.route("duel", "start", ordered_by=_by_game)
+async def _duel_start(conn, topic, payload):
+    options = {key: int(payload[key]) for key in ("duration_seconds", "total_circles") if key in payload}
+    return {"status": await start_duel_poll(**options)}
+
+
+@CONTROL.route("duel", "end", ordered_by=_by_game)
+async def _duel_end(conn, topic, payload):
+    return {"status": await end_duel_poll()}
+
+
+@CONTROL.route("duel", "hide", ordered_by=_by_game)
+async def _duel_hide(conn, topic, payload):
+    return {"status": await hide_duel_poll()}
+
+
+@CONTROL.route("duel", "series")
+async def _duel_series(conn, topic, payload):
+    return duel_vote_series(_seconds(payload))
+
+
+# ---------------- Crates ----------------
+
+def _scene(payload: dict) -> dict:
+    return {"scene_name": payload["sceneName"]} if payload.get("sceneName") else {}
+
+
+@CONTROL.route("crates", "start", ordered_by=_by_game)
+async def _crates_start(conn, topic, payload):
+    try:
+        message = await start_crates_game(**_scene(payload))
+    except Exception as e:
+        raise ControlError(f"Failed to start: {e}")
+    return {**crates_state(), "message": message}
+
+
+@CONTROL.route("crates", "select", ordered_by=_by_game)
+async def _crates_select(conn, topic, payload):
+    crate = payload.get("crate")
+    if not isinstance(crate, int) or not (1 <= crate <= 12):
+        raise ControlError("Invalid crate number. Use 1–12.")
+    try:
+        message = await select_crate(crate_number=crate, **_scene(payload))
+    except Exception as e:
+        raise ControlError(f"Selection failed: {e}")
+    return {**crates_state(), "message": message}
+
+
+@CONTROL.route("crates", "reset", ordered_by=_by_game)
+async def _crates_reset(conn, topic, payload):
+    try:
+        message = await reset_crates(**_scene(payload))
+    except Exception as e:
+        raise ControlError(f"Failed to reset: {e}")
+    return {**crates_state(), "message": message}
+
+
+@CONTROL.route("crates", "status")
+async def _crates_status(conn, topic, payload):
+    return {**crates_state(), "message": "Status report"}
+
+
+# ---------------- Characters (topic "character:<n>") ----------------
+# Results are also published on the character's topic so every UI showing
+# that character stays in sync. Commands are serialized per character.
+
+def _character(topic: str, payload: dict) -> int:
+    number = topic_arg(topic) or payload.get("character_number")
+    try:
+        return int(number)
+    except (TypeError, ValueError):
+        raise ControlError("Use a character topic such as 'character:3'.")
+
+
+def _by_character(topic: str, payload: dict) -> tuple:
+    return ("character", _character(topic, payload))
+
+
+@CONTROL.route("character", "pick", ordered_by=_by_character)
+async def _character_pick(conn, topic, payload):
+    char = _character(topic, payload)
+    platform = payload.get("platform", "either")
+    try:
+        username = await pick_character(char, platform)
+    except Exception as e:
+        raise ControlError(f"Pick failed: {e}")
+    event = {"character": char, "username": username, "platform": platform}
+    HUB.publish(f"character:{char}", "picked", event)
+    return event
+
+
+@CONTROL.route("character", "set", ordered_by=_by_character)
+async def _character_set(conn, topic, payload):
+    char = _character(topic, payload)
+    username = payload.get("username")
+    platform = payload.get("platform", "either")
+    if not username:
+        raise ControlError("username is required")
+    try:
+        await set_character(char, username, platform)
+    except Exception as e:
+        raise ControlError(f"Set failed: {e}")
+    event = {"character": char, "username": username, "platform": platform}
+    HUB.publish(f"character:{char}", "picked", event)
+    return event
+
+
+@CONTROL.route("character", "reset", ordered_by=_by_character)
+async def _character_reset(conn, topic, payload):
+    char = _character(topic, payload)
+    try:
+        await remove_character(char)
+        await reset_character_pool(char)
+    except Exception as e:
+        raise ControlError(f"Reset failed: {e}")
+    event = {"status": f"character_{char}_reset", "character": char}
+    HUB.publish(f"character:{char}", "reset", event)
+    return event
+
+
+@CONTROL.route("character", "voice", ordered_by=_by_character)
+async def _character_voice(conn, topic, payload):
+    char = _character(topic, payload)
+    voice_style = payload.get("voice_style")
+    if not voice_style:
+        raise ControlError("voice_style is required")
+    try:
+        await update_character_voice_style(char, voice_style)
+    except Exception as e:
+        raise ControlError(f"Voice update failed: {e}")
+    event = {"context": "voice", "character": char, "voice_style": voice_style}
+    HUB.publish(f"character:{char}", "voice", event)
+    return event
+
+
+@CONTROL.route("character", "message", ordered_by=_by_character)
+async def _character_message(conn, topic, payload):
+    char = _character(topic, payload)
+    alias = payload.get("alias")
+    text = payload.get("message")
+    if not alias or not text:
+        raise ControlError("alias and message are required")
+    try:
+        message_as_character(char, text, alias)
+    except Exception as e:
+        raise ControlError(f"Message send failed: {e}")
+    event = {"context": "message", "character": char, "alias": alias, "message": text}
+    HUB.publish(f"character:{char}", "message", event)
+    return event
+
+
+@CONTROL.route("character", "status")
+async def _character_status(conn, topic, payload):
+    char = _character(topic, payload)
+    event = {"context": "status", "character": char}
+    HUB.publish(f"character:{char}", "status", event)
+    return event
+
+
+@CONTROL.route("characters", "reset")
+async def _characters_reset(conn, topic, payload):
+    for number in range(1, MAX_CHARACTERS + 1):
+        # Queue behind (and ahead of) that character's own commands
+        async with CONTROL.ordering(_by_character(f"character:{number}", {})):
+            await remove_character(number)
+    return {"status": "characters_reset"}
@@ -0,0 +1,245 @@
+# state_store.py
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.functions.fast_json import dumps, loads
+
+# Which store the workers share. Every uvicorn worker must use the same one:
+#   STATE_STORE=memory   (default) one worker; nothing is shared
+#   STATE_STORE=sqlite   several workers on this machine share STATE_DB
+STATE_STORE = os.environ.get("STATE_STORE", "memory")
+STATE_DB = os.environ.get("STATE_DB", "app/state/shared.db")
+
+POLL_INTERVAL_SEC = 0.02    # how often a worker looks for events from the others
+EVENT_TTL_SEC = 30.0        # events older than this are deleted
+PRUNE_EVERY_SEC = 5.0
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+Listener = Callable[[dict], None]
+
+
+class StateStore:
+    """
+    State and messages shared between the app's worker processes.
+    - get/set/delete/items: JSON values by key.
+    - publish(channel, message) reaches listen(channel) callbacks in the *other*
+      workers, on the event loop that called start().
+    - try_lease(name, ttl): at most one worker holds a lease until it stops
+      renewing it (used to pick the worker that owns bots, TTS and OBS).
+    This in-process version is for a single worker: there is nobody to share
+    with, so messages go nowhere and every lease is granted.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._listeners: Dict[str, List[Listener]] = defaultdict(list)
+
+    async def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._values[key] = value
+
+    def delete(self, key: str):
+        self._values.pop(key, None)
+
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        return {key: value for key, value in self._values.items() if key.startswith(prefix)}
+
+    def publish(self, channel: str, message: dict):
+        pass
+
+    def listen(self, channel: str, callback: Listener):
+        self._listeners[channel].append(callback)
+
+    async def try_lease(self, name: str, ttl: float) -> bool:
+        return True
+
+    async def release_lease(self, name: str):
+        pass
+
+    def _deliver(self, channel: str, message: dict):
+        for callback in list(self._listeners.get(channel, ())):
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"[Store] {channel} listener failed: {e}")
+
+
+class SQLiteStateStore(StateStore):
+    """
+    StateStore shared through one SQLite database in WAL mode (readers never
+    block the writer), for several workers on one machine.
+    - Writes (set/delete/publish) never wait: they go to a writer thread that
+      commits whatever is queued in one transaction.
+    - Messages are rows in an events table; a poller thread per worker reads
+      new rows every POLL_INTERVAL_SEC and hands them to the event loop.
+    - Leases are rows (name, holder, expires) claimed with one atomic upsert.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = STATE_DB):
+        super().__init__()
+        self.path = path
+        self._writes: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._db = self._connect()  # reads and leases (the loop thread and to_thread workers)
+        self._db_lock = threading.Lock()
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "channel TEXT NOT NULL, origin TEXT NOT NULL, body TEXT NOT NULL, at REAL NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        # Only messages from now on; state from before comes from items()
+        with self._db_lock:
+            last_id = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        self._threads = [
+            threading.Thread(target=self._write_loop, name="StateStoreWriter", daemon=True),
+            threading.Thread(target=self._poll_loop, args=(last_id,), name="StateStorePoller", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"[Store] Sharing state through {self.path} (worker {WORKER_ID}).")
+
+    def stop(self):
+        self._stop.set()
+        self._writes.put(None)
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    # ------------- State -------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        self._writes.put(("INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                          (key, dumps(value))))
+
+    def delete(self, key: str):
+        self._writes.put(("DELETE FROM kv WHERE key = ?", (key,)))
+
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        with self._db_lock:
+            rows = self._db.execute("SELECT key, value FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+        return {key: loads(value) for key, value in rows}
+
+    # ------------- Messages -------------
+
+    def publish(self, channel: str, message: dict):
+        self._writes.put(("INSERT INTO events (channel, origin, body, at) VALUES (?, ?, ?, ?)",
+                          (channel, WORKER_ID, dumps(message), time.time())))
+
+    def _poll_loop(self, last_id: int):
+        db = self._connect()
+        while not self._stop.wait(POLL_INTERVAL_SEC):
+            try:
+                rows = db.execute("SELECT id, channel, origin, body FROM events WHERE id > ? ORDER BY id",
+                                  (last_id,)).fetchall()
+            except sqlite3.Error as e:
+                print(f"[Store] Reading events failed: {e}")
+                continue
+            for row_id, channel, origin, body in rows:
+                last_id = row_id
+                if origin != WORKER_ID and channel in self._listeners:
+                    try:
+                        self._loop.call_soon_threadsafe(self._deliver, channel, loads(body))
+                    except RuntimeError:
+                        return  # the loop is closed: shutting down
+        db.close()
+
+    def _write_loop(self):
+        db = self._connect()
+        next_prune = time.monotonic() + PRUNE_EVERY_SEC
+        while True:
+            op = self._writes.get()
+            ops = [op]
+            # Everything queued meanwhile goes into the same transaction
+            while op is not None:
+                try:
+                    op = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                ops.append(op)
+            try:
+                with db:
+                    for op in ops:
+                        if op is not None:
+                            db.execute(*op)
+                    if time.monotonic() >= next_prune:
+                        db.execute("DELETE FROM events WHERE at < ?", (time.time() - EVENT_TTL_SEC,))
+                        next_prune = time.monotonic() + PRUNE_EVERY_SEC
+            except sqlite3.Error as e:
+                print(f"[Store] Write failed ({len(ops)} ops dropped): {e}")
+            if ops[-1] is None:
+                break
+        db.close()
+
+    # ------------- Leases -------------
+
+    def _claim(self, name: str, ttl: float) -> bool:
+        now = time.time()
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires "
+                "WHERE leases.holder = excluded.holder OR leases.expires < ?",
+                (name, WORKER_ID, now + ttl, now))
+            row = self._db.execute("SELECT holder FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == WORKER_ID
+
+    async def try_lease(self, name: str, ttl: float) -> bool:
+        """
+        Take or renew the lease; False while another worker holds it. A failed
+        check (e.g. "database is locked") raises instead, so the caller keeps
+        its current role rather than mistaking it for losing the lease.
+        """
+        return await asyncio.to_thread(self._claim, name, ttl)
+
+    async def release_lease(self, name: str):
+        def release():
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, WORKER_ID))
+        await asyncio.to_thread(release)
+
+
+def open_state_store() -> StateStore:
+    if STATE_STORE == "sqlite":
+        return SQLiteStateStore(STATE_DB)
+    if STATE_STORE != "memory":
+        print(f"[Store] Unknown STATE_STORE '{STATE_STORE}', keeping state in this process.")
+    return StateStore()
+
+
+STORE = open_state_store()
@@ -1,19 +1,272 @@
-from fastapi import WebSocket
+# websocket_manager.py
+import asyncio
+from collections import defaultdict
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.functions.client_queue import QueuedSender
+from app.functions.fast_json import dumps
+from app.functions.metrics import counter
+
+HUB_HZ = 15
+
+HUB_MESSAGES = counter("hub_messages_total", "Messages fanned out by the hub, by topic.", ("topic",))
+HUB_DELIVERIES = counter("hub_deliveries_total", "Messages queued for clients by the hub (one per subscriber), by topic.", ("topic",))
+
+# Topics: "character:<n>", "poll", "duel", "crates", "tts". Subscriptions may use
+# shell-style wildcards ("character:*", "*").
+# Every message to a subscriber is an envelope with a per-topic sequence number:
+#   {"topic": str, "type": str, "id": null, "seq": int, "payload": ...}
+#   type "snapshot"  current state, sent when the subscription starts
+#        "state"     the topic's state changed (payload = whole new state)
+#        "deleted"   the topic has no state any more
+#        anything else: an event published by a handler (e.g. "picked")
+# seq goes up by one per message on a topic; a jump means messages were missed
+# and the client should resubscribe to get a fresh snapshot.
+
+
+class HubClient:
+    """
+    One websocket subscribed to hub topics. Messages go out through its own
+    bounded queue (client_queue.py). Subclasses can reshape messages in format()
+    (None = don't send); it must only depend on the message, because the hub
+    runs it and the JSON encoding once per client class, not once per client.
+    """
+
+    def __init__(self, websocket, name: str = "client"):
+        self.websocket = websocket
+        self.patterns: Set[str] = set()
+        self.outbox = QueuedSender(websocket, name, on_evict=lambda _: HUB.disconnect(self))
+
+    def format(self, message: dict) -> Optional[dict]:
+        return message
+
+    def send(self, message: dict) -> bool:
+        """Queue one message for this client only; False if it is gone."""
+        message = self.format(message)
+        if message is None:
+            return not self.outbox.closed
+        return self.outbox.put(dumps(message))
+
+    def close(self):
+        """The socket is gone: stop sending and drop every subscription."""
+        HUB.disconnect(self)
+
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections = {}
+    """
+    Pub/sub hub for every real-time consumer (control UIs, overlays).
+    - State: producers set/update/delete a topic's value (safe from any thread,
+      e.g. chat bot callbacks) or register a provider that is read every tick
+      (e.g. a poll's snapshot). Each tick, topics whose value changed are sent as
+      "state" messages; the tick only runs while someone is subscribed.
+    - Events: publish() sends right away (call it on the event loop).
+    - Each message is encoded once and queued for every matching subscriber.
+    - With several workers (state_store.py), the worker that runs the show
+      leads: it also writes each message and the topic's latest state to the
+      shared store. The others follow: their own producers are ignored and they
+      fan out what the leader wrote, with the leader's seq numbers.
+    """
+
+    def __init__(self, tick_hz: float = HUB_HZ):
+        self.tick_hz = tick_hz
+        self._values: Dict[str, Any] = {}
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._sent: Dict[str, Any] = {}            # state last sent per topic
+        self._seq: Dict[str, int] = defaultdict(int)
+        self._exact: Dict[str, Set[HubClient]] = defaultdict(set)
+        self._wildcards: Dict[str, Set[HubClient]] = defaultdict(set)
+        self._targets: Dict[str, List[HubClient]] = {}  # topic -> its subscribers, rebuilt when subscriptions change
+        self._counted: Dict[str, tuple] = {}  # topic -> its (messages, deliveries) metric children
+        self._task: Optional[asyncio.Task] = None
+        self._store = None
+        self._following = False
+        self._listening = False
+
+    # ------------- Producers -------------
+
+    def set_state(self, topic: str, value: Any):
+        self._values[topic] = value
+
+    def update(self, topic: str, **fields):
+        """Merge fields into a dict value (replaced, never mutated, so ticks see whole values)."""
+        self._values[topic] = {**self._values.get(topic, {}), **fields}
+
+    def delete(self, topic: str):
+        self._values.pop(topic, None)
+
+    def add_provider(self, topic: str, provider: Callable[[], Any]):
+        """provider() is called once per tick; it must be cheap and return JSON-able data."""
+        self._providers[topic] = provider
+
+    def current(self) -> Dict[str, Any]:
+        state = dict(self._values)
+        for topic, provider in list(self._providers.items()):
+            try:
+                state[topic] = provider()
+            except Exception as e:
+                print(f"[Hub] state provider '{topic}' failed: {e}")
+        return state
+
+    def publish(self, topic: str, type_: str, payload: Any = None):
+        """Send an event to the topic's subscribers now."""
+        if self._following:
+            return  # only the leading worker's game code produces messages
+        self._seq[topic] += 1
+        message = {"topic": topic, "type": type_, "id": None, "seq": self._seq[topic], "payload": payload}
+        if self._store is not None:
+            record = {"seq": self._seq[topic]}
+            if topic in self._sent:
+                record["value"] = self._sent[topic]
+            self._store.set(f"hub:{topic}", record)
+            self._store.publish("hub", message)
+        self._fan_out(topic, message)
+
+    def _fan_out(self, topic: str, message: dict):
+        subscribers = self._subscribers(topic)
+        if not subscribers:
+            return
+        counted = self._counted.get(topic)
+        if counted is None:
+            counted = self._counted[topic] = (HUB_MESSAGES.labels(topic), HUB_DELIVERIES.labels(topic))
+        counted[0].inc()
+        counted[1].inc(len(subscribers))
+        encoded: Dict[type, Optional[str]] = {}
+        for client in subscribers:
+            kind = type(client)
+            if kind not in encoded:
+                formatted = client.format(message)
+                encoded[kind] = dumps(formatted) if formatted is not None else None
+            if encoded[kind] is not None:
+                client.outbox.put(encoded[kind])
+
+    # ------------- Subscribers -------------
+
+    def connect(self, websocket, client_cls: Callable[..., HubClient] = HubClient, **kwargs) -> HubClient:
+        """Wrap an accepted websocket; subscribe it to topics afterwards."""
+        return client_cls(websocket, **kwargs)
+
+    def disconnect(self, client: HubClient):
+        client.outbox.close()
+        for pattern in list(client.patterns):
+            self.unsubscribe(client, pattern)
+
+    def subscribe(self, client: HubClient, pattern: str):
+        """Start sending the topic(s) to the client, beginning with a snapshot of each."""
+        self._refresh()
+        client.patterns.add(pattern)
+        if _is_wildcard(pattern):
+            self._wildcards[pattern].add(client)
+        else:
+            self._exact[pattern].add(client)
+        self._targets.clear()
+        for topic, value in self._sent.items():
+            if fnmatchcase(topic, pattern):
+                client.send({"topic": topic, "type": "snapshot", "id": None, "seq": self._seq[topic], "payload": value})
+        self._ensure_ticking()
+
+    def unsubscribe(self, client: HubClient, pattern: str):
+        client.patterns.discard(pattern)
+        table = self._wildcards if _is_wildcard(pattern) else self._exact
+        clients = table.get(pattern)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del table[pattern]
+            self._targets.clear()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self._exact or self._wildcards)
+
+    def _subscribers(self, topic: str) -> List[HubClient]:
+        targets = self._targets.get(topic)
+        if targets is None:
+            clients = set(self._exact.get(topic, ()))
+            for pattern, subscribed in self._wildcards.items():
+                if fnmatchcase(topic, pattern):
+                    clients |= subscribed
+            targets = self._targets[topic] = list(clients)
+        return targets
+
+    # ------------- Tick -------------
+
+    def _refresh(self):
+        """Send "state"/"deleted" for every topic whose value changed since it was last sent."""
+        if self._following:
+            return
+        state = self.current()
+        sent = self._sent
+        changed = [topic for topic, value in state.items() if topic not in sent or sent[topic] != value]
+        removed = [topic for topic in sent if topic not in state]
+        self._sent = state
+        for topic in changed:
+            self.publish(topic, "state", state[topic])
+        for topic in removed:
+            self.publish(topic, "deleted")
+
+    def _ensure_ticking(self):
+        if not self._following and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="WebSocketHub")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_hz
+        next_tick = loop.time() + period
+        # A leader keeps ticking for the other workers' clients
+        while (self.subscribed or self._store is not None) and not self._following:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self._refresh()
+            next_tick = max(next_tick + period, loop.time())
+
+    # ------------- Workers -------------
+
+    def lead(self, store):
+        """This worker runs the show: mirror every message into a shared store."""
+        self._following = False
+        if not store.shared:
+            return
+        # Carry on from what the followers already have (seq numbers and state),
+        # so the next tick only sends what this worker sees differently
+        self._sent = {}
+        for key, record in store.items("hub:").items():
+            topic = key[len("hub:"):]
+            self._seq[topic] = max(self._seq[topic], record["seq"])
+            if "value" in record:
+                self._sent[topic] = record["value"]
+        self._store = store
+        self._ensure_ticking()
+
+    def follow(self, store):
+        """Another worker runs the show: serve what it writes to the shared store."""
+        self._store = None
+        self._following = True
+        if not self._listening:
+            store.listen("hub", self._on_remote)
+            self._listening = True
+        self._sent = {}
+        for key, record in store.items("hub:").items():
+            topic = key[len("hub:"):]
+            self._seq[topic] = record["seq"]
+            if "value" in record:
+                self._sent[topic] = record["value"]
+
+    def _on_remote(self, message: dict):
+        if not self._following:
+            return
+        topic = message["topic"]
+        if message["seq"] <= self._seq[topic]:
+            return  # already part of the state we loaded
+        self._seq[topic] = message["seq"]
+        if message["type"] == "state":
+            self._sent[topic] = message["payload"]
+        elif message["type"] == "deleted":
+            self._sent.pop(topic, None)
+        self._fan_out(topic, message)
 
-    async def connect(self, session_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[session_id] = websocket
 
-    async def disconnect(self, session_id: str):
-        self.active_connections.pop(session_id, None)
+def _is_wildcard(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
 
-    async def send_to_overlay(self, session_id: str, message: dict):
-        ws = self.active_connections.get(session_id)
-        if ws:
-            await ws.send_json(message)
 
-manager = WebSocketManager()
\ No newline at end of file
+HUB = WebSocketManager()
@@ -0,0 +1,98 @@
+# worker_role.py
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.control_channel import CONTROL
+from app.functions.metrics import gauge
+from app.state_store import STORE, WORKER_ID
+from app.websocket_manager import HUB
+
+SHOW_LEASE = "show"
+LEASE_TTL_SEC = 5.0       # a worker that stops renewing loses the show after this long
+LEASE_RENEW_SEC = 1.0     # renewing never waits for the show to start (loading TTS can take longer than the TTL)
+
+
+class WorkerRole:
+    """
+    Decides which worker runs the show: the chat bots, TTS, OBS and the game
+    state (and its journal). Exactly one worker holds the store's "show" lease;
+    the others only serve websockets, forwarding commands to it and fanning
+    out what it publishes (see ControlRouter / WebSocketManager lead/follow).
+    If the owner dies, another worker takes the lease within LEASE_TTL_SEC and
+    picks the show up from the journal. With the in-process store there is
+    one worker and it always owns the show.
+    """
+
+    def __init__(self, store=STORE):
+        self.store = store
+        self.owner = False
+        self._start_show: Optional[Callable[[], Awaitable[None]]] = None
+        self._stop_show: Optional[Callable[[], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._starting: Optional[asyncio.Task] = None  # start_show() running next to the lease renewal
+        gauge("worker_runs_show", "1 in the worker that runs the show (bots, TTS, OBS).", lambda: int(self.owner))
+
+    async def start(self, start_show: Callable[[], Awaitable[None]], stop_show: Callable[[], Awaitable[None]]):
+        self._start_show = start_show
+        self._stop_show = stop_show
+        await self.store.start()
+        try:
+            await self._check()
+        except Exception as e:
+            print(f"[Worker] Ownership check failed: {e}")  # _renew tries again
+        if not self.owner:
+            # Serve the show's current state until (maybe) we take over
+            HUB.follow(self.store)
+            CONTROL.follow(self.store)
+            print(f"[Worker] {WORKER_ID} serves websockets; another worker runs the show.")
+        self._task = asyncio.create_task(self._renew(), name="WorkerRole")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.owner:
+            await self._end_show()
+            await self.store.release_lease(SHOW_LEASE)
+            self.owner = False
+        self.store.stop()
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SEC)
+            try:
+                await self._check()
+            except Exception as e:
+                print(f"[Worker] Ownership check failed: {e}")
+
+    async def _check(self):
+        owner = await self.store.try_lease(SHOW_LEASE, LEASE_TTL_SEC)
+        if owner == self.owner:
+            return
+        self.owner = owner
+        if owner:
+            print(f"[Worker] {WORKER_ID} runs the show.")
+            HUB.lead(self.store)
+            CONTROL.lead(self.store)
+            self._starting = asyncio.create_task(self._begin_show(), name="StartShow")
+        else:
+            print(f"[Worker] {WORKER_ID} lost the show to another worker; stopping bots, TTS and OBS.")
+            await self._end_show()
+            HUB.follow(self.store)
+            CONTROL.follow(self.store)
+
+    async def _begin_show(self):
+        try:
+            await self._start_show()
+        except Exception as e:
+            print(f"[Worker] Starting the show failed: {e}")
+
+    async def _end_show(self):
+        # Let a start still in progress finish first (its threads can't be
+        # cancelled), so stop_show() really undoes everything it started
+        if self._starting is not None:
+            await asyncio.wait({self._starting})
+            self._starting = None
+        await self._stop_show()
+
+
+ROLE = WorkerRole()
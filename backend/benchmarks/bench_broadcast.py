@@ -0,0 +1,148 @@
+# bench_broadcast.py
+"""
+Broadcast fan-out benchmark: cost of sending one event to N websocket clients.
+
+Run from backend/:
+    python -m benchmarks.bench_broadcast [--broadcasts 2000] [--subscribers 1 10 100]
+
+Strategies:
+  send_json      encode per client with the stdlib (what websocket.send_json does)
+  once json      encode once with the stdlib, same text to every client
+  once fast      encode once with fast_json (orjson when installed), same text to every client
+  enqueue        WebSocketManager.publish() alone: encode once + queue per client, i.e. what
+                 the game path pays; the clients' writer tasks send it afterwards
+  delivered      publish() until every writer task has sent it
+
+Columns:
+  us/broadcast   median wall time per broadcast, until every client has the message
+                 (enqueue: until it is queued for every client)
+  us/client      the same divided by the number of clients
+The fake clients only keep the last frame, so this measures encoding and
+fan-out overhead, not network time.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.functions.fast_json import ENCODER, dumps
+from app.websocket_manager import HubClient, WebSocketManager
+
+# A character event and a duel state update, roughly what the game sends
+PAYLOADS: Dict[str, dict] = {
+    "character": {"topic": "character:3", "type": "picked", "id": None, "seq": 1234,
+                  "payload": {"character": 3, "username": "some_chatter_name", "platform": "twitch"}},
+    "duel": {"topic": "duel", "type": "state", "id": None, "seq": 1234, "payload": {
+        "active": True, "votes": {"1": 532, "2": 611}, "ratios": {"1": 0.4655, "2": 0.5345},
+        "time_left_s": 42, "timer": "00:42", "lights": [4, 5], "total_circles": 8}},
+}
+
+
+class FakeWebSocket:
+    def __init__(self, on_send: Optional[Callable[[], None]] = None):
+        self.last = None
+        self.on_send = on_send
+
+    async def send_text(self, text: str):
+        self.last = text
+        if self.on_send is not None:
+            self.on_send()
+
+    async def send_json(self, data):
+        # Starlette's send_json: encode with the stdlib, then send as text
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def _per_client_json(clients: List[FakeWebSocket], message: dict):
+    for ws in clients:
+        await ws.send_json(message)
+
+
+async def _once_json(clients: List[FakeWebSocket], message: dict):
+    text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    for ws in clients:
+        await ws.send_text(text)
+
+
+async def _once_fast(clients: List[FakeWebSocket], message: dict):
+    text = dumps(message)
+    for ws in clients:
+        await ws.send_text(text)
+
+
+async def _time(run: Callable, broadcasts: int) -> float:
+    samples = []
+    for _ in range(broadcasts):
+        start = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+async def bench(subscribers: int, message: dict, broadcasts: int) -> Dict[str, float]:
+    clients = [FakeWebSocket() for _ in range(subscribers)]
+    results = {
+        "send_json": await _time(lambda: _per_client_json(clients, message), broadcasts),
+        "once json": await _time(lambda: _once_json(clients, message), broadcasts),
+        "once fast": await _time(lambda: _once_fast(clients, message), broadcasts),
+    }
+
+    hub = WebSocketManager()
+    topic = message["topic"]
+    delivered = {"count": 0, "done": asyncio.Event()}
+
+    def on_send():
+        delivered["count"] += 1
+        if delivered["count"] == subscribers:
+            delivered["done"].set()
+
+    conns = [HubClient(FakeWebSocket(on_send)) for _ in range(subscribers)]
+    for conn in conns:
+        conn.outbox.on_evict = None  # not registered with the shared hub
+        hub.subscribe(conn, topic)
+
+    enqueue_times = []
+
+    async def publish():
+        delivered["count"] = 0
+        delivered["done"].clear()
+        start = time.perf_counter()
+        hub.publish(topic, message["type"], message["payload"])
+        enqueue_times.append(time.perf_counter() - start)
+        await delivered["done"].wait()
+
+    results["delivered"] = await _time(publish, broadcasts)
+    results["enqueue"] = statistics.median(enqueue_times)
+    for conn in conns:
+        hub.disconnect(conn)
+    return results
+
+
+def print_report(rows: List[tuple]):
+    strategies = ["send_json", "once json", "once fast", "enqueue", "delivered"]
+    print(f"encoder: {ENCODER}")
+    print(f"{'payload':<10} {'clients':>7}  " + "  ".join(f"{s:>20}" for s in strategies))
+    print(f"{'':<10} {'':>7}  " + "  ".join(f"{'us/broadcast  us/client':>20}" for _ in strategies))
+    for name, subscribers, results in rows:
+        cells = [f"{results[s] * 1e6:>10.1f} {results[s] * 1e6 / subscribers:>9.2f}" for s in strategies]
+        print(f"{name:<10} {subscribers:>7}  " + "  ".join(f"{c:>20}" for c in cells))
+
+
+async def main(args):
+    rows = []
+    for name, message in PAYLOADS.items():
+        for subscribers in args.subscribers:
+            rows.append((name, subscribers, await bench(subscribers, message, args.broadcasts)))
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark websocket broadcast fan-out")
+    parser.add_argument("--broadcasts", type=int, default=2000, help="broadcasts timed per row")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 100], help="client counts to compare")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,189 @@
+# bench_obs.py
+"""
+OBS-path benchmarks: runs the real game-module functions against the fake
+obs-websocket server and reports how many round trips and how much time each
+one costs.
+
+Run from backend/:
+    python -m benchmarks.bench_obs [--latency 0.02] [--jitter 0.005] [--repeat 5]
+
+Columns:
+  cold ms     first run (empty scene item cache / shadow state)
+  warm ms     median of the remaining runs, wall time of the call + text flush
+  obs ms      median time from OBS seeing the first request to its last reply
+  trips       median Request + RequestBatch messages per run
+  requests    median OBS requests per run (batched requests counted individually)
+
+Vote scenarios wait two render frames after voting so the frame renderer's batch is
+counted; their wall time is mostly that wait. Compare trips/requests across vote counts.
+
+Sound effects play through SDL's dummy driver unless SDL_AUDIODRIVER is already set.
+Modules whose dependencies can't be loaded here (e.g. Chat_Manager needs the TTS
+models) are reported as skipped.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, List, Optional
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from benchmarks.fake_obs_server import FakeOBSServer  # noqa: E402
+from app.functions.obs_websocket import configure_obs_manager  # noqa: E402
+
+Step = Callable[[], Awaitable[object]]
+
+
+class Scenario:
+    def __init__(self, name: str, run: Step, setup: Optional[Step] = None, teardown: Optional[Step] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+
+
+class Result:
+    def __init__(self, name: str):
+        self.name = name
+        self.wall: List[float] = []
+        self.span: List[float] = []
+        self.trips: List[int] = []
+        self.requests: List[int] = []
+        self.skipped: Optional[str] = None
+
+
+async def _settle(obs, server: FakeOBSServer):
+    """Send any write-behind text and wait until OBS has answered everything."""
+    await obs.flush_text_async()
+    await asyncio.sleep(server.latency + server.jitter + 0.05)
+
+
+async def run_scenario(scenario: Scenario, obs, server: FakeOBSServer, repeat: int) -> Result:
+    result = Result(scenario.name)
+    for _ in range(repeat):
+        if scenario.setup:
+            await scenario.setup()
+        await _settle(obs, server)
+        server.reset_stats()
+
+        t0 = time.perf_counter()
+        await scenario.run()
+        await obs.flush_text_async()
+        result.wall.append(time.perf_counter() - t0)
+
+        await _settle(obs, server)
+        result.span.append(server.obs_span)
+        result.trips.append(server.round_trips)
+        result.requests.append(len(server.requests))
+        if scenario.teardown:
+            await scenario.teardown()
+    return result
+
+
+def build_scenarios(skipped: List[Result]) -> List[Scenario]:
+    scenarios: List[Scenario] = []
+
+    try:
+        import app.Chat_Manager as Chat_Manager
+    except Exception as e:
+        r = Result("set_character")
+        r.skipped = f"Chat_Manager unavailable: {e}"
+        skipped.append(r)
+    else:
+        scenarios.append(Scenario(
+            "set_character",
+            run=lambda: Chat_Manager.set_character(1, "bench_user", "twitch"),
+            teardown=lambda: Chat_Manager.remove_character(1),
+        ))
+
+    try:
+        import app.functions.Duel_poll_manager as Duel
+        from app.functions.poll_engine import POLL_ENGINE
+    except Exception as e:
+        for name in ("duel_vote x20", "duel_vote x1000"):
+            r = Result(name)
+            r.skipped = f"Duel_poll_manager unavailable: {e}"
+            skipped.append(r)
+    else:
+        def duel_votes(count: int) -> Step:
+            async def run():
+                for i in range(count):
+                    await Duel.record_duel_vote("1" if i % 2 else "2")
+                # Votes only count; give the renderer one frame to draw them
+                await asyncio.sleep(2 / POLL_ENGINE.renderer.tick_hz)
+            return run
+
+        for count in (20, 1000):
+            scenarios.append(Scenario(
+                f"duel_vote x{count}",
+                run=duel_votes(count),
+                setup=lambda: Duel.start_duel_poll(duration_seconds=3600),
+                teardown=lambda: Duel.end_duel_poll(reason="bench"),
+            ))
+
+    try:
+        import app.functions.ChanceGames as ChanceGames
+    except Exception as e:
+        for name in ("crate_start", "crate_reset"):
+            r = Result(name)
+            r.skipped = f"ChanceGames unavailable: {e}"
+            skipped.append(r)
+    else:
+        scenarios.append(Scenario("crate_start", run=ChanceGames.start_crates_game, teardown=ChanceGames.reset_crates))
+        scenarios.append(Scenario("crate_reset", run=ChanceGames.reset_crates, setup=ChanceGames.start_crates_game))
+
+    try:
+        import app.functions.poll_manager as Poll
+    except Exception as e:
+        r = Result("poll_start")
+        r.skipped = f"poll_manager unavailable: {e}"
+        skipped.append(r)
+    else:
+        async def poll_votes():
+            for v in ("1", "2", "2", "3"):
+                await Poll.handle_vote(v)
+
+        scenarios.append(Scenario("poll_start", run=Poll.start_poll, teardown=poll_votes))
+
+    return scenarios
+
+
+def _ms(values: List[float]) -> str:
+    return f"{statistics.median(values) * 1000:9.1f}" if values else f"{'-':>9}"
+
+
+def print_report(results: List[Result], latency: float, jitter: float):
+    print(f"\nOBS path benchmark (fake OBS latency={latency * 1000:.1f}ms jitter={jitter * 1000:.1f}ms)")
+    print(f"{'scenario':<16}{'cold ms':>9}{'warm ms':>9}{'obs ms':>9}{'trips':>7}{'requests':>10}")
+    for r in results:
+        if r.skipped:
+            print(f"{r.name:<16}  skipped: {r.skipped}")
+            continue
+        warm_wall, warm_span = r.wall[1:] or r.wall, r.span[1:] or r.span
+        warm_trips, warm_requests = r.trips[1:] or r.trips, r.requests[1:] or r.requests
+        print(f"{r.name:<16}{r.wall[0] * 1000:9.1f}{_ms(warm_wall)}{_ms(warm_span)}"
+              f"{statistics.median(warm_trips):7.0f}{statistics.median(warm_requests):10.0f}")
+
+
+async def main(args):
+    async with FakeOBSServer(latency=args.latency, jitter=args.jitter) as server:
+        obs = configure_obs_manager("127.0.0.1", server.port, "")
+        await obs.call_async("GetVersion")
+
+        skipped: List[Result] = []
+        scenarios = build_scenarios(skipped)
+        results = [await run_scenario(s, obs, server, args.repeat) for s in scenarios]
+        print_report(results + skipped, args.latency, args.jitter)
+
+        await _settle(obs, server)
+        await asyncio.get_running_loop().run_in_executor(None, obs.disconnect)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the OBS request path against a fake OBS")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the fake OBS waits before each reply")
+    parser.add_argument("--jitter", type=float, default=0.005, help="+/- random seconds added to latency")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario (first one is reported as cold)")
+    asyncio.run(main(parser.parse_args()))
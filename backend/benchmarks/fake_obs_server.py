@@ -0,0 +1,373 @@
+# fake_obs_server.py
+"""
+Local stand-in for OBS's obs-websocket v5 server, for offline measurement.
+
+- Speaks the v5 handshake (Hello / Identify / Identified, optional password auth),
+  Request / RequestResponse, RequestBatch / RequestBatchResponse and Events.
+- Keeps an in-memory scene graph (scenes -> items, inputs -> settings, filters)
+  and emits the matching change events, like OBS does.
+- Every request is recorded, and each reply can be delayed by latency +/- jitter
+  to mimic a busy OBS or a remote machine.
+
+Run standalone (point dontleak.obs_server_ip/port at it):
+    python -m benchmarks.fake_obs_server --port 4455 --latency 0.02
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import secrets
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from websockets.asyncio.server import serve
+
+OBS_SUBPROTOCOL = "obswebsocket.json"
+
+# RequestStatus codes used here (subset of obs-websocket's)
+STATUS_SUCCESS = 100
+STATUS_UNKNOWN_REQUEST_TYPE = 204
+STATUS_MISSING_REQUEST_FIELD = 300
+STATUS_RESOURCE_NOT_FOUND = 600
+
+# Event subscription bits
+SUB_SCENES = 1 << 2
+SUB_INPUTS = 1 << 3
+SUB_FILTERS = 1 << 5
+SUB_SCENE_ITEMS = 1 << 7
+
+# Scenes and sources the app drives, so item ids resolve like they would in the real show
+DEFAULT_SCENES: Dict[str, List[str]] = {
+    "Chat Conference": [f"Character {i} Scene" for i in range(1, 11)],
+    "Voting board": [f"Vote {i}" for i in range(1, 11)],
+    "Vote duel": [f"Blue Circle {i}" for i in range(1, 33)] + [f"Red Circle {i}" for i in range(1, 33)] + ["Timer"],
+    "Crate Game": [f"Crate {i}" for i in range(1, 13)] + [f"Bomb {i}" for i in range(1, 13)],
+    "Conference and backdrop": ["Vote duel", "gun"],
+}
+DEFAULT_TEXT_INPUTS: List[str] = (
+    [f"Character {i} Name" for i in range(1, 11)]
+    + [f"Character {i} Text" for i in range(1, 11)]
+    + [f"Vote {i}" for i in range(1, 7)]
+    + ["Timer", "Poll Winner"]
+)
+
+
+class _RequestFailed(Exception):
+    def __init__(self, code: int, comment: str):
+        super().__init__(comment)
+        self.code = code
+        self.comment = comment
+
+
+class FakeOBSServer:
+    """
+    :param latency: seconds added before every reply (per Request or per RequestBatch)
+    :param jitter: +/- uniform random seconds added to latency
+    :param auto_create: unknown scenes, items and inputs spring into existence on first use
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: str = "",
+                 latency: float = 0.0, jitter: float = 0.0, auto_create: bool = True):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.auto_create = auto_create
+
+        # Scene graph
+        self.scenes: Dict[str, List[Dict[str, Any]]] = {}
+        self.inputs: Dict[str, Dict[str, Any]] = {}
+        self.filters: Dict[Tuple[str, str], bool] = {}
+        self.program_scene: str = ""
+        self._next_item_id = 1
+
+        # Recording
+        self.requests: List[Tuple[float, str, Dict[str, Any]]] = []  # (monotonic ts, type, data)
+        self.round_trips = 0          # Request + RequestBatch messages received
+        self.first_request_ts: Optional[float] = None
+        self.last_reply_ts: Optional[float] = None
+
+        self._server = None
+        self._clients: Dict[Any, int] = {}  # websocket -> eventSubscriptions
+
+        for scene, sources in DEFAULT_SCENES.items():
+            for source in sources:
+                self._add_item(scene, source)
+        for name in DEFAULT_TEXT_INPUTS:
+            self.inputs.setdefault(name, {"text": ""})
+        self.program_scene = next(iter(self.scenes))
+
+    # ------------- Lifecycle -------------
+
+    async def start(self):
+        self._server = await serve(self._handle, self.host, self.port, subprotocols=[OBS_SUBPROTOCOL])
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ------------- Recording -------------
+
+    def reset_stats(self):
+        self.requests.clear()
+        self.round_trips = 0
+        self.first_request_ts = None
+        self.last_reply_ts = None
+
+    def request_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for _, request_type, _ in self.requests:
+            counts[request_type] = counts.get(request_type, 0) + 1
+        return counts
+
+    @property
+    def obs_span(self) -> float:
+        """Seconds from the first request received to the last reply sent since reset_stats()."""
+        if self.first_request_ts is None or self.last_reply_ts is None:
+            return 0.0
+        return self.last_reply_ts - self.first_request_ts
+
+    # ------------- Connection handling -------------
+
+    async def _handle(self, ws):
+        hello: Dict[str, Any] = {"obsWebSocketVersion": "5.5.0", "rpcVersion": 1}
+        salt = challenge = None
+        if self.password:
+            salt, challenge = secrets.token_urlsafe(16), secrets.token_urlsafe(16)
+            hello["authentication"] = {"challenge": challenge, "salt": salt}
+        await ws.send(json.dumps({"op": 0, "d": hello}))
+
+        identify = json.loads(await ws.recv())
+        if identify.get("op") != 1:
+            await ws.close(4007, "Expected Identify")
+            return
+        d = identify.get("d") or {}
+        if self.password:
+            secret = base64.b64encode(hashlib.sha256((self.password + salt).encode()).digest()).decode()
+            expected = base64.b64encode(hashlib.sha256((secret + challenge).encode()).digest()).decode()
+            if d.get("authentication") != expected:
+                await ws.close(4009, "Authentication failed")
+                return
+        self._clients[ws] = d.get("eventSubscriptions", 0x7FF)
+        await ws.send(json.dumps({"op": 2, "d": {"negotiatedRpcVersion": 1}}))
+
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                op, d = msg.get("op"), msg.get("d") or {}
+                if op in (6, 8):
+                    self.round_trips += 1
+                    if self.first_request_ts is None:
+                        self.first_request_ts = time.monotonic()
+                    # Like OBS, answer out of order rather than head-of-line blocking
+                    asyncio.create_task(self._answer(ws, op, d))
+                elif op == 3:
+                    self._clients[ws] = d.get("eventSubscriptions", self._clients[ws])
+        finally:
+            self._clients.pop(ws, None)
+
+    async def _answer(self, ws, op: int, d: Dict[str, Any]):
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if op == 6:
+            reply = {"op": 7, "d": {"requestType": d.get("requestType"), "requestId": d.get("requestId"),
+                                    **self._run(d.get("requestType", ""), d.get("requestData") or {})}}
+        else:
+            results = []
+            for request in d.get("requests", []):
+                result = {"requestType": request.get("requestType"),
+                          **self._run(request.get("requestType", ""), request.get("requestData") or {})}
+                if "requestId" in request:
+                    result["requestId"] = request["requestId"]
+                results.append(result)
+                if d.get("haltOnFailure") and not result["requestStatus"]["result"]:
+                    break
+            reply = {"op": 9, "d": {"requestId": d.get("requestId"), "results": results}}
+
+        try:
+            await ws.send(json.dumps(reply))
+        except Exception:
+            return
+        self.last_reply_ts = time.monotonic()
+
+    async def _emit(self, subscription: int, event_type: str, event_data: Dict[str, Any]):
+        msg = json.dumps({"op": 5, "d": {"eventType": event_type, "eventIntent": subscription, "eventData": event_data}})
+        for ws, subs in list(self._clients.items()):
+            if subs & subscription:
+                try:
+                    await ws.send(msg)
+                except Exception:
+                    pass
+
+    def _event(self, subscription: int, event_type: str, event_data: Dict[str, Any]):
+        asyncio.create_task(self._emit(subscription, event_type, event_data))
+
+    # ------------- Scene graph -------------
+
+    def _add_item(self, scene: str, source: str) -> Dict[str, Any]:
+        item = {
+            "sceneItemId": self._next_item_id,
+            "sourceName": source,
+            "sceneItemEnabled": True,
+            "sceneItemIndex": len(self.scenes.get(scene, [])),
+            "sceneItemTransform": {
+                "positionX": 0.0, "positionY": 0.0, "scaleX": 1.0, "scaleY": 1.0, "rotation": 0.0,
+                "sourceWidth": 100.0, "sourceHeight": 100.0, "width": 100.0, "height": 100.0,
+                "cropLeft": 0, "cropRight": 0, "cropTop": 0, "cropBottom": 0,
+            },
+        }
+        self._next_item_id += 1
+        self.scenes.setdefault(scene, []).append(item)
+        return item
+
+    def _scene(self, name: str) -> List[Dict[str, Any]]:
+        if name not in self.scenes:
+            if not self.auto_create:
+                raise _RequestFailed(STATUS_RESOURCE_NOT_FOUND, f"No source was found by the name of `{name}`.")
+            self.scenes[name] = []
+        return self.scenes[name]
+
+    def _item_by_name(self, scene: str, source: str) -> Dict[str, Any]:
+        items = self._scene(scene)
+        for item in items:
+            if item["sourceName"] == source:
+                return item
+        if not self.auto_create:
+            raise _RequestFailed(STATUS_RESOURCE_NOT_FOUND, f"No scene items were found in scene `{scene}` with the name `{source}`.")
+        return self._add_item(scene, source)
+
+    def _item_by_id(self, scene: str, item_id: int) -> Dict[str, Any]:
+        for item in self._scene(scene):
+            if item["sceneItemId"] == item_id:
+                return item
+        raise _RequestFailed(STATUS_RESOURCE_NOT_FOUND, f"No scene item with id {item_id} in scene `{scene}`.")
+
+    def _input(self, name: str) -> Dict[str, Any]:
+        if name not in self.inputs:
+            if not self.auto_create:
+                raise _RequestFailed(STATUS_RESOURCE_NOT_FOUND, f"No source was found by the name of `{name}`.")
+            self.inputs[name] = {"text": ""}
+        return self.inputs[name]
+
+    # ------------- Requests -------------
+
+    def _run(self, request_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        self.requests.append((time.monotonic(), request_type, data))
+        handler = getattr(self, f"_req_{request_type}", None)
+        if handler is None:
+            return {"requestStatus": {"result": False, "code": STATUS_UNKNOWN_REQUEST_TYPE,
+                                      "comment": f"Your request type is not valid: {request_type}"}}
+        try:
+            response = handler(data)
+        except _RequestFailed as e:
+            return {"requestStatus": {"result": False, "code": e.code, "comment": e.comment}}
+        except KeyError as e:
+            return {"requestStatus": {"result": False, "code": STATUS_MISSING_REQUEST_FIELD,
+                                      "comment": f"Your request is missing the `{e.args[0]}` field."}}
+        out: Dict[str, Any] = {"requestStatus": {"result": True, "code": STATUS_SUCCESS}}
+        if response is not None:
+            out["responseData"] = response
+        return out
+
+    def _req_GetVersion(self, data):
+        return {"obsVersion": "30.0.0", "obsWebSocketVersion": "5.5.0", "rpcVersion": 1,
+                "availableRequests": sorted(n[5:] for n in dir(self) if n.startswith("_req_"))}
+
+    def _req_Sleep(self, data):
+        return None
+
+    def _req_GetCurrentProgramScene(self, data):
+        return {"currentProgramSceneName": self.program_scene, "sceneName": self.program_scene}
+
+    def _req_SetCurrentProgramScene(self, data):
+        self._scene(data["sceneName"])
+        self.program_scene = data["sceneName"]
+        self._event(SUB_SCENES, "CurrentProgramSceneChanged", {"sceneName": self.program_scene})
+
+    def _req_GetSceneList(self, data):
+        return {"currentProgramSceneName": self.program_scene,
+                "scenes": [{"sceneName": name, "sceneIndex": i} for i, name in enumerate(self.scenes)]}
+
+    def _req_GetSceneItemList(self, data):
+        scene = data["sceneName"]
+        return {"sceneItems": [{k: v for k, v in item.items() if k != "sceneItemTransform"} for item in self._scene(scene)]}
+
+    def _req_GetSceneItemId(self, data):
+        return {"sceneItemId": self._item_by_name(data["sceneName"], data["sourceName"])["sceneItemId"]}
+
+    def _req_GetSceneItemEnabled(self, data):
+        return {"sceneItemEnabled": self._item_by_id(data["sceneName"], data["sceneItemId"])["sceneItemEnabled"]}
+
+    def _req_SetSceneItemEnabled(self, data):
+        item = self._item_by_id(data["sceneName"], data["sceneItemId"])
+        item["sceneItemEnabled"] = bool(data["sceneItemEnabled"])
+        self._event(SUB_SCENE_ITEMS, "SceneItemEnableStateChanged",
+                    {"sceneName": data["sceneName"], "sceneItemId": item["sceneItemId"],
+                     "sceneItemEnabled": item["sceneItemEnabled"]})
+
+    def _req_GetSceneItemTransform(self, data):
+        return {"sceneItemTransform": dict(self._item_by_id(data["sceneName"], data["sceneItemId"])["sceneItemTransform"])}
+
+    def _req_SetSceneItemTransform(self, data):
+        item = self._item_by_id(data["sceneName"], data["sceneItemId"])
+        item["sceneItemTransform"].update(data["sceneItemTransform"])
+
+    def _req_GetInputSettings(self, data):
+        return {"inputSettings": dict(self._input(data["inputName"])), "inputKind": "text_gdiplus_v3"}
+
+    def _req_SetInputSettings(self, data):
+        settings = self._input(data["inputName"])
+        if data.get("overlay", True):
+            settings.update(data["inputSettings"])
+        else:
+            settings.clear()
+            settings.update(data["inputSettings"])
+        self._event(SUB_INPUTS, "InputSettingsChanged", {"inputName": data["inputName"], "inputSettings": dict(settings)})
+
+    def _req_GetInputKindList(self, data):
+        return {"inputKinds": ["text_gdiplus_v3", "image_source", "ffmpeg_source"]}
+
+    def _req_SetSourceFilterEnabled(self, data):
+        self.filters[(data["sourceName"], data["filterName"])] = bool(data["filterEnabled"])
+        self._event(SUB_FILTERS, "SourceFilterEnableStateChanged",
+                    {"sourceName": data["sourceName"], "filterName": data["filterName"],
+                     "filterEnabled": bool(data["filterEnabled"])})
+
+
+async def _serve_forever(args):
+    server = FakeOBSServer(args.host, args.port, args.password, args.latency, args.jitter)
+    await server.start()
+    print(f"Fake OBS websocket listening on ws://{server.host}:{server.port} "
+          f"(latency={args.latency * 1000:.1f}ms jitter={args.jitter * 1000:.1f}ms)")
+    try:
+        await asyncio.Future()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake obs-websocket v5 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4455)
+    parser.add_argument("--password", default="")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random seconds added to latency")
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.functions.client_queue import EVICT_CLOSE_CODE, EVICTIONS, QueuedSender, _clients_by_route
+
+
+class _Socket:
+    """Records what a QueuedSender writes; each send takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def test_messages_go_out_in_order():
+    async def main():
+        socket = _Socket()
+        sender = QueuedSender(socket, "test in order")
+        assert sender.put({"n": 1})
+        assert sender.put('{"n":2}')
+        assert sender.put(b"\x03")
+        await asyncio.sleep(0.05)
+        assert socket.sent == ['{"n":1}', '{"n":2}', b"\x03"]
+        sender.close()
+
+    asyncio.run(main())
+
+
+def test_full_queue_evicts_the_client():
+    async def main():
+        socket = _Socket(delay=10.0)
+        evicted = []
+        sender = QueuedSender(socket, "test full queue", max_queue=3, on_evict=evicted.append)
+        before = EVICTIONS.labels("test full queue").value
+        assert _clients_by_route().get("test full queue") == 1
+        assert all(sender.put(i) for i in range(3))
+        assert not sender.put(3)
+        await asyncio.sleep(0.05)
+        assert evicted == [sender]
+        assert socket.close_code == EVICT_CLOSE_CODE
+        assert EVICTIONS.labels("test full queue").value == before + 1
+        assert "test full queue" not in _clients_by_route()
+        assert not sender.put(4)
+
+    asyncio.run(main())
+
+
+def test_slow_send_evicts_without_holding_up_other_clients():
+    async def main():
+        slow, fast = _Socket(delay=10.0), _Socket()
+        evicted = []
+        slow_sender = QueuedSender(slow, "test slow", send_timeout=0.1, on_evict=evicted.append)
+        fast_sender = QueuedSender(fast, "test fast", send_timeout=0.1)
+        for sender in (slow_sender, fast_sender):
+            sender.put("hello")
+        await asyncio.sleep(0.05)
+        assert fast.sent == ["hello"]
+        assert not evicted
+        await asyncio.sleep(0.15)
+        assert evicted == [slow_sender]
+        assert slow.close_code == EVICT_CLOSE_CODE
+        fast_sender.close()
+
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+from app.control_channel import MAX_IN_FLIGHT, ControlConnection, ControlError, ControlRouter
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def _by_character(topic, payload):
+    return ("character", topic.partition(":")[2])
+
+
+def _router(log):
+    router = ControlRouter()
+
+    @router.route("character", "pick", ordered_by=_by_character)
+    async def pick(conn, topic, payload):
+        log.append(("start", topic, payload["n"]))
+        await asyncio.sleep(payload.get("delay", 0.05))
+        log.append(("end", topic, payload["n"]))
+        return {"n": payload["n"]}
+
+    @router.route("poll", "start")
+    async def start(conn, topic, payload):
+        await asyncio.sleep(payload.get("delay", 0))
+        if payload.get("fail"):
+            raise ControlError("no poll")
+        return {"status": "poll_started"}
+
+    return router
+
+
+def _command(topic, type_, id_, **payload):
+    return {"topic": topic, "type": type_, "id": id_, "payload": payload}
+
+
+def test_commands_with_the_same_key_run_one_at_a_time_in_order():
+    async def main():
+        log = []
+        router = _router(log)
+        conn = ControlConnection(_Socket(), "test control")
+        other = ControlConnection(_Socket(), "test control")
+        # Later commands are quicker, so only the ordering key keeps them in order
+        await conn.spawn(router.handle(conn, _command("character:1", "pick", 1, n=1, delay=0.1)))
+        await other.spawn(router.handle(other, _command("character:1", "pick", 2, n=2, delay=0.01)))
+        await conn.spawn(router.handle(conn, _command("character:2", "pick", 3, n=3, delay=0.01)))
+        await asyncio.sleep(0.3)
+        one = [entry for entry in log if entry[1] == "character:1"]
+        assert one == [("start", "character:1", 1), ("end", "character:1", 1),
+                       ("start", "character:1", 2), ("end", "character:1", 2)]
+        # Another character didn't wait for character 1
+        assert log.index(("end", "character:2", 3)) < log.index(("end", "character:1", 1))
+        for connection in (conn, other):
+            connection.close()
+
+    asyncio.run(main())
+
+
+def test_ordering_lock_serializes_with_ordered_commands():
+    async def main():
+        log = []
+        router = _router(log)
+        conn = ControlConnection(_Socket(), "test control")
+        await conn.spawn(router.handle(conn, _command("character:1", "pick", 1, n=1, delay=0.1)))
+        await asyncio.sleep(0)
+        async with router.ordering(("character", "1")):
+            log.append(("reset", "character:1", None))
+        assert log == [("start", "character:1", 1), ("end", "character:1", 1), ("reset", "character:1", None)]
+        conn.close()
+
+    asyncio.run(main())
+
+
+def test_replies_carry_the_command_id_and_arrive_as_each_finishes():
+    async def main():
+        router = _router([])
+        socket = _Socket()
+        conn = ControlConnection(socket, "test control")
+        await conn.spawn(router.handle(conn, _command("poll", "start", "slow", delay=0.1)))
+        await conn.spawn(router.handle(conn, _command("poll", "start", "failing", fail=True)))
+        await conn.spawn(router.handle(conn, _command("poll", "stop", 9)))
+        await conn.spawn(router.handle(conn, ["not", "an", "envelope"]))
+        await asyncio.sleep(0.2)
+        replies = {m["id"]: (m["type"], m["payload"]) for m in socket.sent}
+        assert replies["failing"] == ("error", {"message": "no poll"})
+        assert replies[9] == ("error", {"message": "Unknown command: poll stop"})
+        assert replies[None] == ("error", {"message": "Expected a JSON object"})
+        assert replies["slow"] == ("ok", {"status": "poll_started"})
+        assert socket.sent[-1]["id"] == "slow"
+        conn.close()
+
+    asyncio.run(main())
+
+
+def test_spawn_waits_once_max_in_flight_commands_are_running():
+    async def main():
+        release = asyncio.Event()
+        router = ControlRouter()
+
+        @router.route("gun", "shoot")
+        async def shoot(conn, topic, payload):
+            await release.wait()
+            return {}
+
+        conn = ControlConnection(_Socket(), "test control")
+        for i in range(MAX_IN_FLIGHT):
+            await conn.spawn(router.handle(conn, _command("gun", "shoot", i)))
+        blocked = asyncio.ensure_future(conn.spawn(router.handle(conn, _command("gun", "shoot", "extra"))))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1.0)
+        await asyncio.sleep(0.05)
+        assert len(conn.websocket.sent) == MAX_IN_FLIGHT + 1
+        conn.close()
+
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.functions.countdown import CountdownScheduler
+
+
+def test_expires_once_at_the_deadline():
+    async def main():
+        scheduler = CountdownScheduler()
+        fired = []
+        loop = asyncio.get_running_loop()
+        timer = scheduler.start(0.1, lambda: fired.append(loop.time()))
+        deadline = timer.deadline
+        await asyncio.sleep(0.25)
+        assert len(fired) == 1
+        assert deadline <= fired[0] < deadline + 0.1
+        assert timer.expired and timer.remaining() == 0.0
+
+    asyncio.run(main())
+
+
+def test_cancelled_timer_never_expires():
+    async def main():
+        scheduler = CountdownScheduler()
+        fired = []
+        timer = scheduler.start(0.05, lambda: fired.append("expired"))
+        timer.cancel()
+        timer.cancel()
+        await asyncio.sleep(0.1)
+        assert fired == []
+        assert timer.done and not timer.expired
+
+    asyncio.run(main())
+
+
+def test_sooner_timer_started_later_still_fires_first():
+    async def main():
+        scheduler = CountdownScheduler()
+        order = []
+        scheduler.start(0.2, lambda: order.append("long"))
+        await asyncio.sleep(0)
+        scheduler.start(0.05, lambda: order.append("short"))
+        await asyncio.sleep(0.3)
+        assert order == ["short", "long"]
+
+    asyncio.run(main())
+
+
+def test_on_second_reports_each_whole_second_once():
+    async def main():
+        scheduler = CountdownScheduler()
+        shown = []
+        scheduler.start(1.2, on_second=shown.append)
+        await asyncio.sleep(1.35)
+        assert shown == [2, 1, 0]
+
+    asyncio.run(main())
+
+
+def test_coroutine_callbacks_run_and_errors_are_contained():
+    async def main():
+        scheduler = CountdownScheduler()
+        fired = []
+
+        async def expire():
+            fired.append("async")
+
+        def broken():
+            raise RuntimeError("boom")
+
+        scheduler.start(0.05, broken)
+        scheduler.start(0.06, expire)
+        await asyncio.sleep(0.15)
+        assert fired == ["async"]
+
+    asyncio.run(main())
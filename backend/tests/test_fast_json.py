@@ -0,0 +1,39 @@
+import importlib
+import sys
+
+import pytest
+
+import app.functions.fast_json as fast_json
+
+PAYLOAD = {"topic": "character:2", "type": "state", "id": None, "seq": 7,
+           "payload": {"name": "Zoë", "visible": True, "votes": [1, 2.5]}}
+
+
+def _without_orjson(monkeypatch):
+    monkeypatch.setitem(sys.modules, "orjson", None)  # import orjson -> ImportError
+    return importlib.reload(fast_json)
+
+
+def test_stdlib_fallback_is_compact_utf8_json(monkeypatch):
+    try:
+        module = _without_orjson(monkeypatch)
+        assert module.ENCODER == "json"
+        text = module.dumps(PAYLOAD)
+        assert text == '{"topic":"character:2","type":"state","id":null,"seq":7,' \
+                       '"payload":{"name":"Zoë","visible":true,"votes":[1,2.5]}}'
+        assert module.loads(text) == PAYLOAD
+        assert module.loads(text.encode("utf-8")) == PAYLOAD
+    finally:
+        monkeypatch.undo()
+        importlib.reload(fast_json)
+
+
+def test_orjson_writes_the_same_text_as_the_fallback(monkeypatch):
+    pytest.importorskip("orjson")
+    try:
+        fallback = _without_orjson(monkeypatch).dumps(PAYLOAD)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(fast_json)
+    assert fast_json.ENCODER == "orjson"
+    assert fast_json.dumps(PAYLOAD) == fallback
@@ -0,0 +1,71 @@
+import pytest
+
+from app.functions.metrics import MetricsRegistry
+
+
+def _lines(registry: MetricsRegistry, prefix: str):
+    return [line for line in registry.render().splitlines() if line.startswith(prefix)]
+
+
+def test_counter_renders_help_type_and_one_line_per_label_set():
+    registry = MetricsRegistry()
+    votes = registry.counter("votes_total", "Votes counted", ("poll", "result"))
+    new = votes.labels("duel", "new")
+    new.inc()
+    new.inc(2)
+    votes.labels("duel", "changed").inc()
+    text = registry.render()
+    assert text.endswith("\n")
+    assert text.splitlines() == [
+        "# HELP votes_total Votes counted",
+        "# TYPE votes_total counter",
+        'votes_total{poll="duel",result="new"} 3',
+        'votes_total{poll="duel",result="changed"} 1',
+    ]
+    assert votes.labels("duel", "new") is new
+
+
+def test_histogram_buckets_are_cumulative_and_end_with_inf():
+    registry = MetricsRegistry()
+    latency = registry.histogram("rtt_seconds", "Round trips", buckets=(0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        latency.observe(value)
+    assert _lines(registry, "rtt_seconds") == [
+        'rtt_seconds_bucket{le="0.1"} 2',
+        'rtt_seconds_bucket{le="0.5"} 3',
+        'rtt_seconds_bucket{le="1.0"} 3',
+        'rtt_seconds_bucket{le="+Inf"} 4',
+        "rtt_seconds_sum 2.45",
+        "rtt_seconds_count 4",
+    ]
+
+
+def test_gauges_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    clients = {("overlay",): 3, "control": 1}
+    registry.gauge("ws_clients", "Connected clients", lambda: clients, ("route",))
+    depth = [0]
+    registry.gauge("tts_queue_depth", "Queued messages", lambda: depth[0])
+    registry.gauge("broken", "Read fails", lambda: 1 / 0)
+    depth[0] = 5
+    assert _lines(registry, "ws_clients") == ['ws_clients{route="overlay"} 3', 'ws_clients{route="control"} 1']
+    assert _lines(registry, "tts_queue_depth") == ["tts_queue_depth 5"]
+    # A failing read leaves just the header and doesn't break the scrape
+    assert _lines(registry, "broken") == []
+    assert "# TYPE broken gauge" in registry.render()
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("chat_total", "Chat", ("user",)).labels('a "b"\\\nc').inc()
+    assert _lines(registry, "chat_total") == ['chat_total{user="a \\"b\\"\\\\\\nc"} 1']
+
+
+def test_same_name_returns_the_registered_metric_and_labels_are_checked():
+    registry = MetricsRegistry()
+    first = registry.counter("dropped_total", "Dropped", ("type",))
+    assert registry.counter("dropped_total", "Dropped", ("type",)) is first
+    assert registry.get("dropped_total") is first
+    with pytest.raises(ValueError):
+        first.labels("a", "b")
+    assert registry.render().count("# TYPE dropped_total") == 1
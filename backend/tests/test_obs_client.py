@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from app.functions.obs_client import AsyncOBSClient, OBSRequestError
+from benchmarks.fake_obs_server import STATUS_RESOURCE_NOT_FOUND, FakeOBSServer
+
+
+async def _client(server: FakeOBSServer) -> AsyncOBSClient:
+    client = AsyncOBSClient("127.0.0.1", server.port)
+    await client.connect()
+    return client
+
+
+def test_requests_are_pipelined_and_matched_by_id():
+    async def main():
+        # Jitter makes the fake OBS answer out of order
+        async with FakeOBSServer(latency=0.2, jitter=0.15) as server:
+            client = await _client(server)
+            sources = [f"Crate {i}" for i in range(1, 13)]
+            started = time.perf_counter()
+            replies = await asyncio.gather(*[
+                client.call("GetSceneItemId", {"sceneName": "Crate Game", "sourceName": source}) for source in sources
+            ])
+            elapsed = time.perf_counter() - started
+            expected = {item["sourceName"]: item["sceneItemId"] for item in server.scenes["Crate Game"]}
+            assert [reply["sceneItemId"] for reply in replies] == [expected[source] for source in sources]
+            assert server.round_trips == 12
+            assert elapsed < 1.0  # one after another would take over 2 s
+            await client.disconnect()
+
+    asyncio.run(main())
+
+
+def test_failed_request_raises_without_disturbing_the_others():
+    async def main():
+        async with FakeOBSServer(auto_create=False) as server:
+            client = await _client(server)
+            ok, missing = await asyncio.gather(
+                client.call("GetInputSettings", {"inputName": "Timer"}),
+                client.call("GetInputSettings", {"inputName": "No such input"}),
+                return_exceptions=True,
+            )
+            assert ok["inputSettings"] == {"text": ""}
+            assert isinstance(missing, OBSRequestError)
+            assert missing.code == STATUS_RESOURCE_NOT_FOUND
+            await client.disconnect()
+
+    asyncio.run(main())
+
+
+def test_request_batch_is_one_round_trip_with_results_in_order():
+    async def main():
+        async with FakeOBSServer(auto_create=False) as server:
+            client = await _client(server)
+            requests = [
+                {"requestType": "SetInputSettings", "requestData": {"inputName": "Timer", "inputSettings": {"text": "00:30"}}},
+                {"requestType": "SetInputSettings", "requestData": {"inputName": "No such input", "inputSettings": {"text": "x"}}},
+                {"requestType": "GetInputSettings", "requestData": {"inputName": "Timer"}},
+            ]
+            results = await client.call_batch(requests)
+            assert server.round_trips == 1
+            assert [r["requestStatus"]["result"] for r in results] == [True, False, True]
+            assert results[2]["responseData"]["inputSettings"]["text"] == "00:30"
+
+            halted = await client.call_batch(requests, halt_on_failure=True)
+            assert len(halted) == 2
+            await client.disconnect()
+
+    asyncio.run(main())
+
+
+def test_events_reach_the_handlers():
+    async def main():
+        async with FakeOBSServer() as server:
+            client = await _client(server)
+            events = []
+            client.add_event_handler(lambda event_type, data: events.append((event_type, data)))
+            item_id = server.scenes["Crate Game"][0]["sceneItemId"]
+            await client.call("SetSceneItemEnabled", {"sceneName": "Crate Game", "sceneItemId": item_id, "sceneItemEnabled": False})
+            await asyncio.sleep(0.1)
+            assert ("SceneItemEnableStateChanged",
+                    {"sceneName": "Crate Game", "sceneItemId": item_id, "sceneItemEnabled": False}) in events
+            await client.disconnect()
+
+    asyncio.run(main())
+
+
+def test_dropped_connection_fails_the_requests_in_flight():
+    async def main():
+        server = await FakeOBSServer(latency=5.0).start()
+        client = await _client(server)
+        pending = asyncio.ensure_future(client.call("GetVersion"))
+        await asyncio.sleep(0.1)
+        await server.stop()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(pending, 2.0)
+        assert not client.connected
+
+    asyncio.run(main())
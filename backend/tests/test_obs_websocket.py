@@ -0,0 +1,230 @@
+import asyncio
+import threading
+
+from app.functions.obs_websocket import CircuitBreaker, OBSWebsocketsManager, get_obs_manager
+from benchmarks.fake_obs_server import SUB_INPUTS, SUB_SCENE_ITEMS, FakeOBSServer
+
+
+async def _manager(server: FakeOBSServer, **kwargs) -> OBSWebsocketsManager:
+    obs = OBSWebsocketsManager("127.0.0.1", server.port, "", **kwargs)
+    await obs.call_async("GetVersion")  # connects
+    server.reset_stats()
+    return obs
+
+
+async def _close(obs: OBSWebsocketsManager):
+    await obs.disconnect_async()
+    obs._loop.call_soon_threadsafe(obs._loop.stop)
+
+
+async def _until(condition, timeout: float = 3.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def _item(server: FakeOBSServer, scene: str, source: str) -> dict:
+    return next(item for item in server.scenes[scene] if item["sourceName"] == source)
+
+
+def test_scene_item_ids_come_from_one_scene_list():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            for i in range(1, 13):
+                await obs.set_source_visibility_async("Crate Game", f"Crate {i}", False)
+            counts = server.request_counts()
+            assert counts.get("GetSceneItemList") == 1
+            assert "GetSceneItemId" not in counts
+            assert counts["SetSceneItemEnabled"] == 12
+            assert not _item(server, "Crate Game", "Crate 12")["sceneItemEnabled"]
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_scene_item_cache_follows_renames_and_removals():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            await obs.warm_scene_item_cache_async("Crate Game")
+            item = _item(server, "Crate Game", "Crate 1")
+
+            # Renamed in OBS: the cached id moves to the new name
+            item["sourceName"] = "Crate One"
+            server._event(SUB_INPUTS, "InputNameChanged", {"oldInputName": "Crate 1", "inputName": "Crate One"})
+            await asyncio.sleep(0.1)
+            server.reset_stats()
+            await obs.set_source_visibility_async("Crate Game", "Crate One", False)
+            assert server.request_counts() == {"SetSceneItemEnabled": 1}
+
+            # Removed in OBS: the next write has to look the item up again
+            server._event(SUB_SCENE_ITEMS, "SceneItemRemoved",
+                          {"sceneName": "Crate Game", "sourceName": "Crate One", "sceneItemId": item["sceneItemId"]})
+            await asyncio.sleep(0.1)
+            server.reset_stats()
+            await obs.set_source_visibility_async("Crate Game", "Crate One", True)
+            assert server.request_counts() == {"GetSceneItemId": 1, "SetSceneItemEnabled": 1}
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_writes_obs_already_shows_are_skipped():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            await obs.set_text_async("Timer", "00:30")
+            await obs.set_text_async("Timer", "00:30")
+            # Items are visible in OBS, and the scene list told us so
+            await obs.set_source_visibility_async("Crate Game", "Crate 1", True)
+            assert server.request_counts() == {"SetInputSettings": 1, "GetSceneItemList": 1}
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_changes_made_elsewhere_update_the_shadow():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            await obs.set_source_visibility_async("Crate Game", "Crate 1", False)
+
+            # Someone turns it back on in OBS; the same write must go out again
+            item = _item(server, "Crate Game", "Crate 1")
+            other = OBSWebsocketsManager("127.0.0.1", server.port, "")
+            await other.call_async("SetSceneItemEnabled", {"sceneName": "Crate Game", "sceneItemId": item["sceneItemId"],
+                                                           "sceneItemEnabled": True})
+            await asyncio.sleep(0.1)
+            await obs.set_source_visibility_async("Crate Game", "Crate 1", False)
+            assert not item["sceneItemEnabled"]
+            await _close(other)
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_batch_resolves_ids_and_sends_one_request_batch():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            batch = obs.batch()
+            for i in range(1, 13):
+                batch.set_source_visibility("Crate Game", f"Crate {i}", True)   # already visible: skipped
+                batch.set_source_visibility("Crate Game", f"Bomb {i}", i == 5)
+            batch.set_text("Timer", "00:10")
+            results = await batch.send_async()
+            assert server.round_trips == 2  # GetSceneItemList + RequestBatch
+            assert len(results) == 12
+            assert [item["sourceName"] for item in server.scenes["Crate Game"] if item["sceneItemEnabled"]].count("Bomb 5") == 1
+            assert not _item(server, "Crate Game", "Bomb 4")["sceneItemEnabled"]
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_every_thread_shares_one_connection():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            threads = [threading.Thread(target=obs.set_text, args=(f"Character {i} Text", f"hi {i}")) for i in range(1, 6)]
+            for thread in threads:
+                thread.start()
+            await asyncio.gather(*[obs.set_text_async(f"Character {i} Name", f"name {i}") for i in range(1, 6)])
+            await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+            assert len(server._clients) == 1
+            assert server.inputs["Character 5 Text"]["text"] == "hi 5"
+            assert server.inputs["Character 5 Name"]["text"] == "name 5"
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_shared_manager_is_created_once():
+    assert get_obs_manager() is get_obs_manager()
+
+
+def test_coalesced_text_sends_the_latest_value_at_most_once_per_interval():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server)
+            for second in range(50):
+                obs.set_text_coalesced("Timer", f"00:{second:02d}", min_interval=0.3)
+            await asyncio.sleep(0.1)
+            await obs.flush_text_async()
+            assert server.inputs["Timer"]["text"] == "00:49"
+            assert server.request_counts()["SetInputSettings"] <= 2
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_breaker_opens_queues_the_latest_write_and_replays_it():
+    async def main():
+        async with FakeOBSServer() as server:
+            obs = await _manager(server, request_timeout=0.1)
+            obs._breaker.reset_timeout = 0.2
+            server.latency = 0.5
+            for second in range(5):
+                await obs.set_text_async("Timer", f"00:{second:02d}")  # never raises
+            assert obs._breaker.state == CircuitBreaker.OPEN
+            assert len(obs._degraded) == 1  # one target, newest value only
+
+            await asyncio.sleep(0.6)  # let the late answers land first
+            server.latency = 0.0
+            await obs.call_async("GetVersion")  # half-open trial succeeds
+            assert obs._breaker.state == CircuitBreaker.CLOSED
+            await _until(lambda: server.inputs["Timer"]["text"] == "00:04")
+            assert not obs._degraded
+            await _close(obs)
+
+    asyncio.run(main())
+
+
+def test_cancelled_trial_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0)
+    breaker.record_failure(now=0.0)
+    assert not breaker.allow(now=0.5)
+    assert breaker.allow(now=2.0)       # the half-open trial
+    assert not breaker.allow(now=2.0)   # only one at a time
+    breaker.release_trial()             # it was cancelled before OBS answered
+    assert breaker.allow(now=2.1)
+
+
+def test_writes_while_disconnected_are_replayed_after_reconnect():
+    async def main():
+        server = await FakeOBSServer().start()
+        port = server.port
+        resets = []
+        obs = await _manager(server)
+        obs.add_reset_listener(lambda: resets.append(True))
+        await obs.set_text_async("Timer", "00:30")
+
+        await server.stop()
+        await _until(lambda: not obs.connected)
+        # Same value as before the drop: must still be queued, not skipped
+        await obs.set_text_async("Timer", "00:30")
+        assert len(obs._degraded) == 1
+
+        server = await FakeOBSServer(port=port).start()   # a fresh OBS ("Timer" is empty)
+        await _until(lambda: server.inputs["Timer"]["text"] == "00:30", timeout=5.0)
+        assert resets  # renderers are told to redraw
+        await _close(obs)
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def test_drop_policy_counts_dropped_writes():
+    async def main():
+        server = await FakeOBSServer().start()
+        obs = await _manager(server, degraded_policy="drop")
+        await server.stop()
+        await _until(lambda: not obs.connected)
+        await obs.set_text_async("Timer", "00:30")
+        assert obs.dropped_writes == 1 and not obs._degraded
+        await _close(obs)
+
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import asyncio
+
+from app.functions.poll_engine import VOTE_ENDED_POLL, VOTE_INACTIVE, VOTE_INVALID, Poll
+from app.functions.vote_counter import VOTE_DUPLICATE, VOTE_NEW
+
+
+class _Engine:
+    """Stands in for PollEngine: nothing is drawn."""
+
+    async def draw_started(self):
+        pass
+
+    async def draw_ended(self):
+        pass
+
+
+def _poll(**kwargs) -> Poll:
+    ends = []
+
+    async def on_end(poll, reason, snap):
+        ends.append((reason, snap.counts, asyncio.get_running_loop()))
+
+    poll = Poll("test", 2, on_end=on_end, **kwargs)
+    poll.engine = _Engine()
+    poll.ends = ends
+    return poll
+
+
+def test_votes_only_count_while_active():
+    async def main():
+        poll = _poll()
+        assert await poll.vote(0) == VOTE_INACTIVE
+        await poll.start()
+        assert await poll.vote(5) == VOTE_INVALID
+        assert await poll.vote(0, "ann", "twitch") == VOTE_NEW
+        assert await poll.vote(0, "ann", "twitch") == VOTE_DUPLICATE
+        snap = await poll.end()
+        assert snap.counts == (1, 0)
+        assert await poll.vote(0) == VOTE_INACTIVE
+        assert await poll.end() is None
+        assert [reason for reason, _, _ in poll.ends] == ["manual"]
+
+    asyncio.run(main())
+
+
+def test_threshold_ends_the_poll_once_on_its_own_loop():
+    async def main():
+        poll = _poll(end_threshold=0.7)
+        await poll.start()
+        home = asyncio.get_running_loop()
+
+        def twitch_vote(username):
+            # twitchAPI votes arrive on a loop of their own
+            return asyncio.run(poll.vote(0, username, "twitch"))
+
+        results = await asyncio.gather(
+            asyncio.to_thread(twitch_vote, "ann"),
+            asyncio.to_thread(twitch_vote, "bob"),
+            poll.vote(0, "cat", "tiktok"),
+        )
+        assert VOTE_ENDED_POLL in results
+        assert set(results) <= {VOTE_ENDED_POLL, VOTE_INACTIVE}
+        assert len(poll.ends) == 1
+        reason, _, loop = poll.ends[0]
+        assert reason == "threshold"
+        assert loop is home
+        assert poll.filled_by == 0
+
+    asyncio.run(main())
+
+
+def test_timer_ends_the_poll():
+    async def main():
+        poll = _poll()
+        await poll.start(duration_s=1)
+        assert poll.time_left_s == 1
+        await asyncio.sleep(1.2)
+        assert not poll.active
+        assert [reason for reason, _, _ in poll.ends] == ["timer"]
+        assert poll.time_left_s == 0
+
+    asyncio.run(main())
+
+
+def test_timer_from_before_a_restart_does_not_end_the_new_poll():
+    async def main():
+        poll = _poll()
+        await poll.start(duration_s=30)
+        old_timer = poll.timer
+        await poll.start(duration_s=30)
+        # The old timer had already fired and its callback only runs now
+        old_timer.expired = True
+        await old_timer.on_expire()
+        assert poll.active
+        assert poll.ends == []
+        assert old_timer.cancelled and not poll.timer.done
+        await poll.end()
+
+    asyncio.run(main())
+
+
+def test_restart_clears_votes_and_the_threshold_winner():
+    async def main():
+        poll = _poll(end_threshold=0.7, baseline=(20, 20))
+        await poll.start()
+        for i in range(100):
+            if await poll.vote(1, f"viewer{i}", "tiktok") == VOTE_ENDED_POLL:
+                break
+        assert poll.filled_by == 1
+        await poll.start()
+        assert poll.active and poll.filled_by is None
+        assert poll.snapshot().counts == (20, 20)
+        assert await poll.vote(1, "viewer0", "tiktok") == VOTE_NEW
+        await poll.end()
+
+    asyncio.run(main())
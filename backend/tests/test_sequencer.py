@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from app.functions.frame_renderer import item_target, text_target
+from app.functions.sequencer import Call, Sequencer, Sound, Wait
+
+
+class _Batch:
+    def __init__(self, log):
+        self.log = log
+        self.items = []
+
+    def set_text(self, source, text):
+        self.items.append((source, text))
+
+    def set_source_visibility(self, scene, source, visible):
+        self.items.append((scene, source, visible))
+
+    async def send_async(self):
+        self.log.append(("obs", self.items))
+
+
+class _OBS:
+    def __init__(self, log):
+        self.log = log
+
+    def batch(self):
+        return _Batch(self.log)
+
+    async def warm_scene_item_cache_async(self, *scenes):
+        self.log.append(("warm", scenes))
+
+
+class _Sound:
+    def __init__(self, path, log):
+        self.path = path
+        self.log = log
+
+    def stop(self):
+        self.log.append(("stop", self.path))
+
+
+class _Audio:
+    """play_audio runs in the executor; load_s mimics reading the file."""
+
+    def __init__(self, log, load_s: float = 0.0):
+        self.log = log
+        self.load_s = load_s
+
+    def play_audio(self, path, *args):
+        time.sleep(self.load_s)
+        self.log.append(("play", path))
+        return _Sound(path, self.log)
+
+
+def test_steps_run_in_order_in_the_background():
+    async def main():
+        log = []
+        sequencer = Sequencer(_OBS(log), _Audio(log))
+        animation = sequencer.play("crates", [
+            Sound("drum.ogg", wait=True),   # unknown length: doesn't wait
+            {item_target("Crate Game", "Crate 1"): False},
+            Call(lambda: log.append(("call",))),
+            Wait(0.01),
+            {text_target("Timer"): "done"},
+        ])
+        assert log == [] and sequencer.busy("crates")
+        assert await animation
+        assert log == [
+            ("warm", ("Crate Game",)),
+            ("play", "drum.ogg"),
+            ("obs", [("Crate Game", "Crate 1", False)]),
+            ("call",),
+            ("obs", [("Timer", "done")]),
+        ]
+        assert not sequencer.busy("crates")
+
+    asyncio.run(main())
+
+
+def test_animations_in_a_group_run_one_after_another():
+    async def main():
+        log = []
+        sequencer = Sequencer(_OBS(log), _Audio(log))
+        first = sequencer.play("crates", [Wait(0.05), Call(lambda: log.append("first"))])
+        second = sequencer.play("crates", [Call(lambda: log.append("second"))])
+        other = sequencer.play("duel", [Call(lambda: log.append("other"))])
+        await asyncio.gather(first.wait(), second.wait(), other.wait())
+        assert log == ["other", "first", "second"]
+
+    asyncio.run(main())
+
+
+def test_cancel_stops_at_the_current_step_and_silences_its_sounds():
+    async def main():
+        log = []
+        sequencer = Sequencer(_OBS(log), _Audio(log))
+        animation = sequencer.play("crates", [Sound("drum.ogg"), Wait(10), Call(lambda: log.append("reveal"))])
+        queued = sequencer.play("crates", [Call(lambda: log.append("next"))])
+        await asyncio.sleep(0.05)
+        sequencer.cancel("crates")
+        assert not await animation
+        assert not await queued
+        assert log == [("play", "drum.ogg"), ("stop", "drum.ogg")]
+
+    asyncio.run(main())
+
+
+def test_sound_still_loading_when_cancelled_is_stopped_once_it_starts():
+    async def main():
+        log = []
+        sequencer = Sequencer(_OBS(log), _Audio(log, load_s=0.2))
+        animation = sequencer.play("crates", [Sound("boom.ogg"), Call(lambda: log.append("reveal"))])
+        await asyncio.sleep(0.05)
+        animation.cancel()
+        assert not await animation
+        await asyncio.sleep(0.3)
+        assert log == [("play", "boom.ogg"), ("stop", "boom.ogg")]
+
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.state_store import SQLiteStateStore, StateStore
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs as another worker process (workers are told apart by WORKER_ID, one per process)
+_OTHER_WORKER = """
+import asyncio, sys
+from app.state_store import SQLiteStateStore
+
+async def main(path, action, arg):
+    store = SQLiteStateStore(path)
+    if action == "lease":
+        print(await store.try_lease("show", float(arg)))
+    else:
+        await store.start()
+        store.publish("hub", {"from": "other", "n": int(arg)})
+    store.stop()
+
+asyncio.run(main(*sys.argv[1:]))
+"""
+
+
+def _other_worker(path, action, arg) -> str:
+    done = subprocess.run([sys.executable, "-c", _OTHER_WORKER, str(path), action, str(arg)],
+                          cwd=BACKEND, capture_output=True, text=True, check=True)
+    return done.stdout.strip().splitlines()[-1] if done.stdout.strip() else ""
+
+
+async def _until(condition, timeout: float = 3.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_values_written_by_one_worker_are_read_by_another(tmp_path):
+    async def main():
+        path = tmp_path / "shared.db"
+        writer, reader = SQLiteStateStore(str(path)), SQLiteStateStore(str(path))
+        await writer.start()
+        writer.set("hub:poll", {"seq": 3, "value": {"active": True}})
+        writer.set("hub:duel", {"seq": 1})
+        writer.set("journal", {"x": 1})
+        await _until(lambda: reader.get("hub:duel") is not None)
+        assert reader.items("hub:") == {"hub:poll": {"seq": 3, "value": {"active": True}}, "hub:duel": {"seq": 1}}
+        writer.delete("hub:poll")
+        await _until(lambda: reader.get("hub:poll") is None)
+        assert reader.get("missing", "default") == "default"
+        writer.stop()
+
+    asyncio.run(main())
+
+
+def test_messages_reach_the_other_workers_only(tmp_path):
+    async def main():
+        path = tmp_path / "shared.db"
+        store = SQLiteStateStore(str(path))
+        received = []
+        store.listen("hub", received.append)
+        await store.start()
+        store.publish("hub", {"from": "us"})           # our own: not delivered to us
+        await asyncio.to_thread(_other_worker, path, "publish", 7)
+        await _until(lambda: received)
+        await asyncio.sleep(0.1)
+        assert received == [{"from": "other", "n": 7}]
+        store.stop()
+
+    asyncio.run(main())
+
+
+def test_lease_goes_to_one_worker_until_it_expires(tmp_path):
+    async def main():
+        path = tmp_path / "shared.db"
+        store = SQLiteStateStore(str(path))
+        assert await asyncio.to_thread(_other_worker, path, "lease", 0.5) == "True"
+        assert not await store.try_lease("show", 5.0)
+        await asyncio.sleep(0.6)
+        assert await store.try_lease("show", 5.0)
+        assert await store.try_lease("show", 5.0)   # renewing our own lease
+        assert await asyncio.to_thread(_other_worker, path, "lease", 5.0) == "False"
+        await store.release_lease("show")
+        assert await asyncio.to_thread(_other_worker, path, "lease", 5.0) == "True"
+
+    asyncio.run(main())
+
+
+def test_in_process_store_shares_nothing_and_always_grants_the_lease():
+    async def main():
+        store = StateStore()
+        assert not store.shared
+        assert await store.try_lease("show", 5.0)
+        store.set("a", 1)
+        assert store.items() == {"a": 1}
+
+    asyncio.run(main())
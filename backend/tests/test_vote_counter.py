@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from app.functions.vote_counter import (
+    VOTE_CHANGED, VOTE_DUPLICATE, VOTE_NEW, VOTE_STALE, BallotBox, VoteCounter, VoterIds,
+)
+
+
+def test_counts_from_many_threads_add_up():
+    counter = VoteCounter(3)
+    start = threading.Barrier(4)
+
+    def vote(option):
+        start.wait()
+        for _ in range(10_000):
+            counter.add(option % 3)
+
+    threads = [threading.Thread(target=vote, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snap = counter.snapshot()
+    assert snap.counts == (20_000, 10_000, 10_000)
+    assert snap.total == 40_000
+
+
+def test_baseline_is_the_starting_tally():
+    counter = VoteCounter(2, baseline=(20, 20))
+    counter.add(1)
+    assert counter.snapshot().counts == (20, 21)
+    assert counter.count(1) == 21
+
+
+def test_reset_starts_a_new_generation():
+    counter = VoteCounter(2)
+    counter.add(0)
+    generation = counter.generation
+    counter.reset()
+    assert counter.generation == generation + 1
+    assert counter.snapshot().counts == (0, 0)
+
+
+def test_write_racing_a_reset_is_dropped_with_the_old_shard():
+    counter = VoteCounter(2)
+    shard = counter._shard()   # a voter got its shard...
+    counter.reset()            # ...then the poll restarted before it wrote
+    shard[0] += 1
+    assert counter.snapshot().total == 0
+    counter.add(0)             # the next vote gets a shard in the new generation
+    assert counter.snapshot().counts == (1, 0)
+
+
+def test_add_for_an_old_generation_is_refused():
+    counter = VoteCounter(2)
+    old = counter.generation
+    counter.reset()
+    assert counter.add(0, generation=old) is False
+    assert counter.add(0, generation=counter.generation) is True
+    assert counter.snapshot().counts == (1, 0)
+
+
+def test_unknown_option_raises():
+    counter = VoteCounter(2)
+    with pytest.raises(IndexError):
+        counter.add(2)
+    with pytest.raises(ValueError):
+        counter.reset(baseline=(1, 2, 3))
+
+
+def test_ballot_moves_instead_of_counting_twice():
+    box = BallotBox(VoteCounter(3))
+    assert box.vote(7, 0) == VOTE_NEW
+    assert box.vote(7, 2) == VOTE_CHANGED
+    assert box.counter.snapshot().counts == (0, 0, 1)
+    assert box.choice(7) == 2
+    assert box.voters == 1
+
+
+def test_repeated_ballot_is_a_duplicate_and_changes_nothing():
+    box = BallotBox(VoteCounter(2))
+    box.vote(0, 1)
+    assert box.vote(0, 1) == VOTE_DUPLICATE
+    assert box.counter.snapshot().counts == (0, 1)
+
+
+def test_reset_forgets_ballots():
+    box = BallotBox(VoteCounter(2))
+    box.vote(3, 0)
+    box.reset()
+    assert box.choice(3) is None
+    assert box.vote(3, 0) == VOTE_NEW
+    assert box.counter.snapshot().counts == (1, 0)
+
+
+def test_ballot_racing_a_reset_is_stale_and_the_voter_can_vote_again():
+    box = BallotBox(VoteCounter(2))
+    before_reset = box._state   # vote() read the ballots...
+    box.reset()                 # ...then the poll restarted
+    box._state, after_reset = before_reset, box._state
+    assert box.vote(5, 0) == VOTE_STALE
+    box._state = after_reset
+    assert box.counter.snapshot().total == 0
+    assert box.vote(5, 0) == VOTE_NEW
+    assert box.counter.snapshot().counts == (1, 0)
+
+
+def test_voter_ids_are_per_platform():
+    ids = VoterIds()
+    assert ids.intern("twitch", "bob") == ids.intern("twitch", "bob")
+    assert ids.intern("twitch", "bob") != ids.intern("tiktok", "bob")
+    assert len(ids) == 2
@@ -0,0 +1,40 @@
+from app.functions.vote_series import VoteSeries
+
+
+def test_one_row_per_second_and_gaps_are_forward_filled():
+    series = VoteSeries(2, capacity=10)
+    series.reset(start_time=0.0)
+    series.sample((1, 0), now=0.2)
+    series.sample((2, 0), now=0.9)   # same second: the newest totals win
+    series.sample((4, 1), now=3.5)   # seconds 1 and 2 nobody sampled
+    assert series.window().tolist() == [[2, 0], [2, 0], [2, 0], [4, 1]]
+
+
+def test_ring_buffer_keeps_only_the_newest_capacity_rows():
+    series = VoteSeries(1, capacity=3)
+    series.reset(start_time=0.0)
+    for second in range(5):
+        series.sample((second,), now=second)
+    assert len(series) == 3
+    assert series.window().tolist() == [[2], [3], [4]]
+    assert series.to_dict()["first_second"] == 2
+
+
+def test_velocity_and_momentum():
+    series = VoteSeries(2, capacity=60)
+    series.reset(start_time=0.0)
+    # option 0: 1 vote/s then 3 votes/s; option 1: steady 2 votes/s
+    total = 0
+    for second in range(11):
+        total += 1 if second <= 5 else 3
+        series.sample((total, 2 * second), now=second)
+    assert series.velocity(window=5).tolist() == [3.0, 2.0]
+    assert series.momentum(window=5).tolist() == [2.0, 0.0]
+
+
+def test_too_few_rows_give_zero_rates():
+    series = VoteSeries(2)
+    series.reset(start_time=0.0)
+    series.sample((5, 5), now=0.0)
+    assert series.velocity().tolist() == [0.0, 0.0]
+    assert series.momentum().tolist() == [0.0, 0.0]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+from app.websocket_manager import HubClient, WebSocketManager
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def _client(name: str = "test hub client") -> HubClient:
+    return HubClient(_Socket(), name)
+
+
+def _received(client: HubClient):
+    return [(m["topic"], m["type"], m["seq"], m["payload"]) for m in client.websocket.sent]
+
+
+async def _ticks(hub: WebSocketManager, n: int = 3):
+    await asyncio.sleep(n / hub.tick_hz)
+
+
+def test_wildcard_subscription_gets_snapshots_then_changes_in_seq_order():
+    async def main():
+        hub = WebSocketManager(tick_hz=100)
+        hub.update("character:1", name="ann", visible=True)
+        hub.update("character:2", name="bob", visible=True)
+        hub.set_state("poll", {"active": False})
+        client = _client()
+        hub.subscribe(client, "character:*")
+        await _ticks(hub)
+        assert sorted(_received(client)) == [
+            ("character:1", "snapshot", 1, {"name": "ann", "visible": True}),
+            ("character:2", "snapshot", 1, {"name": "bob", "visible": True}),
+        ]
+
+        client.websocket.sent.clear()
+        hub.update("character:1", text="hi")
+        hub.set_state("poll", {"active": True})   # not subscribed
+        await _ticks(hub)
+        hub.publish("character:1", "picked", {"username": "ann"})
+        hub.delete("character:2")
+        await _ticks(hub)
+        assert _received(client) == [
+            ("character:1", "state", 2, {"name": "ann", "visible": True, "text": "hi"}),
+            ("character:1", "picked", 3, {"username": "ann"}),
+            ("character:2", "deleted", 2, None),
+        ]
+        hub.disconnect(client)
+
+    asyncio.run(main())
+
+
+def test_overlapping_subscriptions_deliver_each_message_once():
+    async def main():
+        hub = WebSocketManager(tick_hz=100)
+        client = _client()
+        hub.subscribe(client, "character:3")
+        hub.subscribe(client, "character:*")
+        hub.subscribe(client, "*")
+        hub.publish("character:3", "reset", {"character": 3})
+        await asyncio.sleep(0.01)
+        assert _received(client) == [("character:3", "reset", 1, {"character": 3})]
+        hub.disconnect(client)
+
+    asyncio.run(main())
+
+
+def test_resubscribing_after_a_gap_resumes_from_a_fresh_snapshot():
+    async def main():
+        hub = WebSocketManager(tick_hz=100)
+        provided = {"active": True, "opened": []}
+        hub.add_provider("crates", lambda: provided)
+        client = _client()
+        hub.subscribe(client, "crates")
+        for crate in (1, 2, 3):
+            provided = {"active": True, "opened": list(range(1, crate + 1))}
+            await _ticks(hub)
+        seqs = [seq for _, _, seq, _ in _received(client)]
+        assert seqs == [1, 2, 3, 4]
+
+        # The client lost messages (say seq 3): it subscribes again and gets the
+        # current state with the current seq, then carries on from there
+        client.websocket.sent.clear()
+        hub.subscribe(client, "crates")
+        provided = {"active": False, "opened": [1, 2, 3]}
+        await _ticks(hub)
+        assert _received(client) == [
+            ("crates", "snapshot", 4, {"active": True, "opened": [1, 2, 3]}),
+            ("crates", "state", 5, {"active": False, "opened": [1, 2, 3]}),
+        ]
+        hub.disconnect(client)
+
+    asyncio.run(main())
+
+
+def test_unsubscribed_and_disconnected_clients_get_nothing():
+    async def main():
+        hub = WebSocketManager(tick_hz=100)
+        kept, dropped, gone = _client(), _client(), _client()
+        for client in (kept, dropped, gone):
+            hub.subscribe(client, "duel")
+        hub.unsubscribe(dropped, "duel")
+        hub.disconnect(gone)
+        hub.publish("duel", "ended", {"winner": 1})
+        await asyncio.sleep(0.01)
+        assert len(kept.websocket.sent) == 1
+        assert dropped.websocket.sent == [] and gone.websocket.sent == []
+        assert gone.patterns == set()
+        hub.disconnect(kept)
+        hub.disconnect(dropped)
+        assert not hub.subscribed
+
+    asyncio.run(main())
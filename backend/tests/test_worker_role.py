@@ -0,0 +1,116 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import app.worker_role as worker_role
+from app.control_channel import CONTROL
+from app.state_store import SQLiteStateStore, StateStore
+from app.websocket_manager import HUB
+from app.worker_role import WorkerRole
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_HOLD_LEASE = """
+import asyncio, sys
+from app.state_store import SQLiteStateStore
+assert asyncio.run(SQLiteStateStore(sys.argv[1]).try_lease("show", float(sys.argv[2])))
+"""
+
+
+def _lead_again():
+    """WorkerRole switches the process-wide hub and router; put them back for the other tests."""
+    for singleton in (HUB, CONTROL):
+        singleton._following = False
+        singleton._store = None
+
+
+class _Show:
+    def __init__(self, start_s: float = 0.0):
+        self.start_s = start_s
+        self.log = []
+
+    async def start(self):
+        self.log.append("start")
+        await asyncio.sleep(self.start_s)
+        self.log.append("started")
+
+    async def stop(self):
+        self.log.append("stop")
+
+
+class _FlakyStore(StateStore):
+    """Grants the lease, then every check fails (e.g. "database is locked")."""
+
+    def __init__(self):
+        super().__init__()
+        self.checks = 0
+
+    async def try_lease(self, name, ttl):
+        self.checks += 1
+        if self.checks > 1:
+            raise RuntimeError("database is locked")
+        return True
+
+
+def test_another_worker_takes_over_when_the_owner_stops_renewing(tmp_path, monkeypatch):
+    async def main():
+        path = str(tmp_path / "shared.db")
+        monkeypatch.setattr(worker_role, "LEASE_RENEW_SEC", 0.1)
+        # The owner (another process) took the lease and then died without renewing it
+        subprocess.run([sys.executable, "-c", _HOLD_LEASE, path, "0.5"], cwd=BACKEND, check=True)
+        show = _Show()
+        role = WorkerRole(SQLiteStateStore(path))
+        try:
+            await role.start(show.start, show.stop)
+            assert not role.owner and HUB._following and CONTROL._following
+            await asyncio.sleep(0.2)
+            assert show.log == []
+            await asyncio.sleep(0.6)
+            assert role.owner and not HUB._following and not CONTROL._following
+            assert show.log == ["start", "started"]
+            await role.stop()
+            assert show.log == ["start", "started", "stop"]
+            assert not role.owner
+        finally:
+            _lead_again()
+
+    asyncio.run(main())
+
+
+def test_lease_is_renewed_while_the_show_starts_and_failed_checks_keep_it(monkeypatch):
+    async def main():
+        monkeypatch.setattr(worker_role, "LEASE_RENEW_SEC", 0.05)
+        store = _FlakyStore()
+        show = _Show(start_s=0.3)
+        role = WorkerRole(store)
+        try:
+            await role.start(show.start, show.stop)
+            assert role.owner
+            await asyncio.sleep(0.2)
+            assert store.checks > 2               # renewal didn't wait for start_show
+            assert show.log == ["start"]
+            await asyncio.sleep(0.2)
+            assert role.owner and show.log == ["start", "started"]   # errors aren't a lost lease
+            await role.stop()
+            assert show.log == ["start", "started", "stop"]
+        finally:
+            _lead_again()
+
+    asyncio.run(main())
+
+
+def test_stopping_mid_start_waits_for_the_start_to_finish(monkeypatch):
+    async def main():
+        monkeypatch.setattr(worker_role, "LEASE_RENEW_SEC", 10.0)
+        show = _Show(start_s=0.2)
+        role = WorkerRole(StateStore())
+        try:
+            await role.start(show.start, show.stop)
+            await asyncio.sleep(0.05)
+            await role.stop()
+            assert show.log == ["start", "started", "stop"]
+        finally:
+            _lead_again()
+
+    asyncio.run(main())
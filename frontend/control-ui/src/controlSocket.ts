@@ -0,0 +1,139 @@
+// One shared connection to the backend's multiplexed /ws/control socket.
+// Every message is an envelope { topic, type, id, payload }; see
+// backend/app/control_channel.py. Events on subscribed topics also carry a
+// per-topic seq (backend/app/websocket_manager.py); a gap means we missed one,
+// so we subscribe again and get a fresh snapshot.
+
+type Envelope = {
+  topic: string;
+  type: string;
+  id: number | string | null;
+  seq?: number;
+  payload: any;
+};
+type Listener = (type: string, payload: any, topic: string) => void;
+type ConnectionListener = (open: boolean) => void;
+
+const CONTROL_URL = "ws://localhost:8000/ws/control";
+const REQUEST_TIMEOUT_MS = 10000;
+
+let socket: WebSocket | null = null;
+let retries = 0;
+let nextId = 1;
+const outbox: Envelope[] = [];
+const pending = new Map<number, { resolve: (p: any) => void; reject: (e: Error) => void }>();
+const listeners = new Map<string, Set<Listener>>();  // by topic pattern, e.g. "character:*"
+const lastSeq = new Map<string, number>();
+const connectionListeners = new Set<ConnectionListener>();
+
+function notifyConnection(open: boolean) {
+  connectionListeners.forEach((listener) => listener(open));
+}
+
+// Same wildcards as the backend's subscriptions ("*", "?")
+function matches(pattern: string, topic: string): boolean {
+  if (!/[*?]/.test(pattern)) return pattern === topic;
+  const source = pattern.replace(/[.+^${}()|[\]\\]/g, "\\$&").replace(/\*/g, ".*").replace(/\?/g, ".");
+  return new RegExp(`^${source}$`).test(topic);
+}
+
+function send(message: Envelope) {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify(message));
+  } else {
+    outbox.push(message);
+    connect();
+  }
+}
+
+function connect() {
+  if (socket && socket.readyState !== WebSocket.CLOSED) return;
+  const ws = new WebSocket(CONTROL_URL);
+  socket = ws;
+
+  ws.onopen = () => {
+    retries = 0;
+    lastSeq.clear();
+    // Subscriptions don't survive a reconnect; ask for them again first
+    if (listeners.size) {
+      ws.send(JSON.stringify({ topic: "control", type: "subscribe", id: null, payload: { topics: [...listeners.keys()] } }));
+    }
+    while (outbox.length) ws.send(JSON.stringify(outbox.shift()));
+    notifyConnection(true);
+  };
+
+  ws.onmessage = (event) => {
+    const message: Envelope = JSON.parse(event.data);
+    if (typeof message.id === "number" && pending.has(message.id)) {
+      const request = pending.get(message.id)!;
+      pending.delete(message.id);
+      if (message.type === "error") request.reject(new Error(message.payload?.message ?? "error"));
+      else request.resolve(message.payload);
+      return;
+    }
+    if (typeof message.seq === "number") {
+      const last = lastSeq.get(message.topic);
+      lastSeq.set(message.topic, message.seq);
+      if (message.type !== "snapshot" && last !== undefined && message.seq !== last + 1) {
+        const patterns = [...listeners.keys()].filter((pattern) => matches(pattern, message.topic));
+        send({ topic: "control", type: "subscribe", id: null, payload: { topics: patterns } });
+      }
+    }
+    listeners.forEach((set, pattern) => {
+      if (matches(pattern, message.topic)) set.forEach((listener) => listener(message.type, message.payload, message.topic));
+    });
+  };
+
+  ws.onclose = () => {
+    socket = null;
+    notifyConnection(false);
+    if (listeners.size || outbox.length) {
+      // Capped backoff so a restarting backend isn't hammered
+      const delay = Math.min(5000, 500 * Math.pow(1.6, retries++));
+      window.setTimeout(connect, delay);
+    }
+  };
+}
+
+/** Send one command and resolve with the reply payload (rejects on an error reply). */
+export function request(topic: string, type: string, payload: any = {}): Promise<any> {
+  const id = nextId++;
+  return new Promise((resolve, reject) => {
+    pending.set(id, { resolve, reject });
+    window.setTimeout(() => {
+      if (pending.delete(id)) reject(new Error(`${topic} ${type} timed out`));
+    }, REQUEST_TIMEOUT_MS);
+    send({ topic, type, id, payload });
+  });
+}
+
+/**
+ * Listen to a topic (wildcards allowed): a "snapshot" first, then "state" changes
+ * and events. Returns an unsubscribe function.
+ */
+export function subscribe(topic: string, listener: Listener): () => void {
+  let set = listeners.get(topic);
+  if (!set) {
+    set = new Set();
+    listeners.set(topic, set);
+    send({ topic: "control", type: "subscribe", id: null, payload: { topics: [topic] } });
+  }
+  set.add(listener);
+  return () => {
+    set!.delete(listener);
+    if (!set!.size) {
+      listeners.delete(topic);
+      send({ topic: "control", type: "unsubscribe", id: null, payload: { topics: [topic] } });
+    }
+  };
+}
+
+/** Follow whether the shared socket is open (called right away, then on every change). */
+export function watchConnection(listener: ConnectionListener): () => void {
+  connectionListeners.add(listener);
+  listener(socket !== null && socket.readyState === WebSocket.OPEN);
+  connect();
+  return () => {
+    connectionListeners.delete(listener);
+  };
+}
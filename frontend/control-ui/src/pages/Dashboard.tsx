@@ -1,142 +1,43 @@
-import { useState, useRef } from "react";
+import { useState } from "react";
 // import axios from "axios";
 import PickChatter from "./Functions/PickChatter";
 import { CratesWsController } from "./Functions/CratesController";
+import { request } from "../controlSocket";
 import "./Stylesheet/dashboard.css";
 
 function Dashboard() {
     const [characterCount, setCharacterCount] = useState(2);
-    const wsMuteRef = useRef<WebSocket | null>(null);
-    const wsControlPollRef = useRef<WebSocket | null>(null); // New ref
-    const wsControlDuelPollRef = useRef<WebSocket | null>(null); // New ref for duel poll
     const [muteStatus, setMuteStatus] = useState("unmuted");
     const [muted, setMuted] = useState(true);
     const [pollStatus, setPollStatus] = useState("hide");
-    const wsShootGunRef = useRef<WebSocket | null>(null);
     const [gunStatus, setGunStatus] = useState("unfired");
 
-    const ws = new WebSocket("ws://localhost:8000/ws/test");
-    ws.onmessage = (event) => {
-        console.log("Received:", event.data);
-    };
-
+    // All of these go over the one shared control socket
 
-    // Reset chatter using websocket
     const mute_tts = () => {
-        // If websocket is not created or is closed, create a new one
-        if (!wsMuteRef.current || wsMuteRef.current.readyState === WebSocket.CLOSED) {
-            const ws = new WebSocket("ws://localhost:8000/ws/mute_tts");
-            wsMuteRef.current = ws;
-
-            ws.onopen = () => {
-                ws.send(JSON.stringify({ mute: muted }));
-            };
-
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                setMuteStatus(data.status);
-            };
-
-            ws.onerror = () => {
-                setMuteStatus("Error muting TTS");
-                ws.close();
-            };
- 
-            ws.onclose = () => {
-                wsMuteRef.current = null;
-            };
-
-        } else {
-            // Reuse the existing connection
-            wsMuteRef.current.send(JSON.stringify({ mute: muted }));
-        }
+        request("tts", "mute", { mute: muted })
+            .then((reply) => setMuteStatus(reply.status))
+            .catch(() => setMuteStatus("Error muting TTS"));
     };
 
-    // Reset chatter using websocket
     const shoot_gun = (command: "shoot" | "flip" | "hide") => {
-        // If websocket is not created or is closed, create a new one
-        if (!wsShootGunRef.current || wsShootGunRef.current.readyState === WebSocket.CLOSED) {
-            const ws = new WebSocket("ws://localhost:8000/ws/shoot_gun");
-            wsShootGunRef.current = ws;
-
-            ws.onopen = () => {
-                ws.send(JSON.stringify({ gun: "shoot the gun!" , command: command }));
-            };
-
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                setGunStatus(data.status);
-            };
-
-            ws.onerror = () => {
-                setGunStatus("Error shooting gun");
-                ws.close();
-            };
- 
-            ws.onclose = () => {
-                wsShootGunRef.current = null;
-            };
-
-        } else {
-            // Reuse the existing connection
-            wsShootGunRef.current.send(JSON.stringify({ command: command }));
-        }
+        request("gun", command)
+            .then((reply) => setGunStatus(reply.status))
+            .catch(() => setGunStatus("Error shooting gun"));
     };
 
-    // Start or end poll via WebSocket
+    // Start or end poll
     const sendPollCommand = (command: "start" | "end" | "hide") => {
-        if (!wsControlPollRef.current || wsControlPollRef.current.readyState === WebSocket.CLOSED) {
-            const ws = new WebSocket("ws://localhost:8000/ws/control_poll");
-            wsControlPollRef.current = ws;
-
-            ws.onopen = () => {
-                ws.send(JSON.stringify({ poll: command }));
-            };
-
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                setPollStatus(data.status);
-            };
-
-            ws.onerror = () => {
-                console.error("Poll WebSocket error");
-                ws.close();
-            };
-
-            ws.onclose = () => {
-                wsControlPollRef.current = null;
-            };
-        } else {
-            wsControlPollRef.current.send(JSON.stringify({ poll: command }));
-        }
+        request("poll", command)
+            .then((reply) => setPollStatus(reply.status))
+            .catch((e) => console.error("Poll command failed", e));
     };
 
-    // Start or end poll via WebSocket
+    // Start or end duel poll
     const sendDuelCommand = (command: "start" | "end" | "hide") => {
-        if (!wsControlDuelPollRef.current || wsControlDuelPollRef.current.readyState === WebSocket.CLOSED) {
-            const ws = new WebSocket("ws://localhost:8000/ws/control_duel_poll");
-            wsControlDuelPollRef.current = ws;
-
-            ws.onopen = () => {
-                ws.send(JSON.stringify({ poll: command }));
-            };
-
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                setPollStatus(data.status);
-            };
-
-            ws.onerror = () => {
-                console.error("Poll WebSocket error");
-                ws.close();
-            };
-
-            ws.onclose = () => {
-                wsControlDuelPollRef.current = null;
-            };
-        } else {
-            wsControlDuelPollRef.current.send(JSON.stringify({ poll: command }));
-        }
+        request("duel", command)
+            .then((reply) => setPollStatus(reply.status))
+            .catch((e) => console.error("Duel command failed", e));
     };
 
     const handleAdd = () => {
@@ -175,11 +76,7 @@ function Dashboard() {
                 ))}
             </div>
             <div className="dashboard-footer">
-                <CratesWsController
-                    wsUrl="ws://localhost:8000/ws/crates"   // <-- change to your WS route
-                    // protocols={["your-subprotocol-if-any"]} // optional
-                    // autoReconnect={true}                    // optional (default true)
-                />
+                <CratesWsController />
             </div>
 
             <div className="dashboard-footer">
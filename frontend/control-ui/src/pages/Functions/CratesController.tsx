@@ -1,192 +1,100 @@
 import React, { useCallback, useEffect, useMemo, useRef, useState } from "react";
+import { request, subscribe, watchConnection } from "../../controlSocket";
 
 /**
- * Minimal message protocol (adjust to your backend):
- *  -> { type: "crates:start" }
- *  -> { type: "crates:select", crate: number }   // 1..12
- *  -> { type: "crates:reset" }
+ * Drives the crates game over the shared control socket (controlSocket.ts):
+ *  -> request("crates", "start" | "reset" | "status")
+ *  -> request("crates", "select", { crate })   // 1..12
+ *  <- reply { active, opened, message }, or an error
  *
- * Server can reply with any of:
- *  <- { type: "ok", message?: string }
- *  <- { type: "error", message: string }
- *  <- { type: "crates:status", active: boolean, opened?: number[], message?: string }
- *  <- { type: "crates:result", message: string, active?: boolean, opened?: number[] }
+ * The "crates" topic carries the board as the overlay shows it, so changes made
+ * from another dashboard show up here too.
  */
 
-type CratesWsControllerProps = {
-  /** ws://host:port/path or wss://... */
-  wsUrl: string;
-  /** Optional subprotocols, if your server requires (leave empty for vanilla ws). */
-  protocols?: string | string[];
-  /** Optional: disable auto-reconnect */
-  autoReconnect?: boolean;
-};
-
-type Incoming =
-  | { type: "ok"; message?: string }
-  | { type: "error"; message: string }
-  | { type: "crates:status"; active: boolean; opened?: number[]; message?: string }
-  | { type: "crates:result"; message: string; active?: boolean; opened?: number[] } 
+type CratesReply = { active: boolean; opened: number[]; message?: string };
 
 const MAX_LOG = 50;
 
-const ready = (ws?: WebSocket | null) => ws && ws.readyState === WebSocket.OPEN;
-
-export const CratesWsController: React.FC<CratesWsControllerProps> = ({
-  wsUrl,
-  protocols,
-  autoReconnect = true,
-}) => {
+export const CratesWsController: React.FC = () => {
   const [gameActive, setGameActive] = useState<boolean | null>(null);
   const [opened, setOpened] = useState<number[]>([]);
   const [lastMessage, setLastMessage] = useState<string>("");
   const [loading, setLoading] = useState<false | "start" | "select" | "reset">(false);
   const [crateInput, setCrateInput] = useState("1");
 
-  const [connState, setConnState] = useState<"connecting" | "open" | "closed">("connecting");
-  const [retries, setRetries] = useState(0);
+  const [connected, setConnected] = useState(false);
   const [log, setLog] = useState<Array<{ id: string; ts: number; text: string }>>([]);
   const logSeq = useRef(0);
 
-  const wsRef = useRef<WebSocket | null>(null);
-  const queueRef = useRef<any[]>([]); // queue outbound messages until socket is open
-  const reconnectTimer = useRef<number | null>(null);
-
   const addLog = useCallback((text: string) => {
     const ts = Date.now();
     const id = `${ts}-${++logSeq.current}`; // unique per entry
-    setLog(prev => [{ id, ts, text }, ...prev].slice(0, 50));
-  }, []);
-
-  const flushQueue = useCallback(() => {
-    const ws = wsRef.current;
-    if (!ready(ws)) return;
-    while (queueRef.current.length) {
-      const msg = queueRef.current.shift();
-      ws!.send(JSON.stringify(msg));
-    }
+    setLog(prev => [{ id, ts, text }, ...prev].slice(0, MAX_LOG));
   }, []);
 
-  const send = useCallback((msg: any) => {
-    const ws = wsRef.current;
-    if (!ready(ws)) {
-      queueRef.current.push(msg);
-      return false;
-    }
-    ws!.send(JSON.stringify(msg));
-    return true;
+  const applyReply = useCallback((reply: CratesReply) => {
+    setGameActive(reply.active);
+    setOpened(reply.opened ?? []);
+    if (reply.message) setLastMessage(reply.message);
   }, []);
 
-  const scheduleReconnect = useCallback(() => {
-    if (!autoReconnect) return;
-    if (reconnectTimer.current) return;
-    const attempt = retries + 1;
-    const delay = Math.min(5000, 500 * Math.pow(1.6, attempt - 1)); // backoff to 5s max
-    reconnectTimer.current = window.setTimeout(() => {
-      reconnectTimer.current = null;
-      setRetries(attempt);
-      connect();
-    }, delay);
-  }, [autoReconnect, retries]);
-
-  const connect = useCallback(() => {
-    try {
-      setConnState("connecting");
-      const ws = new WebSocket(wsUrl, protocols);
-      wsRef.current = ws;
-
-      ws.onopen = () => {
-        setConnState("open");
-        setRetries(0);
-        addLog("🔌 WebSocket connected");
-        flushQueue();
-        // Ask for current status (optional; if your server pushes status on join, you can skip)
-        send({ type: "crates:status:get" });
-      };
-
-      ws.onmessage = (ev) => {
-        let data: Incoming;
-        try {
-          data = JSON.parse(ev.data);
-        } catch {
-          addLog(`📩 ${ev.data}`);
-          setLastMessage(String(ev.data));
-          return;
-        }
-
-        switch (data.type) {
-          case "ok":
-            if (data.message) {
-              addLog(`✅ ${data.message}`);
-              setLastMessage(data.message);
-            }
-            break;
-
-          case "error":
-            addLog(`❌ ${data.message}`);
-            setLastMessage(data.message);
-            setLoading(false);
-            break;
-
-          case "crates:status":
-            setGameActive(data.active);
-            setOpened(data.opened ?? []);
-            if (data.message) setLastMessage(data.message);
-            addLog(`ℹ️ Status: ${data.active ? "active" : "inactive"}`);
-            setLoading(false);
-            break;
-
-          case "crates:result":
-            if (typeof data.active === "boolean") setGameActive(data.active);
-            if (data.opened) setOpened(data.opened);
-            setLastMessage(data.message);
-            addLog(`🎯 ${data.message}`);
-            setLoading(false);
-            break;
+  useEffect(
+    () =>
+      watchConnection((open) => {
+        setConnected(open);
+        addLog(open ? "🔌 WebSocket connected" : "🔌 WebSocket closed");
+      }),
+    [addLog]
+  );
 
-          default:
-            addLog(`📨 ${JSON.stringify(data)}`);
-            break;
-        }
-      };
+  useEffect(
+    () =>
+      subscribe("crates", (type, payload) => {
+        if (type !== "snapshot" && type !== "state") return;
+        // The overlay's board: a crate counts as opened once its reveal has played
+        setGameActive(payload.active);
+        setOpened(payload.opened ?? []);
+      }),
+    []
+  );
 
-      ws.onclose = () => {
-        setConnState("closed");
-        addLog("🔌 WebSocket closed");
+  const run = useCallback(
+    async (kind: "start" | "select" | "reset", type: string, payload: any = {}) => {
+      setLoading(kind);
+      try {
+        const reply: CratesReply = await request("crates", type, payload);
+        applyReply(reply);
+        if (reply.message) addLog(`${kind === "select" ? "🎯" : "✅"} ${reply.message}`);
+      } catch (e: any) {
+        const message = e?.message ?? String(e);
+        setLastMessage(message);
+        addLog(`❌ ${message}`);
+      } finally {
         setLoading(false);
-        scheduleReconnect();
-      };
-
-      ws.onerror = () => {
-        addLog("⚠️ WebSocket error");
-      };
-    } catch (e: any) {
-      addLog(`⚠️ Connect error: ${e?.message ?? e}`);
-      setConnState("closed");
-      scheduleReconnect();
-    }
-    // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [wsUrl, protocols]); // note: scheduleReconnect not included to avoid stale timer reuse
+      }
+    },
+    [applyReply, addLog]
+  );
 
+  // Ask for the current status whenever the socket (re)connects
   useEffect(() => {
-    connect();
-    return () => {
-      if (reconnectTimer.current) window.clearTimeout(reconnectTimer.current);
-      reconnectTimer.current = null;
-      wsRef.current?.close();
-    };
-  }, [connect]);
+    if (!connected) return;
+    request("crates", "status")
+      .then((reply: CratesReply) => {
+        applyReply(reply);
+        addLog(`ℹ️ Status: ${reply.active ? "active" : "inactive"}`);
+      })
+      .catch((e) => addLog(`❌ ${e?.message ?? e}`));
+  }, [connected, applyReply, addLog]);
 
   // Actions
   const startGame = useCallback(() => {
-    setLoading("start");
-    send({ type: "crates:start" });
-  }, [send]);
+    run("start", "start");
+  }, [run]);
 
   const resetGame = useCallback(() => {
-    setLoading("reset");
-    send({ type: "crates:reset" });
-  }, [send]);
+    run("reset", "reset");
+  }, [run]);
 
   const selectCrate = useCallback(
     (n?: number) => {
@@ -197,29 +105,23 @@ export const CratesWsController: React.FC<CratesWsControllerProps> = ({
         addLog(`⚠️ ${msg}`);
         return;
       }
-      setLoading("select");
-      send({ type: "crates:select", crate: num });
+      run("select", "select", { crate: num });
     },
-    [crateInput, send, addLog]
+    [crateInput, run, addLog]
   );
 
-  const disabled = loading !== false || connState !== "open";
+  const disabled = loading !== false || !connected;
 
   const statusBadge = useMemo(() => {
-    const cls =
-      connState === "open"
-        ? "bg-green-100 text-green-700"
-        : connState === "connecting"
-        ? "bg-yellow-100 text-yellow-800"
-        : "bg-red-100 text-red-700";
+    const cls = connected ? "bg-green-100 text-green-700" : "bg-red-100 text-red-700";
     return (
       <span className={`text-xs px-2 py-1 rounded ${cls}`}>
-        {connState === "open" ? "WS: Connected" : connState === "connecting" ? "WS: Connecting…" : "WS: Disconnected"}
+        {connected ? "WS: Connected" : "WS: Disconnected"}
       </span>
     );
-  }, [connState]);
+  }, [connected]);
 
-  // Simple helper to indicate opened crates (if server sends that list)
+  // Simple helper to indicate opened crates
   const isOpened = useCallback((n: number) => opened.includes(n), [opened]);
 
   return (
@@ -1,4 +1,5 @@
-import { useCallback, useEffect, useMemo, useRef, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
+import { request, subscribe, watchConnection } from "../../controlSocket";
 import "../Stylesheet/PickChatter.css";
 
 interface PickChatterProps {
@@ -12,7 +13,6 @@ const VOICE_STYLES = [
 ] as const;
 
 type Loading = false | "pick" | "set" | "reset" | "voice" | "send";
-type ConnState = "connecting" | "open" | "closed";
 
 function PickChatter({ characterNumber }: PickChatterProps) {
   const [platform, setPlatform] = useState("either");
@@ -23,205 +23,82 @@ function PickChatter({ characterNumber }: PickChatterProps) {
   const [message, setMessage] = useState<string>("");
 
   const [loading, setLoading] = useState<Loading>(false);
-  const [connState, setConnState] = useState<ConnState>("connecting");
-
-  // Persistent socket + helpers
-  const wsRef = useRef<WebSocket | null>(null);
-  const queueRef = useRef<any[]>([]); // outbound message queue until OPEN
-  const reconnectTimer = useRef<number | null>(null);
-  const retriesRef = useRef(0);
-  const mounted = useRef(true);
-
-  // Failsafe: clear loading if no response arrives in time
-  const clearLoadingTimer = useRef<number | null>(null);
-  const armClearLoading = useCallback((ms = 6000) => {
-    if (clearLoadingTimer.current) window.clearTimeout(clearLoadingTimer.current);
-    clearLoadingTimer.current = window.setTimeout(() => {
-      setLoading(false);
-      clearLoadingTimer.current = null;
-    }, ms);
-  }, []);
-  const disarmClearLoading = useCallback(() => {
-    if (clearLoadingTimer.current) {
-      window.clearTimeout(clearLoadingTimer.current);
-      clearLoadingTimer.current = null;
-    }
-  }, []);
-
-  // ---- Single control channel URL with character in query ----
-  const wsUrl = useMemo(
-    () => `ws://localhost:8000/ws/character_control?character=${encodeURIComponent(
-      String(characterNumber)
-    )}`,
-    [characterNumber]
-  );
-
-  // Basic sender with queueing
-  const send = useCallback((msg: any) => {
-    const ws = wsRef.current;
-    if (ws && ws.readyState === WebSocket.OPEN) {
-      ws.send(JSON.stringify(msg));
-      return true;
-    }
-    queueRef.current.push(msg);
-    return false;
-  }, []);
-
-  const flushQueue = useCallback(() => {
-    const ws = wsRef.current;
-    if (!ws || ws.readyState !== WebSocket.OPEN) return;
-    while (queueRef.current.length) {
-      ws.send(JSON.stringify(queueRef.current.shift()));
-    }
-  }, []);
-
-  // Auto-reconnect with capped backoff
-  const scheduleReconnect = useCallback(() => {
-    if (!mounted.current) return;
-    if (reconnectTimer.current) return;
-    const attempt = (retriesRef.current += 1);
-    const delay = Math.min(5000, 500 * Math.pow(1.6, attempt - 1)); // up to 5s
-    reconnectTimer.current = window.setTimeout(() => {
-      reconnectTimer.current = null;
-      connect();
-    }, delay);
-  }, []);
-
-  const connect = useCallback(() => {
-    try {
-      setConnState("connecting");
-      const ws = new WebSocket(wsUrl);
-      wsRef.current = ws;
-
-      ws.onopen = () => {
-        retriesRef.current = 0;
-        setConnState("open");
-        flushQueue();
-        // Optionally fetch current state:
-        // send({ type: "character:status:get" });
-      };
-
-      ws.onmessage = (ev) => {
-        let data: any = ev.data;
-        try {
-          data = JSON.parse(ev.data);
-        } catch {
-          return; // ignore non-JSON
-        }
-
-        // 1) Update picked chatter if present
-        const uname = data?.username ?? data?.user ?? data?.name;
-        if (typeof uname === "string" && uname.trim()) {
-          setPickedChatter(uname);
-        }
-
-        // 2) Reset acknowledgement
-        if (
-          typeof data?.status === "string" &&
-          (data.status === `character_${characterNumber}_reset` || /reset/i.test(data.status))
-        ) {
+  const [connected, setConnected] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  // Commands and updates go over the shared /ws/control socket (controlSocket.ts);
+  // this card follows its character's topic, so every open dashboard stays in sync.
+  const topic = `character:${characterNumber}`;
+
+  useEffect(() => watchConnection(setConnected), []);
+
+  useEffect(
+    () =>
+      subscribe(topic, (type, payload) => {
+        if (type === "snapshot" || type === "state") {
+          // Overlay state: a removed character keeps a placeholder name but isn't visible
+          setPickedChatter(payload?.visible && payload?.name ? payload.name : null);
+        } else if (type === "picked") {
+          setPickedChatter(payload.username);
+        } else if (type === "reset") {
           setPickedChatter(null);
         }
+      }),
+    [topic]
+  );
 
-        // 3) Decide if this message completes an action -> clear loading
-        const hasStatus = typeof data?.status === "string";
-        const hasType = typeof data?.type === "string";
-        const isOkOrErr = hasType && (data.type === "ok" || data.type === "error");
-        const isCharacterEvent = hasType && data.type.startsWith("character:");
-        const hasUsername = typeof uname === "string" && uname.trim().length > 0;
-
-        if (isOkOrErr || isCharacterEvent || hasStatus || hasUsername) {
-          setLoading(false);
-          disarmClearLoading();
-        }
-      };
-
-      ws.onclose = () => {
-        setConnState("closed");
-        setLoading(false);
-        disarmClearLoading();
-        scheduleReconnect();
-      };
-
-      ws.onerror = () => {
-        setLoading(false);
-        disarmClearLoading();
-      };
-    } catch {
-      setConnState("closed");
-      scheduleReconnect();
-    }
-    // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [wsUrl, flushQueue, scheduleReconnect, disarmClearLoading]);
-
-  useEffect(() => {
-    mounted.current = true;
-    connect();
-    return () => {
-      mounted.current = false;
-      if (reconnectTimer.current) window.clearTimeout(reconnectTimer.current);
-      reconnectTimer.current = null;
-      if (clearLoadingTimer.current) window.clearTimeout(clearLoadingTimer.current);
-      clearLoadingTimer.current = null;
+  // One command at a time per card; the reply (or error) ends the loading state
+  const run = useCallback(
+    async (kind: Exclude<Loading, false>, type: string, payload: any = {}) => {
+      setLoading(kind);
+      setError(null);
       try {
-        wsRef.current?.close();
-      } catch {}
-      wsRef.current = null;
-    };
-  }, [connect]);
+        return await request(topic, type, payload);
+      } catch (e: any) {
+        setError(e?.message ?? String(e));
+      } finally {
+        setLoading(false);
+      }
+    },
+    [topic]
+  );
 
-  const connected = connState === "open";
   const disabled = !connected || !!loading;
 
   // ---------------- Actions ----------------
   const pickRandomChatter = useCallback(() => {
     if (disabled) return;
-    setLoading("pick");
-    armClearLoading(); // failsafe
-    send({ type: "character:pick", character_number: characterNumber, platform });
-  }, [disabled, send, characterNumber, platform, armClearLoading]);
+    run("pick", "pick", { platform });
+  }, [disabled, run, platform]);
 
   const setManualPickedChatter = useCallback(() => {
     const name = manualChatter.trim();
     if (disabled || !name) return;
-    setLoading("set");
-    armClearLoading();
-    send({
-      type: "character:set",
-      character_number: characterNumber,
-      username: name,
-      platform,
-    });
+    run("set", "set", { username: name, platform });
     setManualChatter("");
-  }, [disabled, manualChatter, send, characterNumber, platform, armClearLoading]);
+  }, [disabled, manualChatter, run, platform]);
 
   const resetChatter = useCallback(() => {
     if (disabled) return;
-    setLoading("reset");
-    armClearLoading();
-    send({ type: "character:reset", character_number: characterNumber });
-  }, [disabled, send, characterNumber, armClearLoading]);
+    run("reset", "reset");
+  }, [disabled, run]);
 
   const setVoiceStyleWS = useCallback(
     (style: string) => {
       setVoiceStyle(style); // optimistic UI
       if (!connected) return;
-      setLoading("voice");
-      armClearLoading();
-      send({ type: "character:voice", character_number: characterNumber, voice_style: style });
+      run("voice", "voice", { voice_style: style });
     },
-    [connected, send, characterNumber, armClearLoading]
+    [connected, run]
   );
 
   const handle_message_as_character = useCallback(() => {
     const a = alias.trim();
     const m = message.trim();
     if (disabled || !a || !m) return;
-    setLoading("send");
-    armClearLoading();
-    send({ type: "character:message", character_number: characterNumber, alias: a, message: m });
+    run("send", "message", { alias: a, message: m });
     setMessage(""); // optimistic clear; remove if you prefer to wait for ack
-  }, [disabled, alias, message, send, characterNumber, armClearLoading]);
+  }, [disabled, alias, message, run]);
 
   // ----------------------------------------------------------------------
 
@@ -233,10 +110,10 @@ function PickChatter({ characterNumber }: PickChatterProps) {
       <div style={{ marginBottom: 8 }}>
         <span
           className={`text-xs px-2 py-1 rounded ${
-            connected ? "bg-green-100 text-green-700" : connState === "connecting" ? "bg-yellow-100 text-yellow-800" : "bg-red-100 text-red-700"
+            connected ? "bg-green-100 text-green-700" : "bg-red-100 text-red-700"
           }`}
         >
-          {connected ? "WS: Connected" : connState === "connecting" ? "WS: Connecting…" : "WS: Disconnected"}
+          {connected ? "WS: Connected" : "WS: Disconnected"}
         </span>
       </div>
 
@@ -324,6 +201,12 @@ function PickChatter({ characterNumber }: PickChatterProps) {
         </button>
       </div>
 
+      {error && (
+        <div className="mt-2" role="alert">
+          {error}
+        </div>
+      )}
+
       {pickedChatter && (
         <div className="mt-2">
           <strong>Picked Chatter:</strong> {pickedChatter}
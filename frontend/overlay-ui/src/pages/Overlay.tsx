@@ -1,24 +1,104 @@
 import { useEffect, useState } from "react";
 
+// Game state pushed by the backend hub (see backend/app/websocket_manager.py): one
+// message per topic, "snapshot" on connect, then "state" / "deleted" when it changes.
+// seq counts up per topic; a gap means a missed update, so reconnect for fresh snapshots.
+type OverlayState = Record<string, any>;
+
 const Overlay = () => {
   const [game, setGame] = useState("");
+  const [state, setState] = useState<OverlayState>({});
 
   useEffect(() => {
-    const socket = new WebSocket("ws://localhost:8000/ws/overlay/stream1");
+    let socket: WebSocket;
+    let closed = false;
+    let lastSeq: Record<string, number> = {};
+
+    const connect = () => {
+      socket = new WebSocket("ws://localhost:8000/ws/overlay/stream1");
+      lastSeq = {};
+
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.action === "start_game") {
+          setGame(data.game);
+          return;
+        }
+        const { topic, type, seq, payload } = data;
+        if (type !== "snapshot" && topic in lastSeq && seq !== lastSeq[topic] + 1) {
+          socket.close();
+          return;
+        }
+        lastSeq[topic] = seq;
+        if (type === "snapshot" || type === "state") {
+          setState((prev) => ({ ...prev, [topic]: payload }));
+        } else if (type === "deleted") {
+          setState((prev) => {
+            const next = { ...prev };
+            delete next[topic];
+            return next;
+          });
+        }
+      };
+
+      socket.onclose = () => {
+        if (!closed) setTimeout(connect, 1000);
+      };
+    };
 
-    socket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      if (data.action === "start_game") {
-        setGame(data.game);
-      }
+    connect();
+    return () => {
+      closed = true;
+      socket.close();
     };
   }, []);
 
+  const duel = state.duel;
+  const poll = state.poll;
+  const crates = state.crates;
+  const characters = Object.keys(state)
+    .filter((key) => key.startsWith("character:") && state[key].visible)
+    .sort((a, b) => Number(a.slice("character:".length)) - Number(b.slice("character:".length)));  // 2 before 10
+
   return (
-    <div className="text-white text-3xl p-4">
+    <div className="text-white text-3xl p-4 space-y-4">
       {game === "guess_game" && <div>🎯 Guess the Number!</div>}
+
+      {duel?.active && (
+        <div>
+          <div className="flex h-6 w-full overflow-hidden rounded">
+            <div className="bg-blue-500" style={{ width: `${duel.ratios["1"] * 100}%` }} />
+            <div className="bg-red-500" style={{ width: `${duel.ratios["2"] * 100}%` }} />
+          </div>
+          <div className="text-center">{duel.timer}</div>
+        </div>
+      )}
+
+      {poll?.active && (
+        <div className="flex gap-4">
+          {Object.entries(poll.votes).map(([option, count]) => (
+            <div key={option}>
+              {option}: {String(count)}
+            </div>
+          ))}
+        </div>
+      )}
+
+      {characters.map((key) => (
+        <div key={key}>
+          <span className="font-bold">{state[key].name}</span>
+          {state[key].text && <span>: {state[key].text}</span>}
+        </div>
+      ))}
+
+      {crates?.active && (
+        <div>
+          📦 Opened: {crates.opened.join(", ") || "none"}
+          {crates.bomb !== null && <span> 💣 {crates.bomb}</span>}
+        </div>
+      )}
     </div>
   );
 };
 
-export default Overlay;
\ No newline at end of file
+export default Overlay;